@@ -1,22 +1,26 @@
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from app.core.supabase import supabase_admin
 from app.core.auth import get_current_user
 from app.models.schemas import AccountResponse
+from app.services import avatars
 from app.services.platforms import get_adapter
 
 router = APIRouter(prefix="/api/accounts", tags=["accounts"])
 
 
 @router.get("", response_model=list[AccountResponse])
-async def list_accounts(user_id: str = Depends(get_current_user)):
+async def list_accounts(background_tasks: BackgroundTasks, user_id: str = Depends(get_current_user)):
     """Get all accounts for the current user."""
 
     result = supabase_admin.table("social_accounts").select(
-        "id, platform, platform_user_id, username, avatar_url, status, created_at"
+        "id, platform, platform_user_id, username, avatar_url, avatar_hash, status, created_at"
     ).eq("user_id", user_id).order("created_at", desc=True).execute()
 
-    return result.data
+    for account in result.data:
+        if account.get("avatar_url") and not account.get("avatar_hash"):
+            background_tasks.add_task(avatars.backfill, account["id"], account["avatar_url"])
+    return [{**account, "avatar_url": avatars.proxy_url(account)} for account in result.data]
 
 
 @router.delete("/{account_id}")
@@ -69,7 +73,7 @@ async def refresh_account(account_id: str, user_id: str = Depends(get_current_us
             "updated_at": datetime.now().isoformat(),
         }).eq("id", account_id).execute()
 
-        return updated.data[0]
+        return {**updated.data[0], "avatar_url": avatars.proxy_url(updated.data[0])}
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.auth import require_admin
+from app.core import profiling
+from app.services import circuit_breaker
+from app.services.fair_queue import fair_queue
+from app.models.schemas import ProfileArmRequest, ProfileSampleRequest
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/profiling/sample")
+async def sample_cpu(data: ProfileSampleRequest):
+    """Sample event-loop CPU stacks (and optionally allocations) for N seconds."""
+    try:
+        profile = await profiling.sample_cpu(data.seconds, data.interval_ms, data.trace_memory)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {k: v for k, v in profile.items() if k != "collapsed"}
+
+
+@router.post("/profiling/arm")
+async def arm_request_capture(data: ProfileArmRequest):
+    """Profile the next request matching route and/or user (one-shot)."""
+    return profiling.profiler.arm(
+        data.route, data.user_id, data.ttl_seconds, data.interval_ms, data.trace_memory,
+    )
+
+
+@router.delete("/profiling/arm")
+async def disarm_request_capture():
+    profiling.profiler.disarm()
+    return {"ok": True}
+
+
+@router.get("/profiling")
+async def list_profiles():
+    return {"armed": profiling.profiler.status(), "profiles": profiling.list_profiles()}
+
+
+@router.get("/profiling/{profile_id}")
+async def get_profile(profile_id: int):
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {k: v for k, v in profile.items() if k != "collapsed"}
+
+
+@router.get("/profiling/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def get_profile_stacks(profile_id: int):
+    """Folded stacks, one per line, ready for flamegraph.pl or speedscope."""
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile["collapsed"]
+
+
+@router.post("/circuits/{platform}/{endpoint}/reset")
+async def reset_circuit(platform: str, endpoint: str):
+    """Force a breaker closed, e.g. after confirming the platform recovered."""
+    cb = circuit_breaker.get_breaker(platform, endpoint)
+    cb.reset()
+    return cb.snapshot()
+
+
+@router.get("/queue")
+async def publish_queue():
+    """Fair-queue state: slots in use and per-user depth, plan and wait times."""
+    return fair_queue.snapshot()
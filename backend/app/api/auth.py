@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from app.core.config import settings
 from app.core.supabase import supabase_admin, supabase
+from app.services import avatars
 from app.services.platforms import get_adapter
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -64,6 +65,7 @@ async def platform_callback(platform: str, code: str, state: str = ""):
         expires_in = token_data["expires_in"]
 
         user_info = await adapter.get_user_info(access_token, open_id)
+        avatar_hash = await avatars.try_store(user_info.get("avatar_url"))
         token_expires_at = datetime.now() + timedelta(seconds=expires_in)
 
         existing = supabase_admin.table("social_accounts").select("id").eq(
@@ -76,6 +78,7 @@ async def platform_callback(platform: str, code: str, state: str = ""):
             "platform_user_id": open_id,
             "username": user_info["username"],
             "avatar_url": user_info.get("avatar_url"),
+            "avatar_hash": avatar_hash,
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_expires_at": token_expires_at.isoformat(),
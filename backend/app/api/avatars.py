@@ -0,0 +1,36 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from httpx import HTTPError
+
+from app.core.config import avatar_sizes, settings
+from app.services import avatars
+from app.services.imaging import ImageError
+
+router = APIRouter(prefix="/api/avatars", tags=["avatars"])
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/{digest}")
+async def get_avatar(digest: str, request: Request, size: int = settings.AVATAR_DEFAULT_SIZE):
+    """
+    Avatar thumbnail by content digest. Public (used in <img> tags); the URL
+    changes whenever the image does, so responses are cached for good.
+    """
+    if not _DIGEST.fullmatch(digest):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    if size not in avatar_sizes:
+        raise HTTPException(status_code=400, detail=f"size must be one of {sorted(avatar_sizes)}")
+
+    etag = f'"{digest[:16]}-{size}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _IMMUTABLE})
+    try:
+        content = await avatars.thumbnail(digest, size)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    except (HTTPError, ImageError, ValueError):
+        raise HTTPException(status_code=502, detail="Avatar unavailable")
+    return Response(content, media_type="image/jpeg", headers={"ETag": etag, "Cache-Control": _IMMUTABLE})
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from app.core.auth import get_current_user
+from app.services import stats
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+@router.get("/publishing")
+async def publishing_stats(
+    days: int = Query(30, ge=1, le=90, description="Length of the daily trend"),
+    platform: Optional[str] = None,
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Dashboard publish statistics: yesterday / 7-day / 30-day totals per
+    platform and a daily trend, read from the pre-aggregated rollup.
+    """
+    return stats.dashboard(user_id, days, platform)
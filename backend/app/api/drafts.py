@@ -1,8 +1,13 @@
+import copy
+import json
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from postgrest.types import CountMethod, ReturnMethod
+from pydantic import ValidationError
 from app.core.supabase import supabase_admin
 from app.core.auth import get_current_user
-from app.models.schemas import DraftCreate, DraftResponse
+from app.models.schemas import DraftCreate, DraftPatch, DraftPatchResponse, DraftResponse
 
 router = APIRouter(prefix="/api/drafts", tags=["drafts"])
 
@@ -34,21 +39,220 @@ async def get_draft(draft_id: str, user_id: str = Depends(get_current_user)):
     return result.data[0]
 
 
+def _raise_conflict(draft_id: str, user_id: str):
+    """After a conditional update matched nothing: 404 if the draft is gone, else 409 with its version."""
+    current = supabase_admin.table("drafts").select("version").eq(
+        "id", draft_id
+    ).eq("user_id", user_id).execute()
+    if not current.data:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    raise HTTPException(
+        status_code=409,
+        detail={"message": "Draft was modified", "version": current.data[0]["version"]},
+    )
+
+
 @router.put("/{draft_id}", response_model=DraftResponse)
 async def update_draft(draft_id: str, data: DraftCreate, user_id: str = Depends(get_current_user)):
-    existing = supabase_admin.table("drafts").select("id").eq(
+    existing = supabase_admin.table("drafts").select("id, version").eq(
         "id", draft_id
     ).eq("user_id", user_id).execute()
     if not existing.data:
         raise HTTPException(status_code=404, detail="Draft not found")
 
+    # Conditional on the version read, so a concurrent write is not lost under the same bump
+    version = existing.data[0].get("version", 1)
     result = supabase_admin.table("drafts").update({
         **data.model_dump(mode="json"),
+        "version": version + 1,
         "updated_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("id", draft_id).execute()
+    }).eq("id", draft_id).eq("user_id", user_id).eq("version", version).execute()
+    if not result.data:
+        _raise_conflict(draft_id, user_id)
     return result.data[0]
 
 
+# ── PATCH (autosave) ────────────────────────────────────────
+
+JSON_PATCH_TYPE = "application/json-patch+json"
+
+# Removing a non-nullable field resets it to its DraftCreate default
+_FIELD_DEFAULTS = {
+    name: field.get_default(call_default_factory=True)
+    for name, field in DraftCreate.model_fields.items()
+}
+
+
+def _parse_version(raw) -> int:
+    try:
+        return int(str(raw).removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a draft version number")
+
+
+def _expected_version(if_match: Optional[str], body) -> int:
+    """The If-Match version, else a merge patch's "version" member; both must agree when given."""
+    in_body = body.pop("version", None) if isinstance(body, dict) else None
+    if if_match is None and in_body is None:
+        raise HTTPException(status_code=428, detail="If-Match header (draft version) is required")
+    version = _parse_version(if_match if if_match is not None else in_body)
+    if if_match is not None and in_body is not None and _parse_version(in_body) != version:
+        raise HTTPException(status_code=400, detail="Body version does not match If-Match")
+    return version
+
+
+def _pointer(path: str) -> list[str]:
+    if not path.startswith("/"):
+        raise HTTPException(status_code=400, detail=f"Invalid JSON pointer: {path}")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+
+
+def _path_error(path: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"JSON patch path not found: {path}")
+
+
+def _apply_json_patch(doc: dict, ops: list) -> dict:
+    """
+    Apply RFC 6902 add/remove/replace/test operations to a copy of ``doc``.
+    A missing parent, or a missing target for remove and replace, is an error.
+    """
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        kind, path = op.get("op"), op.get("path", "")
+        parts = _pointer(path)
+        parent = doc
+        try:
+            for part in parts[:-1]:
+                parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise _path_error(path)
+        if not isinstance(parent, (dict, list)):
+            raise _path_error(path)
+        key = parts[-1]
+        if kind not in ("test", "remove", "add", "replace"):
+            raise HTTPException(status_code=400, detail=f"Unsupported JSON patch op: {kind}")
+        if isinstance(parent, dict):
+            if kind in ("remove", "replace") and key not in parent:
+                raise _path_error(path)
+            if kind == "test":
+                if parent.get(key) != op.get("value"):
+                    raise HTTPException(status_code=409, detail=f"Test failed at {path}")
+            elif kind == "remove":
+                del parent[key]
+            else:
+                parent[key] = op.get("value")
+            continue
+        if kind == "add" and key == "-":
+            parent.append(op.get("value"))
+            continue
+        try:
+            index = int(key)
+            if index < 0 or index > len(parent) or (kind != "add" and index == len(parent)):
+                raise IndexError(index)
+        except (ValueError, IndexError):
+            raise _path_error(path)
+        if kind == "test":
+            if parent[index] != op.get("value"):
+                raise HTTPException(status_code=409, detail=f"Test failed at {path}")
+        elif kind == "remove":
+            parent.pop(index)
+        elif kind == "add":
+            parent.insert(index, op.get("value"))
+        else:
+            parent[index] = op.get("value")
+    return doc
+
+
+def _merge_patch(target, patch):
+    """RFC 7396 JSON merge patch."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = _merge_patch(result.get(key), value)
+    return result
+
+
+def _validate_changes(changes: dict) -> dict:
+    for name, value in changes.items():
+        if name not in _FIELD_DEFAULTS:
+            raise HTTPException(status_code=422, detail=f"Unknown draft field: {name}")
+        if value is None:
+            changes[name] = _FIELD_DEFAULTS[name]
+    try:
+        return DraftPatch.model_validate(changes).model_dump(mode="json", include=set(changes))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+
+
+def _load_draft(draft_id: str, user_id: str, version: int) -> dict:
+    existing = supabase_admin.table("drafts").select("*").eq(
+        "id", draft_id
+    ).eq("user_id", user_id).execute()
+    if not existing.data:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    draft = existing.data[0]
+    if draft.get("version", 1) != version:
+        raise HTTPException(status_code=409, detail={"message": "Draft was modified", "version": draft.get("version", 1)})
+    return draft
+
+
+@router.patch("/{draft_id}", response_model=DraftPatchResponse)
+async def patch_draft(
+    draft_id: str,
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+):
+    """
+    Apply a JSON merge patch (default) or JSON patch (application/json-patch+json)
+    to a draft. The write is conditional on the version given in If-Match; a stale
+    version gets 409 with the current version. Top-level changes are applied in a
+    single conditional update; nested edits read the draft first.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    version = _expected_version(if_match, body)
+
+    if request.headers.get("content-type", "").startswith(JSON_PATCH_TYPE):
+        if not isinstance(body, list) or not all(isinstance(op, dict) for op in body):
+            raise HTTPException(status_code=400, detail="JSON patch body must be an array of operation objects")
+        paths = [_pointer(op.get("path", "")) for op in body]
+        if all(len(p) == 1 and op.get("op") in ("add", "replace", "remove") for p, op in zip(paths, body)):
+            changes = {p[0]: (None if op["op"] == "remove" else op.get("value")) for p, op in zip(paths, body)}
+        else:
+            draft = _load_draft(draft_id, user_id, version)
+            patched = _apply_json_patch(draft, body)
+            changes = {p[0]: patched.get(p[0]) for p in paths}
+    else:
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="Merge patch body must be an object")
+        changes = dict(body)
+        nested = [k for k, v in changes.items() if isinstance(v, dict)]
+        if nested:
+            draft = _load_draft(draft_id, user_id, version)
+            for key in nested:
+                changes[key] = _merge_patch(draft.get(key), changes[key])
+
+    changes = _validate_changes(changes)
+    updated_at = datetime.now(timezone.utc).isoformat()
+    result = supabase_admin.table("drafts").update(
+        {**changes, "version": version + 1, "updated_at": updated_at},
+        count=CountMethod.exact,
+        returning=ReturnMethod.minimal,
+    ).eq("id", draft_id).eq("user_id", user_id).eq("version", version).execute()
+
+    if not result.count:
+        _raise_conflict(draft_id, user_id)
+
+    return DraftPatchResponse(id=draft_id, version=version + 1, updated_at=updated_at)
+
+
 @router.delete("/{draft_id}")
 async def delete_draft(draft_id: str, user_id: str = Depends(get_current_user)):
     existing = supabase_admin.table("drafts").select("id").eq(
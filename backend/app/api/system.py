@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Request
+from app.core import admission
+from app.core.auth import get_current_user
+from app.services import circuit_breaker, publish_pipeline, transfer_progress
+from app.services.fair_queue import fair_queue
+
+router = APIRouter(prefix="/api/system", tags=["system"])
+
+
+@router.get("/circuits")
+async def list_circuits(user_id: str = Depends(get_current_user)):
+    """Circuit breaker state per platform endpoint."""
+    return circuit_breaker.all_breakers()
+
+
+@router.get("/pipelines")
+async def list_pipeline_reports(user_id: str = Depends(get_current_user)):
+    """Per-stage throughput of recently published batches, newest first."""
+    return list(reversed(publish_pipeline.recent_reports))
+
+
+@router.get("/queue")
+async def my_publish_queue(user_id: str = Depends(get_current_user)):
+    """The caller's publish queue: jobs waiting and running, and recent wait times."""
+    return fair_queue.user_stats(user_id)
+
+
+@router.get("/limits")
+async def my_limits(request: Request, user_id: str = Depends(get_current_user)):
+    """The caller's rate limits per request class, daily publish budget and the current API load."""
+    return admission.limits_for(user_id, request.scope)
+
+
+@router.get("/transfers")
+async def transfer_throughput(user_id: str = Depends(get_current_user)):
+    """Media transfers per platform: running now, and bytes / seconds / throughput per finished stage."""
+    return transfer_progress.platform_totals()
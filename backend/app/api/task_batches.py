@@ -0,0 +1,132 @@
+"""
+Batch endpoints: tasks sharing the batch_id of a multi-video create_task (or a bulk import).
+
+Progress is one batch_progress RPC, and each bulk operation is a single
+set-based update of the batch's eligible tasks, applying the same status
+rules as the per-task endpoints: only scheduled or pending_share tasks can be
+cancelled, only scheduled ones rescheduled, and retry-failed requeues the
+failed accounts of completed or failed tasks (migration 012).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from postgrest.types import CountMethod, ReturnMethod
+
+from app.core import admission
+from app.core.auth import get_current_user
+from app.core.supabase import supabase_admin
+from app.models.schemas import BatchActionResponse, BatchProgressResponse, BatchReschedule
+
+router = APIRouter(prefix="/api/tasks/batches", tags=["tasks"])
+
+_CANCELLABLE = ("scheduled", "pending_share")
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _progress(batch_id: str, user_id: str, failure_limit: int) -> dict:
+    progress = supabase_admin.rpc("batch_progress", {
+        "p_batch_id": batch_id, "p_user_id": user_id, "p_failure_limit": failure_limit,
+    }).execute().data
+    if not progress["tasks"]:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+
+def _require_batch(batch_id: str, user_id: str):
+    """404 unless the user has a task in the batch; tells "nothing to update" from "no such batch"."""
+    found = supabase_admin.table("publish_tasks").select("id").eq(
+        "batch_id", batch_id
+    ).eq("user_id", user_id).limit(1).execute()
+    if not found.data:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+
+def _estimate(progress: dict, now: datetime) -> dict:
+    """
+    Publishing pace from the span of the batch's successful publishes, and the
+    time the remaining accounts need at that pace, counted from now or from
+    the last scheduled start if that is later. None until two have succeeded.
+    """
+    first, last = _parse(progress["first_published_at"]), _parse(progress["last_published_at"])
+    successes = progress["accounts"].get("success", 0)
+    span = (last - first).total_seconds() if first and last else 0.0
+    if not progress["remaining"] or successes < 2 or span <= 0:
+        return {"publishes_per_minute": None, "eta_seconds": None, "estimated_completion_at": None}
+    pace = (successes - 1) / span
+    start = max(now, _parse(progress["last_scheduled_at"]) or now)
+    done_at = start + timedelta(seconds=progress["remaining"] / pace)
+    return {
+        "publishes_per_minute": round(pace * 60, 2),
+        "eta_seconds": round((done_at - now).total_seconds(), 1),
+        "estimated_completion_at": done_at,
+    }
+
+
+@router.get("/{batch_id}", response_model=BatchProgressResponse)
+async def get_batch(
+    batch_id: str,
+    failures: int = Query(100, ge=0, le=1000, description="Failed accounts to list"),
+    user_id: str = Depends(get_current_user),
+):
+    """Progress of a whole batch: tasks and accounts by status, pace, ETA and failures."""
+    progress = _progress(batch_id, user_id, failures)
+    return {
+        "batch_id": batch_id,
+        "tasks": progress["tasks"],
+        "accounts": progress["accounts"],
+        "total_tasks": sum(progress["tasks"].values()),
+        "total_accounts": sum(progress["accounts"].values()),
+        "remaining": progress["remaining"],
+        "retryable": progress["retryable"],
+        **_estimate(progress, datetime.now(timezone.utc)),
+        "failures": progress["failures"],
+    }
+
+
+@router.post("/{batch_id}/cancel", response_model=BatchActionResponse)
+async def cancel_batch(batch_id: str, user_id: str = Depends(get_current_user)):
+    """Cancel every scheduled or pending_share task of the batch; others are left as they are."""
+    result = supabase_admin.table("publish_tasks").update({
+        "status": "cancelled",
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, count=CountMethod.exact, returning=ReturnMethod.minimal).eq("batch_id", batch_id).eq("user_id", user_id).in_("status", list(_CANCELLABLE)).execute()
+    if not result.count:
+        _require_batch(batch_id, user_id)
+    return {"batch_id": batch_id, "tasks": result.count}
+
+
+@router.post("/{batch_id}/reschedule", response_model=BatchActionResponse)
+async def reschedule_batch(batch_id: str, data: BatchReschedule, user_id: str = Depends(get_current_user)):
+    """Move every still scheduled task of the batch to ``scheduled_at``."""
+    result = supabase_admin.table("publish_tasks").update({
+        "scheduled_at": data.scheduled_at.isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, count=CountMethod.exact, returning=ReturnMethod.minimal).eq("batch_id", batch_id).eq("user_id", user_id).eq("status", "scheduled").execute()
+    if not result.count:
+        _require_batch(batch_id, user_id)
+    return {"batch_id": batch_id, "tasks": result.count}
+
+
+@router.post("/{batch_id}/retry-failed", response_model=BatchActionResponse)
+async def retry_failed_batch(batch_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Publish the failed accounts of the batch's finished tasks again, on the
+    next scheduler poll. Each requeued account is charged to the publish budget.
+    """
+    progress = _progress(batch_id, user_id, 0)
+    admission.charge_publishes(user_id, progress["retryable"])
+    try:
+        requeued = supabase_admin.rpc("retry_failed_batch", {"p_batch_id": batch_id, "p_user_id": user_id}).execute().data
+    except Exception:
+        admission.refund_publishes(user_id, progress["retryable"])
+        raise
+    # Accounts that changed since the progress read are not requeued, so not charged
+    admission.refund_publishes(user_id, progress["retryable"] - requeued["accounts"])
+    return {"batch_id": batch_id, **requeued}
@@ -0,0 +1,203 @@
+import asyncio
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+
+router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+
+# One exported row per (task, account)
+_COLUMNS = (
+    "task_id", "created_at", "title", "content_type", "task_status", "scheduled_at", "batch_id",
+    "account_id", "username", "platform", "status", "error_message", "published_url", "published_at",
+)
+
+# Task ids per task_accounts read: about 3.7KB of UUIDs in the query string
+_IDS_PER_READ = 100
+
+# A task finished this close to the archive cutoff may be archived while the export runs
+_ARCHIVE_MARGIN = timedelta(days=1)
+
+
+def _keyset(column: str, created_at: str, key: str) -> str:
+    """PostgREST filter for rows after (created_at, key) in descending order."""
+    # Timestamps contain reserved characters (. :), so values are quoted
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",{column}.lt."{key}")'
+
+
+def _task_accounts(task_ids: list[str]) -> dict[str, list[dict]]:
+    """task_accounts of ``task_ids`` by task, read by id keyset so no response is cut at max_rows."""
+    accounts: dict[str, list] = {}
+    for i in range(0, len(task_ids), _IDS_PER_READ):
+        group = task_ids[i:i + _IDS_PER_READ]
+        last = None
+        while True:
+            query = supabase_admin.table("task_accounts").select(
+                "id, task_id, account_id, status, error_message, published_url, published_at"
+            ).in_("task_id", group)
+            if last:
+                query = query.gt("id", last)
+            rows = query.order("id").limit(settings.EXPORT_ACCOUNTS_PAGE_SIZE).execute().data
+            for ta in rows:
+                accounts.setdefault(ta["task_id"], []).append(ta)
+            if len(rows) < settings.EXPORT_ACCOUNTS_PAGE_SIZE:
+                break
+            last = rows[-1]["id"]
+    return accounts
+
+
+def _archivable(task: dict, cutoff: datetime) -> bool:
+    """Whether the archive job could move ``task`` before the export reaches the archive."""
+    return task["status"] in ("completed", "failed", "cancelled") and (
+        datetime.fromisoformat(task["updated_at"]) < cutoff
+    )
+
+
+def _hot_pages(user_id: str, archivable: Optional[set] = None) -> Iterator[list[tuple[dict, list[dict]]]]:
+    """
+    Pages of (task, task_accounts) from publish_tasks, newest first, via a
+    (created_at, id) cursor. Ids of exported tasks the archive job may move
+    meanwhile are added to ``archivable``.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.ARCHIVE_AFTER_DAYS) + _ARCHIVE_MARGIN
+    cursor = None
+    while True:
+        query = supabase_admin.table("publish_tasks").select(
+            "id, created_at, updated_at, title, content_type, status, scheduled_at, batch_id"
+        ).eq("user_id", user_id)
+        if cursor:
+            query = query.or_(_keyset("id", *cursor))
+        tasks = query.order("created_at", desc=True).order("id", desc=True).limit(settings.EXPORT_PAGE_SIZE).execute().data
+        if not tasks:
+            return
+        accounts = _task_accounts([t["id"] for t in tasks])
+        if archivable is not None and settings.ARCHIVE_AFTER_DAYS > 0:
+            archivable.update(t["id"] for t in tasks if _archivable(t, cutoff))
+        yield [(task, accounts.get(task["id"], [])) for task in tasks]
+        if len(tasks) < settings.EXPORT_PAGE_SIZE:
+            return
+        cursor = (tasks[-1]["created_at"], tasks[-1]["id"])
+
+
+def _archived_pages(user_id: str, exported: set) -> Iterator[list[tuple[dict, list[dict]]]]:
+    """
+    Pages of (task, task_accounts) from task_archive (migration 010), newest
+    first, skipping tasks in ``exported`` (archived after their live row was read).
+    """
+    cursor = None
+    while True:
+        query = supabase_admin.table("task_archive").select(
+            "task_id, created_at, summary, task_accounts"
+        ).eq("user_id", user_id)
+        if cursor:
+            query = query.or_(_keyset("task_id", *cursor))
+        rows = query.order("created_at", desc=True).order("task_id", desc=True).limit(
+            settings.EXPORT_PAGE_SIZE
+        ).execute().data
+        if not rows:
+            return
+        yield [(row["summary"], row["task_accounts"]) for row in rows if row["task_id"] not in exported]
+        if len(rows) < settings.EXPORT_PAGE_SIZE:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["task_id"])
+
+
+def _records(page: list[tuple[dict, list[dict]]], profiles: dict) -> Iterator[dict]:
+    for task, task_accounts in page:
+        for ta in task_accounts:
+            profile = profiles.get(ta["account_id"], {})
+            yield {
+                "task_id": task["id"],
+                "created_at": task["created_at"],
+                "title": task["title"],
+                "content_type": task.get("content_type"),
+                "task_status": task["status"],
+                "scheduled_at": task.get("scheduled_at"),
+                "batch_id": task.get("batch_id"),
+                "account_id": ta["account_id"],
+                "username": profile.get("username") or "Unknown",
+                "platform": profile.get("platform"),
+                "status": ta["status"],
+                "error_message": ta.get("error_message"),
+                "published_url": ta.get("published_url"),
+                "published_at": ta.get("published_at"),
+            }
+
+
+def _encode_csv(records: Iterator[dict], header: bool) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, _COLUMNS)
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return out.getvalue().encode()
+
+
+def _encode_ndjson(records: Iterator[dict]) -> bytes:
+    return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records).encode()
+
+
+async def _chunks(user_id: str, fmt: str, include_archived: bool) -> AsyncIterator[bytes]:
+    """Encoded export, one chunk per page; database reads run in a worker thread."""
+    if fmt == "csv":
+        yield _encode_csv(iter(()), header=True)
+
+    accounts = await asyncio.to_thread(
+        lambda: supabase_admin.table("social_accounts").select("id, username, platform").eq(
+            "user_id", user_id
+        ).execute().data
+    )
+    profiles = {a["id"]: a for a in accounts}
+
+    # Only tasks near the archive cutoff are remembered, not the whole history
+    exported: set[str] = set()
+    if include_archived:
+        sources = [_hot_pages(user_id, exported), _archived_pages(user_id, exported)]
+    else:
+        sources = [_hot_pages(user_id)]
+    for pages in sources:
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            records = _records(page, profiles)
+            yield _encode_csv(records, header=False) if fmt == "csv" else _encode_ndjson(records)
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        # Sync flush per page so clients see rows as they are read
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    include_archived: bool = Query(True, description="Also export tasks moved to the archive"),
+    accept_encoding: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Stream the user's full publish history, one row per task and account:
+    live tasks newest first, then archived ones. Pages of EXPORT_PAGE_SIZE
+    tasks are read with (created_at, id) keyset cursors and written out as
+    they arrive, gzip-compressed when the client accepts it, so memory use
+    does not grow with the history. A task archived while the export runs is
+    written once.
+    """
+    chunks = _chunks(user_id, format, include_archived)
+    filename = f"publish-history-{datetime.now():%Y%m%d}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if accept_encoding and "gzip" in accept_encoding:
+        chunks = _gzip(chunks)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,231 @@
+import json
+import logging
+import secrets
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.core import admission
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.models.schemas import TaskImportItem
+from app.services import topics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+
+# import_id -> {"user_id", "committed_through", "touched_at"}; lets a client resume
+# after a dropped connection even if it missed the last streamed result lines.
+_imports: dict[str, dict] = {}
+_IMPORT_TTL_SECONDS = 24 * 3600
+
+
+def _progress(import_id: str, user_id: str) -> dict:
+    now = time.monotonic()
+    for key in [k for k, v in _imports.items() if now - v["touched_at"] > _IMPORT_TTL_SECONDS]:
+        del _imports[key]
+    progress = _imports.get(import_id)
+    if progress and progress["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Import not found")
+    if not progress:
+        progress = _imports[import_id] = {"user_id": user_id, "committed_through": 0, "touched_at": now}
+    return progress
+
+
+async def _lines(request: Request) -> AsyncIterator[bytes]:
+    """Split the request body into lines as it streams in, without buffering the whole body."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            yield line
+        if len(buffer) > settings.IMPORT_MAX_LINE_BYTES:
+            raise ValueError(f"Line exceeds {settings.IMPORT_MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield buffer
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose iterator also consumes the request body.
+
+    The stock response listens for ``http.disconnect`` on ``receive`` while
+    streaming, which would steal body chunks from ``request.stream()``; here
+    the body reader already surfaces a disconnect as ClientDisconnect.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def _result(**fields) -> bytes:
+    return (json.dumps(fields, ensure_ascii=False, default=str) + "\n").encode()
+
+
+def _insert_chunk(user_id: str, import_id: str, chunk: list[tuple[int, TaskImportItem]]) -> list[bytes]:
+    """Charge, insert and report a chunk of validated items; a chunk that is not written is refunded."""
+    publishes = sum(len(item.account_ids) for _, item in chunk)
+    admission.charge_publishes(user_id, publishes)
+    try:
+        tasks = _write_chunk(user_id, import_id, chunk)
+    except Exception:
+        admission.refund_publishes(user_id, publishes)
+        raise
+    for _, item in chunk:
+        topics.record(user_id, item.topics)
+    return [
+        _result(line=line, status="created", task_id=task["id"])
+        for task, (line, _) in zip(tasks, chunk)
+    ]
+
+
+def _write_chunk(user_id: str, import_id: str, chunk: list[tuple[int, TaskImportItem]]) -> list[dict]:
+    """
+    Two round trips (tasks, then task_accounts). If the second fails the
+    chunk's tasks are deleted again, so the chunk is written whole or not at all.
+    """
+    task_rows = []
+    for _, item in chunk:
+        row = {
+            "user_id": user_id,
+            "title": item.title,
+            "description": item.description,
+            "content_type": item.content_type,
+            "video_url": item.video_url,
+            "image_urls": item.image_urls,
+            "article_content": item.article_content,
+            "cover_url": item.cover_url,
+            "visibility": item.visibility,
+            "ai_content": item.ai_content,
+            "topics": item.topics,
+            "distribution_mode": "broadcast",
+            "batch_id": import_id,
+            "status": "scheduled" if item.scheduled_at else "pending_share",
+            "share_id": secrets.token_urlsafe(16),
+        }
+        if item.scheduled_at:
+            row["scheduled_at"] = item.scheduled_at.isoformat()
+        task_rows.append(row)
+
+    tasks = supabase_admin.table("publish_tasks").insert(task_rows).execute().data
+    account_rows = [
+        {"task_id": task["id"], "account_id": account_id, "status": "pending"}
+        for task, (_, item) in zip(tasks, chunk)
+        for account_id in item.account_ids
+    ]
+    try:
+        supabase_admin.table("task_accounts").insert(account_rows).execute()
+    except Exception:
+        # Tasks without accounts would never publish, and a resume would insert them again
+        task_ids = [task["id"] for task in tasks]
+        try:
+            supabase_admin.table("publish_tasks").delete().in_("id", task_ids).execute()
+        except Exception as e:
+            logger.error("Import %s: could not remove tasks %s of a failed chunk: %s", import_id, task_ids, e)
+        raise
+    return tasks
+
+
+@router.post("/import")
+async def import_tasks(
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    import_id: Optional[str] = Query(None, description="Resume an earlier import"),
+    resume_from: int = Query(0, ge=0, description="Skip lines up to and including this line number"),
+):
+    """
+    Bulk-create tasks from an NDJSON body (one TaskImportItem per line, 1-based
+    line numbers). Lines are parsed and validated as they arrive and written in
+    chunks of IMPORT_BATCH_SIZE; a result line per item is streamed back,
+    followed by a summary with ``committed_through``. All tasks of an import
+    share ``batch_id = import_id``. A chunk that cannot be written ends the
+    import there: its lines are reported as errors and the rest of the body
+    is not read. To resume, repeat the request with the same ``import_id``
+    (lines already committed are skipped).
+    """
+    if import_id:
+        try:
+            uuid.UUID(import_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="import_id must be a UUID")
+    import_id = import_id or str(uuid.uuid4())
+    progress = _progress(import_id, user_id)
+    skip_through = max(resume_from, progress["committed_through"])
+
+    accounts = supabase_admin.table("social_accounts").select("id, status").eq(
+        "user_id", user_id
+    ).execute()
+    active_ids = {a["id"] for a in accounts.data if a["status"] == "active"}
+
+    async def results() -> AsyncIterator[bytes]:
+        created = failed = skipped = 0
+        chunk: list[tuple[int, TaskImportItem]] = []
+        line_no = 0
+        write_failed = False  # A failed chunk stops the import, so nothing past it is committed
+
+        def flush() -> list[bytes]:
+            nonlocal created, failed, write_failed
+            if not chunk:
+                return []
+            try:
+                out = _insert_chunk(user_id, import_id, chunk)
+                created += len(chunk)
+                progress["committed_through"] = chunk[-1][0]
+            except Exception as e:
+                logger.error("Import %s: chunk ending at line %d failed: %s", import_id, chunk[-1][0], e)
+                failed += len(chunk)
+                write_failed = True
+                # A spent publish budget is worth telling the client; database errors are not
+                error = e.detail if isinstance(e, HTTPException) else "Database write failed"
+                out = [_result(line=line, status="error", error=error) for line, _ in chunk]
+            progress["touched_at"] = time.monotonic()
+            chunk.clear()
+            return out
+
+        yield _result(import_id=import_id, resumed_after=skip_through)
+        try:
+            async for raw in _lines(request):
+                line_no += 1
+                if line_no <= skip_through:
+                    skipped += 1
+                    continue
+                if not raw.strip():
+                    continue
+                try:
+                    item = TaskImportItem.model_validate_json(raw)
+                except ValidationError as e:
+                    failed += 1
+                    yield _result(line=line_no, status="error", error=e.errors(include_url=False, include_input=False))
+                    continue
+                unknown = [a for a in item.account_ids if a not in active_ids]
+                if unknown:
+                    failed += 1
+                    yield _result(line=line_no, status="error", error=f"Accounts not found or inactive: {unknown}")
+                    continue
+                chunk.append((line_no, item))
+                if len(chunk) >= settings.IMPORT_BATCH_SIZE:
+                    for out in flush():
+                        yield out
+                    if write_failed:
+                        break
+        except ValueError as e:
+            yield _result(line=line_no + 1, status="error", error=str(e))
+        if not write_failed:
+            for out in flush():
+                yield out
+        if not write_failed:
+            progress["committed_through"] = max(progress["committed_through"], line_no)
+
+        yield _result(
+            import_id=import_id, committed_through=progress["committed_through"],
+            created=created, failed=failed, skipped=skipped,
+        )
+
+    return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
@@ -1,47 +1,121 @@
-from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, TypeVar
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header, Query, Response
+from app.core.config import settings
+from app.core.idempotency import fingerprint, idempotency_store
 from app.core.supabase import supabase_admin
+from app.core import admission, deadline
 from app.core.auth import get_current_user
-from app.models.schemas import TaskCreate, TaskResponse
+from app.core.metrics import PUBLISH_IN_FLIGHT, PUBLISH_RESULTS, PUBLISH_RETRIES
+from app.models.schemas import TaskCreate, TaskResponse, TransferProgressResponse
+from app.services import archive, media_probe, topics, transfer, transfer_progress
+from app.services.circuit_breaker import CircuitOpenError, guard
+from app.services.fair_queue import fair_queue
 from app.services.platforms import get_adapter
+from app.services.platforms.base import MediaLimits, PlatformAdapter, PlatformError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+T = TypeVar("T")
+
+
+async def _with_retry(platform: str, account_id: str, call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run a platform call, retrying retryable platform errors with exponential backoff and jitter.
+    An open circuit is not retried here: the caller defers the whole job instead.
+    """
+    for attempt in range(1, settings.PUBLISH_MAX_ATTEMPTS + 1):
+        try:
+            return await call()
+        except PlatformError as e:
+            if isinstance(e, CircuitOpenError) or not e.retryable or attempt == settings.PUBLISH_MAX_ATTEMPTS:
+                raise
+            delay = getattr(e, "retry_after", None) or settings.PUBLISH_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            delay *= random.uniform(1.0, 1.25)
+            left = deadline.remaining()
+            if left is not None and delay >= left:
+                raise  # The retry could not finish in time
+            PUBLISH_RETRIES.inc(platform)
+            logger.info("Retrying %s call for account %s in %.1fs: %s", platform, account_id, delay, e)
+            await asyncio.sleep(delay)
+
+
+async def _publish_with_retry(adapter: PlatformAdapter, account: dict, video_url: str, title: str, description: str | None) -> str:
+    """
+    Publish behind the platform's "publish" circuit breaker, with retries. Staged
+    adapters get the media via the cheapest transfer mode they support; a
+    BUFFERED source is downloaded once up front, outside the breaker.
+    """
+    content = None
+    if adapter.supports_staged_publish and transfer.should_prefetch(adapter, 1):
+        content = await transfer.download(adapter, video_url)
+
+    async def publish() -> str:
+        async with guard(adapter.platform_name, "publish"):
+            if adapter.supports_staged_publish:
+                media_id = await transfer.upload_media(adapter, account, video_url, content)
+                transfer_progress.stage("create")
+                return await adapter.create_post(
+                    account["access_token"], account["platform_user_id"], media_id, title, description,
+                )
+            transfer_progress.stage("upload")  # One call: the platform fetches the video and posts it
+            return await adapter.publish_video(
+                access_token=account["access_token"],
+                open_id=account["platform_user_id"],
+                video_url=video_url,
+                title=title,
+                description=description,
+            )
 
-async def publish_to_account(task_id: str, task_account_id: str, account: dict, video_url: str, title: str, description: str | None):
-    """Background task to publish video to a single account."""
-    try:
-        adapter = get_adapter(account["platform"])
-        item_id = await adapter.publish_video(
-            access_token=account["access_token"],
-            open_id=account["platform_user_id"],
-            video_url=video_url,
-            title=title,
-            description=description,
-        )
-
-        # Update task_account with success
-        published_url = f"https://www.douyin.com/video/{item_id}"
-        supabase_admin.table("task_accounts").update({
-            "status": "success",
-            "published_url": published_url,
-            "published_at": datetime.now().isoformat(),
-        }).eq("id", task_account_id).execute()
+    return await _with_retry(adapter.platform_name, account["id"], publish)
 
-    except Exception as e:
-        # Update task_account with failure
-        supabase_admin.table("task_accounts").update({
-            "status": "failed",
-            "error_message": str(e)[:500],  # Limit error message length
-        }).eq("id", task_account_id).execute()
 
-    # Check if all accounts are done and update task status
+def _defer_task(task_id: str, task_account_id: str, retry_after: float):
+    """
+    Hand an account back to the schedule while its platform's circuit is open:
+    the account returns to pending, then the task to scheduled. Accounts of the
+    task still publishing keep their status, so the next poll does not re-send them.
+    """
+    now = datetime.now(timezone.utc)
+    supabase_admin.table("task_accounts").update({
+        "status": "pending",
+    }).eq("id", task_account_id).eq("status", "publishing").execute()
+    supabase_admin.table("publish_tasks").update({
+        "status": "scheduled",
+        "scheduled_at": (now + timedelta(seconds=max(retry_after, 1.0))).isoformat(),
+        "updated_at": now.isoformat(),
+    }).eq("id", task_id).eq("status", "publishing").execute()
+
+
+def _mark_success(task_account_id: str, item_id: str):
+    published_url = f"https://www.douyin.com/video/{item_id}"
+    supabase_admin.table("task_accounts").update({
+        "status": "success",
+        "published_url": published_url,
+        "published_at": datetime.now().isoformat(),
+    }).eq("id", task_account_id).execute()
+
+
+def _mark_failed(task_account_id: str, error: BaseException):
+    supabase_admin.table("task_accounts").update({
+        "status": "failed",
+        "error_message": str(error)[:500],  # Limit error message length
+    }).eq("id", task_account_id).execute()
+
+
+def _finalize_task(task_id: str):
+    """Set the task's final status once none of its accounts is pending or publishing."""
     task_accounts = supabase_admin.table("task_accounts").select("status").eq(
         "task_id", task_id
     ).execute()
 
     statuses = [ta["status"] for ta in task_accounts.data]
-    if "pending" not in statuses:
+    if "pending" not in statuses and "publishing" not in statuses:
         # All done
         if all(s == "success" for s in statuses):
             task_status = "completed"
@@ -56,9 +130,131 @@ async def publish_to_account(task_id: str, task_account_id: str, account: dict,
         }).eq("id", task_id).execute()
 
 
+async def publish_to_account(task_id: str, task_account_id: str, account: dict, video_url: str, title: str, description: str | None):
+    """Background task to publish video to a single account, once the user's fair share allows."""
+    async with fair_queue.slot(account["user_id"]):
+        await _publish_to_account(task_id, task_account_id, account, video_url, title, description)
+
+
+async def _publish_to_account(task_id: str, task_account_id: str, account: dict, video_url: str, title: str, description: str | None):
+    platform = account["platform"]
+    PUBLISH_IN_FLIGHT.inc(platform)
+    progress = transfer_progress.begin(task_account_id, task_id, account)
+    try:
+        adapter = get_adapter(platform)
+        # Bounds the platform work, retries included; the status writes below run without it
+        with deadline.start(settings.PUBLISH_DEADLINE_SECONDS), transfer_progress.track(progress):
+            async with deadline.enforce():
+                await media_probe.ensure_publishable(video_url, platform, adapter.media_limits)
+                item_id = await _publish_with_retry(adapter, account, video_url, title, description)
+        progress.finish()
+        _mark_success(task_account_id, item_id)
+        PUBLISH_RESULTS.inc(platform, "success")
+
+    except CircuitOpenError as e:
+        # Fail fast: keep the account pending and retry the task once the circuit may have closed
+        progress.finish(e)
+        PUBLISH_RESULTS.inc(platform, "deferred")
+        logger.warning("Deferring task %s: %s", task_id, e)
+        _defer_task(task_id, task_account_id, e.retry_after)
+        return
+
+    except Exception as e:
+        progress.finish(e)
+        PUBLISH_RESULTS.inc(platform, "failure")
+        _mark_failed(task_account_id, e)
+    finally:
+        PUBLISH_IN_FLIGHT.dec(platform)
+
+    _finalize_task(task_id)
+
+
 @router.post("", response_model=list[TaskResponse])
-async def create_task(data: TaskCreate, user_id: str = Depends(get_current_user)):
-    """Create publish task(s). Supports batch video mode."""
+async def create_task(
+    data: TaskCreate,
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    Create publish task(s). Supports batch video mode.
+    With an Idempotency-Key header, retries replay the first response instead of creating duplicates.
+    """
+    if not idempotency_key:
+        return await _create_tasks(data, user_id)
+
+    created, replayed = await idempotency_store.run(
+        user_id, idempotency_key, fingerprint(data.model_dump_json()),
+        lambda: _create_tasks(data, user_id),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return created
+
+
+def _accounts_for_video(data: TaskCreate, video_list: list, video_idx: int) -> list[str]:
+    """Accounts a video goes to under the request's distribution mode."""
+    if data.distribution_mode == "one_to_one" and len(video_list) > 1:
+        # Round-robin: assign one account per video
+        return [data.account_ids[video_idx % len(data.account_ids)]]
+    # Broadcast: all accounts
+    return data.account_ids
+
+
+async def _validate_media(data: TaskCreate, video_list: list, accounts_by_id: dict):
+    """
+    Probe each video and reject the request (422) if any of them is unreadable
+    or breaks the limits of a platform it is headed to, before any row is
+    written. Videos storage cannot serve right now are let through; the check
+    before upload runs again.
+    """
+    if not settings.MEDIA_PROBE_ENABLED:
+        return
+
+    targets: dict[str, dict[str, MediaLimits]] = {}  # video_url -> platform -> limits
+    for video_idx, video_url in enumerate(video_list):
+        if not video_url:
+            continue
+        for account_id in _accounts_for_video(data, video_list, video_idx):
+            platform = accounts_by_id[account_id]["platform"]
+            try:
+                limits = get_adapter(platform).media_limits
+            except ValueError:
+                continue
+            if limits is not None:
+                targets.setdefault(video_url, {})[platform] = limits
+    if not targets:
+        return
+
+    async def probe(video_url: str):
+        try:
+            return await media_probe.probe(video_url)
+        except Exception as e:  # ProbeError or an unreachable source; sorted out below
+            return e
+
+    # Cache hits are answered without yielding to the loop; only new videos go out to storage
+    results = {url: media_probe.cached(url) for url in targets}
+    missing = [url for url, result in results.items() if result is None]
+    if missing:
+        results.update(zip(missing, await asyncio.gather(*(probe(url) for url in missing))))
+
+    problems = []
+    for video_url, platforms in targets.items():
+        result = results[video_url]
+        if isinstance(result, media_probe.ProbeError):
+            problems.append({"video_url": video_url, "platform": None, "problems": [str(result)]})
+        elif isinstance(result, Exception):
+            logger.warning("Could not probe %s at task creation: %s", video_url, result)
+        else:
+            for platform, limits in sorted(platforms.items()):
+                found = media_probe.check(result, limits)
+                if found:
+                    problems.append({"video_url": video_url, "platform": platform, "problems": found})
+    if problems:
+        raise HTTPException(status_code=422, detail={"message": "Video rejected by media checks", "videos": problems})
+
+
+async def _create_tasks(data: TaskCreate, user_id: str) -> list[dict]:
     import secrets as _secrets
     import uuid
 
@@ -87,85 +283,94 @@ async def create_task(data: TaskCreate, user_id: str = Depends(get_current_user)
     # Build account lookup by id
     accounts_by_id = {a["id"]: a for a in accounts_result.data}
 
-    created_tasks = []
-
-    for video_idx, video_url in enumerate(video_list):
-        share_id = _secrets.token_urlsafe(16)
+    if data.content_type == "video":
+        await _validate_media(data, video_list, accounts_by_id)
+    publishes = sum(len(_accounts_for_video(data, video_list, i)) for i in range(len(video_list)))
+    admission.charge_publishes(user_id, publishes)
+    written = 0  # Task accounts inserted; if a write fails, the rest of the charge is refunded
 
-        # Determine accounts for this task based on distribution mode
-        if data.distribution_mode == "one_to_one" and len(video_list) > 1:
-            # Round-robin: assign one account per video
-            account_idx = video_idx % len(data.account_ids)
-            task_account_ids = [data.account_ids[account_idx]]
-        else:
-            # Broadcast: all accounts
-            task_account_ids = data.account_ids
-
-        task_data = {
-            "user_id": user_id,
-            "title": data.title,
-            "description": data.description,
-            "content_type": data.content_type,
-            "video_url": video_url,
-            "image_urls": data.image_urls,
-            "article_content": data.article_content,
-            "cover_url": data.cover_url,
-            "visibility": data.visibility,
-            "ai_content": data.ai_content,
-            "topics": data.topics,
-            "distribution_mode": data.distribution_mode,
-            "batch_id": batch_id,
-            "status": initial_status,
-            "share_id": share_id,
-        }
-        if is_scheduled:
-            task_data["scheduled_at"] = data.scheduled_at.isoformat()
-
-        task_result = supabase_admin.table("publish_tasks").insert(task_data).execute()
-        task = task_result.data[0]
-        task_id = task["id"]
-
-        # Create task_accounts with per-account overrides
-        task_accounts = []
-        for account_id in task_account_ids:
-            account = accounts_by_id[account_id]
-            config = data.account_configs.get(account_id)
-
-            ta_data = {
-                "task_id": task_id,
-                "account_id": account_id,
-                "status": "pending",
+    created_tasks = []
+    try:
+        for video_idx, video_url in enumerate(video_list):
+            share_id = _secrets.token_urlsafe(16)
+
+            task_account_ids = _accounts_for_video(data, video_list, video_idx)
+
+            task_data = {
+                "user_id": user_id,
+                "title": data.title,
+                "description": data.description,
+                "content_type": data.content_type,
+                "video_url": video_url,
+                "image_urls": data.image_urls,
+                "article_content": data.article_content,
+                "cover_url": data.cover_url,
+                "visibility": data.visibility,
+                "ai_content": data.ai_content,
+                "topics": data.topics,
+                "distribution_mode": data.distribution_mode,
+                "batch_id": batch_id,
+                "status": initial_status,
+                "share_id": share_id,
             }
-            if config:
-                if config.title is not None:
-                    ta_data["title"] = config.title
-                if config.description is not None:
-                    ta_data["description"] = config.description
-                if config.topics is not None:
-                    ta_data["topics"] = config.topics
-
-            ta_result = supabase_admin.table("task_accounts").insert(ta_data).execute()
-            task_accounts.append({
-                **ta_result.data[0],
-                "username": account["username"],
-                "avatar_url": account["avatar_url"],
-            })
-
-        created_tasks.append({
-            **task,
-            "accounts": [
-                {
-                    "account_id": ta["account_id"],
-                    "username": ta["username"],
-                    "avatar_url": ta["avatar_url"],
-                    "status": ta["status"],
-                    "error_message": None,
-                    "published_url": None,
+            if is_scheduled:
+                task_data["scheduled_at"] = data.scheduled_at.isoformat()
+
+            task_result = supabase_admin.table("publish_tasks").insert(task_data).execute()
+            task = task_result.data[0]
+            task_id = task["id"]
+
+            # Create task_accounts with per-account overrides
+            task_accounts = []
+            for account_id in task_account_ids:
+                account = accounts_by_id[account_id]
+                config = data.account_configs.get(account_id)
+
+                ta_data = {
+                    "task_id": task_id,
+                    "account_id": account_id,
+                    "status": "pending",
                 }
-                for ta in task_accounts
-            ],
-        })
-
+                if config:
+                    if config.title is not None:
+                        ta_data["title"] = config.title
+                    if config.description is not None:
+                        ta_data["description"] = config.description
+                    if config.topics is not None:
+                        ta_data["topics"] = config.topics
+
+                ta_result = supabase_admin.table("task_accounts").insert(ta_data).execute()
+                written += 1
+                task_accounts.append({
+                    **ta_result.data[0],
+                    "username": account["username"],
+                    "avatar_url": account["avatar_url"],
+                    "avatar_hash": account.get("avatar_hash"),
+                })
+
+            created_tasks.append({
+                **task,
+                "accounts": [
+                    {
+                        "account_id": ta["account_id"],
+                        "username": ta["username"],
+                        "avatar_url": ta["avatar_url"],
+                        "avatar_hash": ta["avatar_hash"],
+                        "status": ta["status"],
+                        "error_message": None,
+                        "published_url": None,
+                    }
+                    for ta in task_accounts
+                ],
+            })
+    except Exception:
+        admission.refund_publishes(user_id, publishes - written)
+        raise
+
+    topics.record(user_id, [
+        *data.topics,
+        *(topic for config in data.account_configs.values() for topic in config.topics or ()),
+    ])
     return created_tasks
 
 
@@ -192,102 +397,60 @@ async def cancel_task(task_id: str, user_id: str = Depends(get_current_user)):
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }).eq("id", task_id).execute()
 
-    # Get updated task with accounts
-    updated_task = supabase_admin.table("publish_tasks").select("*").eq(
-        "id", task_id
-    ).execute()
+    return _summary(task_id, user_id)
 
-    task_accounts_result = supabase_admin.table("task_accounts").select(
-        "*, social_accounts(username, avatar_url)"
-    ).eq("task_id", task_id).execute()
 
-    accounts = [
-        {
-            "account_id": ta["account_id"],
-            "username": ta["social_accounts"]["username"] if ta.get("social_accounts") else "Unknown",
-            "avatar_url": ta["social_accounts"]["avatar_url"] if ta.get("social_accounts") else None,
-            "status": ta["status"],
-            "error_message": ta.get("error_message"),
-            "published_url": ta.get("published_url"),
-        }
-        for ta in task_accounts_result.data
-    ]
+def _summary(task_id: str, user_id: str) -> dict:
+    """A task with its accounts from the task_summaries read model (migration 009)."""
+    result = supabase_admin.table("task_summaries").select("summary").eq(
+        "task_id", task_id
+    ).eq("user_id", user_id).execute()
 
-    return {**updated_task.data[0], "accounts": accounts}
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return result.data[0]["summary"]
 
 
 @router.get("", response_model=list[TaskResponse])
 async def list_tasks(user_id: str = Depends(get_current_user)):
     """Get all tasks for the current user."""
 
-    # Get tasks
-    tasks_result = supabase_admin.table("publish_tasks").select("*").eq(
+    result = supabase_admin.table("task_summaries").select("summary").eq(
         "user_id", user_id
     ).order("created_at", desc=True).limit(50).execute()
 
-    if not tasks_result.data:
-        return []
-
-    # Get task_accounts for all tasks
-    task_ids = [t["id"] for t in tasks_result.data]
-    task_accounts_result = supabase_admin.table("task_accounts").select(
-        "*, social_accounts(username, avatar_url)"
-    ).in_("task_id", task_ids).execute()
-
-    # Group task_accounts by task_id
-    task_accounts_map: dict[str, list] = {}
-    for ta in task_accounts_result.data:
-        tid = ta["task_id"]
-        if tid not in task_accounts_map:
-            task_accounts_map[tid] = []
-        task_accounts_map[tid].append({
-            "account_id": ta["account_id"],
-            "username": ta["social_accounts"]["username"] if ta.get("social_accounts") else "Unknown",
-            "avatar_url": ta["social_accounts"]["avatar_url"] if ta.get("social_accounts") else None,
-            "status": ta["status"],
-            "error_message": ta.get("error_message"),
-            "published_url": ta.get("published_url"),
-        })
-
-    # Build response
-    return [
-        {
-            **task,
-            "accounts": task_accounts_map.get(task["id"], []),
-        }
-        for task in tasks_result.data
-    ]
+    return [row["summary"] for row in result.data]
 
 
-@router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: str, user_id: str = Depends(get_current_user)):
-    """Get a single task with its accounts."""
+@router.get("/archive", response_model=list[TaskResponse])
+async def list_archived_tasks(
+    before: Optional[datetime] = Query(None, description="Only tasks created before this time (the last created_at of the previous page)"),
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(get_current_user),
+):
+    """Page through tasks moved to the archive, newest first."""
+    return archive.page(user_id, before.isoformat() if before else None, limit)
 
-    # Get task
-    task_result = supabase_admin.table("publish_tasks").select("*").eq(
-        "id", task_id
-    ).eq("user_id", user_id).execute()
 
-    if not task_result.data:
-        raise HTTPException(status_code=404, detail="Task not found")
+@router.get("/{task_id}/transfers", response_model=list[TransferProgressResponse])
+async def get_task_transfers(task_id: str, user_id: str = Depends(get_current_user)):
+    """Byte-level progress and throughput of the task's per-account transfers."""
+    try:
+        _summary(task_id, user_id)
+    except HTTPException:
+        if archive.get(task_id, user_id) is None:
+            raise
+        return []  # Progress rows go with the task when it is archived
+    return transfer_progress.for_task(task_id)
 
-    task = task_result.data[0]
 
-    # Get task_accounts
-    task_accounts_result = supabase_admin.table("task_accounts").select(
-        "*, social_accounts(username, avatar_url)"
-    ).eq("task_id", task_id).execute()
-
-    accounts = [
-        {
-            "account_id": ta["account_id"],
-            "username": ta["social_accounts"]["username"] if ta.get("social_accounts") else "Unknown",
-            "avatar_url": ta["social_accounts"]["avatar_url"] if ta.get("social_accounts") else None,
-            "status": ta["status"],
-            "error_message": ta.get("error_message"),
-            "published_url": ta.get("published_url"),
-        }
-        for ta in task_accounts_result.data
-    ]
-
-    return {**task, "accounts": accounts}
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(task_id: str, user_id: str = Depends(get_current_user)):
+    """Get a single task with its accounts; archived tasks are looked up in the archive."""
+    try:
+        return _summary(task_id, user_id)
+    except HTTPException:
+        archived = archive.get(task_id, user_id)
+        if archived is None:
+            raise
+        return archived
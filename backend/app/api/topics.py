@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, Query
+from app.core.auth import get_current_user
+from app.models.schemas import TopicSuggestion
+from app.services import topics
+
+router = APIRouter(prefix="/api/topics", tags=["topics"])
+
+
+@router.get("/suggest", response_model=list[TopicSuggestion])
+async def suggest_topics(
+    q: str = Query("", max_length=100, description="Typed prefix; a leading # is ignored"),
+    limit: int = Query(10, ge=1, le=50),
+    user_id: str = Depends(get_current_user),
+):
+    """Topics the user has used before that start with ``q``, most used recently first."""
+    return topics.suggest(user_id, q, limit)
@@ -0,0 +1,315 @@
+"""
+Admission control: per-user rate limits, publish budgets and load shedding.
+
+Requests are classified by method and path before routing (see _classify)
+and checked, cheapest refusal first:
+
+1. Load shedding (503): more than ADMISSION_MAX_IN_FLIGHT admitted requests
+   are running, or, for publish / import, the fair publish queue already has
+   more than ADMISSION_MAX_QUEUE_DEPTH jobs waiting for a slot.
+2. Concurrency caps (503): expensive classes (ADMISSION_CONCURRENCY) run at
+   most N at a time across all users.
+3. Token buckets (429): one per (user, class), ADMISSION_RATES tokens per
+   second up to a burst. Users are keyed by the ``sub`` of their bearer
+   token once its HS256 signature checks out against SUPABASE_JWT_SECRET
+   (authentication proper happens later, in the route), so a forged token
+   can neither dodge its own buckets nor drain someone else's. Anonymous
+   callers, and every caller when no secret is set (warned at startup), are
+   keyed by address: the client's, as reported by X-Forwarded-For or
+   X-Real-IP when the peer is one of ADMISSION_TRUSTED_PROXIES (the
+   /api rewrite in front of the API), else the peer's.
+
+Refusals carry Retry-After; admitted requests get RateLimit-Limit /
+RateLimit-Remaining for their class. Separately, create, import and
+retry-failed charge per-account publishes against a daily budget per plan
+(charge_publishes), and refund what they end up not writing.
+State is in memory, so limits apply per API process.
+"""
+import json
+import logging
+import math
+import re
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from app.core.config import admission_concurrency, admission_rates, publish_budgets, settings, trusted_proxies
+from app.core.metrics import Counter, Gauge
+from app.services.fair_queue import fair_queue, plan_for
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests refused by admission control.", ("class", "reason"),
+)
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests running, per class.", ("class",))
+
+# (method, path pattern, class); unlisted paths are read (GET / HEAD) or write
+_ROUTES = [
+    ("POST", re.compile(r"/api/tasks/?"), "publish"),
+    ("POST", re.compile(r"/api/tasks/import/?"), "import"),
+    ("POST", re.compile(r"/api/tasks/batches/[^/]+/retry-failed/?"), "publish"),
+    ("GET", re.compile(r"/api/tasks/export/?"), "export"),
+    ("GET", re.compile(r"/api/share/douyin/[^/]+/?"), "share"),
+]
+# Health checks, platform callbacks and immutable avatar images are never limited
+_EXEMPT = re.compile(r"/(health|metrics|docs|redoc|openapi\.json)?$|/api/share/webhook/|/api/auth/[^/]+/callback|/api/avatars/")
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens; returns 0, or the seconds until they will be available."""
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        if amount > self.capacity or self.rate <= 0:
+            return math.inf
+        return (amount - self.tokens) / self.rate
+
+    def remaining(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def give(self, amount: float):
+        """Return ``amount`` taken tokens, up to capacity."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def full(self) -> bool:
+        return self.remaining() >= self.capacity
+
+
+_buckets: dict[tuple[str, str], TokenBucket] = {}  # (user key, class) -> bucket
+_budgets: dict[str, TokenBucket] = {}  # user id -> per-account publishes left today
+_in_flight = 0  # Admitted requests running, all classes
+
+
+def _prune(buckets: dict):
+    # Full buckets carry no state; dropping them bounds memory to recently active users
+    if len(buckets) > settings.ADMISSION_MAX_TRACKED_KEYS:
+        for key in [key for key, bucket in buckets.items() if bucket.full()]:
+            del buckets[key]
+
+
+def _bucket(key: str, cls: str) -> TokenBucket:
+    bucket = _buckets.get((key, cls))
+    if bucket is None:
+        _prune(_buckets)
+        rate, burst = admission_rates[cls]
+        bucket = _buckets[(key, cls)] = TokenBucket(rate, burst)
+    return bucket
+
+
+def _budget(user_id: str) -> TokenBucket:
+    bucket = _budgets.get(user_id)
+    if bucket is None:
+        _prune(_budgets)
+        per_day = publish_budgets.get(plan_for(user_id), publish_budgets.get(settings.DEFAULT_PLAN, 0))
+        bucket = _budgets[user_id] = TokenBucket(per_day / 86400, per_day)
+    return bucket
+
+
+def _classify(method: str, path: str) -> Optional[str]:
+    if method == "OPTIONS" or _EXEMPT.match(path):
+        return None
+    for route_method, pattern, cls in _ROUTES:
+        if method == route_method and pattern.fullmatch(path):
+            return cls
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+def _verified_sub(scope) -> Optional[str]:
+    """``sub`` of the bearer token if it is signed with the project's JWT secret and unexpired."""
+    if not settings.SUPABASE_JWT_SECRET:
+        return None
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            token = value.decode("latin-1").removeprefix("Bearer ").strip()
+            try:
+                claims = jwt.decode(
+                    token, settings.SUPABASE_JWT_SECRET, algorithms=["HS256"], options={"verify_aud": False},
+                )
+            except JWTError:
+                return None
+            return str(claims["sub"]) if claims.get("sub") else None
+    return None
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _client_address(scope) -> str:
+    """The caller's address, taken from the forwarding headers only when a trusted proxy sent them."""
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if peer not in trusted_proxies and "*" not in trusted_proxies:
+        return peer
+    forwarded = _header(scope, b"x-forwarded-for")
+    if forwarded:
+        # Rightmost hop not added by one of our proxies; anything left of it is client-supplied
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if hop not in trusted_proxies:
+                return hop
+    return (_header(scope, b"x-real-ip") or peer).strip()
+
+
+def _user_key(scope) -> str:
+    return _verified_sub(scope) or f"ip:{_client_address(scope)}"
+
+
+def check_keying():
+    """Warn at startup when rate limits cannot tell users apart."""
+    if not settings.ADMISSION_ENABLED:
+        return
+    if not settings.SUPABASE_JWT_SECRET:
+        logger.warning(
+            "SUPABASE_JWT_SECRET is not set: admission keys every caller by address, "
+            "so users behind one address share their rate limits"
+        )
+    if not trusted_proxies:
+        logger.warning(
+            "ADMISSION_TRUSTED_PROXIES is not set: callers reaching the API through a proxy "
+            "are keyed by the proxy's address"
+        )
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def charge_publishes(user_id: str, count: int):
+    """Charge ``count`` per-account publishes to the user's daily plan budget; 429 when it is spent."""
+    if count <= 0 or not settings.ADMISSION_ENABLED:
+        return
+    budget = _budget(user_id)
+    wait = budget.take(count)
+    if wait:
+        ADMISSION_REJECTIONS.inc("publish", "budget")
+        detail = (
+            f"Publish budget exceeded: {count} publishes requested, "
+            f"{int(budget.tokens)} of {int(budget.capacity)} per day left on the {plan_for(user_id)} plan"
+        )
+        headers = {} if math.isinf(wait) else {"Retry-After": _retry_after(wait)}
+        raise HTTPException(status_code=429, detail=detail, headers=headers)
+
+
+def refund_publishes(user_id: str, count: int):
+    """Give back publishes charged for rows that were not written after all."""
+    if count <= 0 or not settings.ADMISSION_ENABLED:
+        return
+    budget = _budgets.get(user_id)
+    if budget is not None:
+        budget.give(count)
+
+
+def limits_for(user_id: str, scope) -> dict:
+    """The caller's limits and what is left of them, plus the current load."""
+    key = _user_key(scope)  # The buckets' key, as the middleware computed it for this request
+    classes = {}
+    for cls, (rate, burst) in admission_rates.items():
+        bucket = _buckets.get((key, cls))
+        classes[cls] = {
+            "rate_per_second": rate,
+            "burst": burst,
+            "remaining": math.floor(bucket.remaining()) if bucket else int(burst),
+            "max_concurrent": admission_concurrency.get(cls),
+            "running": int(ADMISSION_IN_FLIGHT.labels(cls).value),
+        }
+    budget = _budget(user_id)
+    return {
+        "plan": plan_for(user_id),
+        "classes": classes,
+        "publish_budget": {"per_day": int(budget.capacity), "remaining": math.floor(budget.remaining())},
+        "shedding": {
+            "max_in_flight": settings.ADMISSION_MAX_IN_FLIGHT,
+            "in_flight": _in_flight,
+            "max_queue_depth": settings.ADMISSION_MAX_QUEUE_DEPTH,
+            "queue_depth": fair_queue.waiting(),
+        },
+    }
+
+
+async def _refuse(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", _retry_after(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Refuses requests over their rate limit (429) or while the API is overloaded (503)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        cls = _classify(scope["method"], scope["path"]) if scope["type"] == "http" and settings.ADMISSION_ENABLED else None
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        if _in_flight >= settings.ADMISSION_MAX_IN_FLIGHT:
+            ADMISSION_REJECTIONS.inc(cls, "overloaded")
+            await _refuse(send, 503, "Server busy, retry shortly", 1)
+            return
+        if cls in ("publish", "import") and fair_queue.waiting() > settings.ADMISSION_MAX_QUEUE_DEPTH:
+            ADMISSION_REJECTIONS.inc(cls, "queue_full")
+            await _refuse(send, 503, "Publish queue is full, retry later", settings.ADMISSION_QUEUE_RETRY_SECONDS)
+            return
+        cap = admission_concurrency.get(cls)
+        if cap is not None and ADMISSION_IN_FLIGHT.labels(cls).value >= cap:
+            ADMISSION_REJECTIONS.inc(cls, "concurrency")
+            await _refuse(send, 503, f"Too many {cls} requests running, retry shortly", 1)
+            return
+        bucket = _bucket(_user_key(scope), cls)
+        wait = bucket.take()
+        if wait:
+            ADMISSION_REJECTIONS.inc(cls, "rate")
+            await _refuse(send, 429, f"Rate limit exceeded for {cls} requests", wait)
+            return
+
+        async def send_with_limits(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"ratelimit-limit", str(int(bucket.capacity)).encode()),
+                    (b"ratelimit-remaining", str(math.floor(bucket.tokens)).encode()),
+                ]
+            await send(message)
+
+        _in_flight += 1
+        ADMISSION_IN_FLIGHT.inc(cls)
+        try:
+            await self.app(scope, receive, send_with_limits)
+        finally:
+            _in_flight -= 1
+            ADMISSION_IN_FLIGHT.dec(cls)
@@ -1,5 +1,6 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.config import admin_user_ids
 from app.core.supabase import supabase
 
 security = HTTPBearer()
@@ -27,3 +28,13 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Authentication failed: {str(e)}",
         )
+
+
+async def require_admin(user_id: str = Depends(get_current_user)) -> str:
+    """Allow only users listed in ADMIN_USER_IDS."""
+    if user_id not in admin_user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return user_id
@@ -6,6 +6,11 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: str  # Service role key for admin operations
+    SUPABASE_JWT_SECRET: str = ""  # Project JWT secret; unset, admission keys every caller by address
+
+    # Database: "supabase" (PostgREST) or "sqlite" (embedded, single node; see app/core/sqlite.py)
+    DATABASE_BACKEND: str = "supabase"
+    SQLITE_PATH: str = "mediahub.db"
 
     # Douyin OAuth
     DOUYIN_CLIENT_KEY: str
@@ -15,9 +20,125 @@ class Settings(BaseSettings):
     # App
     FRONTEND_URL: str = "http://localhost:5173"
     SECRET_KEY: str = "change-me-in-production"
+    ENABLE_LOOPBACK_PLATFORM: bool = False  # Register the fault-injecting test adapter
+
+    # Publishing
+    PUBLISH_MAX_ATTEMPTS: int = 3  # Attempts per account for retryable platform errors
+    PUBLISH_RETRY_BASE_DELAY: float = 2.0  # Seconds; doubled per attempt unless the platform says otherwise
+
+    # Fair queueing of publish work across users (deficit round-robin)
+    PUBLISH_SLOTS: int = 16  # Concurrent publishes / batch uploads across all users
+    PLAN_WEIGHTS: str = "free:1,pro:4,business:8"  # plan:weight; slots handed out per round
+    USER_PLANS: str = ""  # Comma-separated user_id:plan; unlisted users are on DEFAULT_PLAN
+    DEFAULT_PLAN: str = "free"
+    PUBLISH_MAX_QUEUE_WAIT_SECONDS: float = 300.0  # Jobs waiting longer are served next regardless of weight
+
+    # Deadlines (see app/core/deadline.py)
+    REQUEST_DEADLINE_SECONDS: float = 30.0  # Until an API response starts; clients may ask for less (X-Request-Timeout)
+    PUBLISH_DEADLINE_SECONDS: float = 1800.0  # One account's publish, or one pipeline stage of it, retries included
+
+    # Admission control (per API process; see app/core/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_RATES: str = "read:20/60,write:5/20,publish:1/10,import:0.1/2,export:0.05/2,share:2/10"  # class:per second/burst
+    ADMISSION_CONCURRENCY: str = "import:4,export:4"  # class:requests running at once across all users
+    ADMISSION_MAX_IN_FLIGHT: int = 256  # Admitted requests running before new ones get 503
+    ADMISSION_MAX_QUEUE_DEPTH: int = 2000  # Publish jobs waiting for a slot before publish / import get 503
+    ADMISSION_QUEUE_RETRY_SECONDS: int = 30
+    ADMISSION_MAX_TRACKED_KEYS: int = 50000  # Buckets kept before idle (full) ones are dropped
+    ADMISSION_TRUSTED_PROXIES: str = ""  # Comma-separated peer addresses whose X-Forwarded-For / X-Real-IP is used; * trusts any
+    PLAN_PUBLISH_BUDGETS: str = "free:200,pro:2000,business:10000"  # plan:per-account publishes per day
+
+    # Media transfer to platforms
+    SIGNED_URL_TTL_SECONDS: int = 900  # Lifetime of storage URLs handed to platforms that pull
+    TRANSFER_PART_BYTES: int = 8 * 1024 * 1024  # Chunk size for streamed and multi-part uploads
+    TRANSFER_SAMPLE_SECONDS: float = 1.0  # Window of the instantaneous throughput of a transfer
+    TRANSFER_PROGRESS_FLUSH_SECONDS: int = 5  # How often changed transfer progress is written
+
+    # Media probing (container header only, via ranged requests)
+    MEDIA_PROBE_ENABLED: bool = True
+    MEDIA_PROBE_WORKERS: int = 2  # Processes parsing headers
+    MEDIA_PROBE_HEAD_BYTES: int = 256 * 1024  # First read; covers faststart files
+    MEDIA_PROBE_MAX_MOOV_BYTES: int = 32 * 1024 * 1024
+    MEDIA_PROBE_CACHE_SIZE: int = 2048
+
+    # Image normalization for image_text posts and covers
+    IMAGE_WORKERS: int = 2  # Processes decoding / resizing / recompressing
+    IMAGE_UPLOAD_CONCURRENCY: int = 4  # Images of one post fetched, rendered and uploaded at once
+    IMAGE_MAX_SOURCE_BYTES: int = 30 * 1024 * 1024
+    IMAGE_CACHE_BYTES: int = 64 * 1024 * 1024  # Rendered images kept, keyed by source hash and spec
+
+    # Dashboard statistics rollups
+    STATS_TIMEZONE: str = "Asia/Shanghai"  # Day boundaries of publish_stats_daily; changing it recounts history at startup
+
+    # Topic autocomplete (per-user in-memory prefix index)
+    TOPIC_INDEX_MAX_USERS: int = 5000  # Least recently active users' indexes are dropped beyond this
+    TOPIC_HISTORY_TASKS: int = 500  # Latest tasks an index is built from
+    TOPIC_HALF_LIFE_DAYS: float = 30.0  # A topic's score halves after this long without use
+
+    # Publish history export
+    EXPORT_PAGE_SIZE: int = 500  # Tasks read (and encoded) per keyset page
+    EXPORT_ACCOUNTS_PAGE_SIZE: int = 1000  # task_accounts rows per read; at most PostgREST's max_rows
+
+    # Hot/cold tiering: finished tasks move to task_archive (migration 010)
+    ARCHIVE_AFTER_DAYS: int = 90  # Since the task's last update; 0 disables archiving
+    ARCHIVE_BATCH_SIZE: int = 500  # Tasks moved per archive_tasks call
+    ARCHIVE_BATCH_PAUSE_SECONDS: float = 2.0  # Between batches, so archiving never saturates the database
+    ARCHIVE_MAX_BATCHES: int = 50  # Per run; the rest waits for the next run
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # Avatar proxy (platform avatars cached on local disk, served as thumbnails)
+    PUBLIC_API_URL: str = ""  # Origin prefixed to proxy URLs; empty = root-relative (/api/...)
+    AVATAR_CACHE_DIR: str = ".cache/avatars"
+    AVATAR_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # Originals and thumbnails; least recently used evicted
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_SIZES: str = "48,96,192"  # Thumbnail edge lengths that may be requested
+    AVATAR_DEFAULT_SIZE: int = 96  # Used in API responses
+
+    # Batch publish pipeline (workers per stage; queue size bounds fetched videos held in memory)
+    PIPELINE_FETCH_CONCURRENCY: int = 2
+    PIPELINE_UPLOAD_CONCURRENCY: int = 4
+    PIPELINE_CREATE_CONCURRENCY: int = 4
+    PIPELINE_QUEUE_SIZE: int = 4
+
+    # Idempotency-Key replay store
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+
+    # Bulk NDJSON task import
+    IMPORT_BATCH_SIZE: int = 100  # Items per insert round trip
+    IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # Circuit breakers (per platform endpoint)
+    CIRCUIT_WINDOW_SECONDS: float = 120.0
+    CIRCUIT_MIN_CALLS: int = 5
+    CIRCUIT_ERROR_THRESHOLD: float = 0.5  # Failure share that opens the breaker
+    CIRCUIT_SLOW_CALL_SECONDS: float = 120.0  # Calls slower than this count as failures
+    CIRCUIT_OPEN_SECONDS: float = 60.0
+    CIRCUIT_HALF_OPEN_PROBES: int = 2
+
+    ADMIN_USER_IDS: str = ""  # Comma-separated Supabase user ids allowed to use /api/admin
 
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
+
+admin_user_ids = {uid.strip() for uid in settings.ADMIN_USER_IDS.split(",") if uid.strip()}
+
+
+def _pairs(value: str) -> dict[str, str]:
+    pairs = (item.split(":", 1) for item in value.split(",") if ":" in item)
+    return {key.strip(): val.strip() for key, val in pairs}
+
+
+plan_weights = {plan: float(weight) for plan, weight in _pairs(settings.PLAN_WEIGHTS).items()}
+user_plans = _pairs(settings.USER_PLANS)
+admission_rates = {
+    cls: (float(rate), float(burst))
+    for cls, (rate, burst) in ((cls, limit.split("/", 1)) for cls, limit in _pairs(settings.ADMISSION_RATES).items())
+}
+admission_concurrency = {cls: int(limit) for cls, limit in _pairs(settings.ADMISSION_CONCURRENCY).items()}
+trusted_proxies = {addr.strip() for addr in settings.ADMISSION_TRUSTED_PROXIES.split(",") if addr.strip()}
+publish_budgets = {plan: int(budget) for plan, budget in _pairs(settings.PLAN_PUBLISH_BUDGETS).items()}
+avatar_sizes = {int(size) for size in settings.AVATAR_SIZES.split(",") if size.strip()}
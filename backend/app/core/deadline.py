@@ -0,0 +1,158 @@
+"""
+Request-scoped deadlines.
+
+A deadline is an absolute time.monotonic() value held in a ContextVar. The
+API sets one per request (DeadlineMiddleware: REQUEST_DEADLINE_SECONDS, or
+less if the client says so in X-Request-Timeout); background jobs start
+their own (start()). asyncio tasks and asyncio.to_thread copy the context,
+so everything a request or job calls sees it:
+
+- outbound calls use timeout(default) - the default capped to the time left -
+  and are refused with DeadlineExceeded once nothing is left (Supabase calls
+  through DeadlineTransport, platform and storage calls where their httpx
+  clients are created);
+- enforce() cancels the async work inside it when the deadline passes.
+
+Once an API response has started (streamed exports and imports), the
+deadline is lifted: the client is consuming at its own pace, and Starlette
+cancels the stream if it disconnects.
+"""
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The work's deadline passed; nobody is waiting for the result any more."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout(default: Optional[float]) -> Optional[float]:
+    """``default`` capped to the time left; raises DeadlineExceeded once it has passed."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return left if default is None else min(default, left)
+
+
+@contextmanager
+def start(seconds: float):
+    """A fresh deadline for background work, detached from whatever started it."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@asynccontextmanager
+async def enforce():
+    """Cancel the block when the current deadline passes, raising DeadlineExceeded."""
+    left = remaining()
+    if left is None:
+        yield
+        return
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    limit = asyncio.timeout(left)
+    try:
+        async with limit:
+            yield
+    except TimeoutError:
+        if not limit.expired():
+            raise
+        raise DeadlineExceeded(f"Deadline of {left:.1f}s exceeded") from None
+
+
+class DeadlineTransport(httpx.BaseTransport):
+    """Sync httpx transport that gives every request the time left as its timeouts."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if _deadline.get() is not None:
+            configured = request.extensions.get("timeout", {})
+            request.extensions["timeout"] = {key: timeout(value) for key, value in configured.items()}
+        return self._transport.handle_request(request)
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        self._transport.__exit__(*args)
+
+
+def _requested(scope) -> float:
+    seconds = settings.REQUEST_DEADLINE_SECONDS
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-timeout":
+            try:
+                asked = float(value)
+            except ValueError:
+                break
+            if asked > 0:
+                seconds = min(seconds, asked)
+            break
+    return seconds
+
+
+class DeadlineMiddleware:
+    """Runs each request under a deadline; 504 if it passes before the response starts."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = _requested(scope)
+        started = False
+        token = _deadline.set(time.monotonic() + seconds)
+        limit = asyncio.timeout(seconds)
+
+        async def send_started(message):
+            nonlocal started
+            if message["type"] == "http.response.start" and not started:
+                started = True
+                limit.reschedule(None)
+                _deadline.set(None)  # In the task streaming the body
+            await send(message)
+
+        try:
+            async with limit:
+                await self.app(scope, receive, send_started)
+        except TimeoutError as e:
+            if started or not (limit.expired() or isinstance(e, DeadlineExceeded)):
+                raise
+            body = json.dumps({"detail": f"Request deadline of {seconds:g}s exceeded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            _deadline.reset(token)
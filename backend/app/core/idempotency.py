@@ -0,0 +1,121 @@
+"""
+Idempotency-Key support for retried POSTs.
+
+The first request with a given (user, key) runs the handler; its result is
+kept for IDEMPOTENCY_TTL_SECONDS. A retry that arrives while the first one is
+still running waits for it, and later retries get the stored result without
+touching the database. Reusing a key with a different body is rejected.
+
+Entries live in process memory (bounded LRU), like the OAuth state store;
+deployments with several workers should pin clients or move this to Redis.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+MAX_KEY_LENGTH = 255
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires_at")
+
+    def __init__(self, fingerprint: str, future: asyncio.Future, expires_at: float):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+
+    def _get(self, key: tuple[str, str]):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.future.done() and time.monotonic() > entry.expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if not oldest.future.done():
+                break  # Never drop a request that is still running
+            del self._entries[oldest_key]
+
+    async def run(
+        self, user_id: str, key: str, fingerprint: str, handler: Callable[[], Awaitable[Any]],
+    ) -> tuple[Any, bool]:
+        """Run ``handler`` once per (user_id, key). Returns (result, replayed)."""
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+        store_key = (user_id, key)
+
+        while True:
+            entry = self._get(store_key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used with a different request body",
+                )
+            try:
+                return await asyncio.shield(entry.future), True
+            except HTTPException:
+                raise  # Client errors are part of the stored outcome
+            except BaseException:
+                # The original attempt failed or was cancelled and has been forgotten; run it ourselves
+                if self._entries.get(store_key) is entry:
+                    del self._entries[store_key]
+
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry(fingerprint, future, 0.0)
+        self._entries[store_key] = entry
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                self._forget(store_key, entry, e)
+                raise
+            self._complete(entry, exception=e)
+            raise
+        except BaseException as e:
+            self._forget(store_key, entry, e)
+            raise
+        self._complete(entry, result=result)
+        return result, False
+
+    def _complete(self, entry: _Entry, result: Any = None, exception: BaseException = None):
+        entry.expires_at = time.monotonic() + self.ttl
+        if exception is not None:
+            entry.future.set_exception(exception)
+            entry.future.exception()  # Mark retrieved so asyncio does not warn when nobody retries
+        else:
+            entry.future.set_result(result)
+        self._evict()
+
+    def _forget(self, store_key: tuple[str, str], entry: _Entry, exception: BaseException):
+        if self._entries.get(store_key) is entry:
+            del self._entries[store_key]
+        if not entry.future.done():
+            entry.future.set_exception(RuntimeError(f"Original request failed: {exception!r}"))
+            entry.future.exception()
+
+
+def fingerprint(payload: str) -> str:
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_ENTRIES)
@@ -0,0 +1,297 @@
+"""
+In-process Prometheus-style metrics.
+
+Recording is a dict lookup plus a couple of integer/float increments on
+pre-allocated slots: no locks, no per-observation allocation once a label
+combination has been seen. The event loop runs single-threaded, so plain
+increments are safe there; the few threadpool callers (sync endpoints) may
+at worst lose an increment under contention, which is acceptable for metrics.
+"""
+import time
+from bisect import bisect_left
+
+import httpx
+
+# Latency buckets (seconds) wide enough to cover PostgREST calls and 300s uploads
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+_registry: list = []
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child for a label combination (created once, then cached)."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self.labels(*labelvalues).value += amount
+
+    def _samples(self):
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.labels(*labelvalues).value -= amount
+
+    def set(self, value: float, *labelvalues):
+        self.labels(*labelvalues).value = value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render_latest() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ── Metric definitions ──────────────────────────────────────
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route template.", ("method", "route"),
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "API requests by route template and status code.", ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "API requests currently being served.")
+
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to Supabase and platform APIs.", ("operation",),
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Upstream calls that raised.", ("operation",),
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight", "Upstream calls currently outstanding.", ("operation",),
+)
+
+PUBLISH_RESULTS = Counter(
+    "publish_results_total", "Per-account publish outcomes.", ("platform", "result"),
+)
+PUBLISH_RETRIES = Counter(
+    "publish_retries_total", "Publish attempts retried after a retryable platform error.", ("platform",),
+)
+PUBLISH_IN_FLIGHT = Gauge("publish_in_flight", "Per-account publishes currently running.", ("platform",))
+
+PIPELINE_STAGE_DURATION = Histogram(
+    "publish_pipeline_stage_duration_seconds", "Time one item spent in a batch publish pipeline stage.", ("stage",),
+)
+PIPELINE_STAGE_ITEMS = Counter(
+    "publish_pipeline_stage_items_total", "Items processed per batch publish pipeline stage.", ("stage", "result"),
+)
+
+SCHEDULER_TICK_DURATION = Histogram("scheduler_tick_duration_seconds", "Duration of one scheduler poll.")
+SCHEDULER_DUE_TASKS = Gauge("scheduler_due_tasks", "Due scheduled tasks found by the last poll.")
+SCHEDULER_LAG = Histogram(
+    "scheduler_lag_seconds", "Delay between scheduled_at and the moment a task is claimed.",
+    buckets=(1.0, 5.0, 15.0, 30.0, 45.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+
+
+class track_upstream:
+    """
+    Time an upstream call. Usable as a sync or async context manager:
+    ``with track_upstream("douyin.upload"): ...``.
+    """
+
+    __slots__ = ("operation", "start")
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.start = 0.0
+
+    def __enter__(self):
+        UPSTREAM_IN_FLIGHT.labels(self.operation).value += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        UPSTREAM_DURATION.labels(self.operation).observe(time.perf_counter() - self.start)
+        UPSTREAM_IN_FLIGHT.labels(self.operation).value -= 1
+        if exc_type is not None:
+            UPSTREAM_ERRORS.labels(self.operation).value += 1
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# ── Supabase HTTP instrumentation ───────────────────────────
+
+_DB_METHODS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+
+def _operation_for(request: httpx.Request) -> str:
+    """Map a Supabase HTTP request to an operation name like ``db.publish_tasks.update``."""
+    parts = request.url.path.strip("/").split("/")
+    if len(parts) >= 3 and parts[0] == "rest":
+        if parts[2] == "rpc" and len(parts) > 3:
+            return f"db.rpc.{parts[3]}"
+        return f"db.{parts[2]}.{_DB_METHODS.get(request.method, request.method.lower())}"
+    if parts and parts[0] == "auth":
+        return "supabase.auth." + (parts[2] if len(parts) > 2 else "call")
+    if parts and parts[0] == "storage":
+        return "supabase.storage"
+    return "supabase.other"
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """httpx transport wrapper that records every Supabase call as an upstream operation."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with track_upstream(_operation_for(request)):
+            return self._transport.handle_request(request)
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        self._transport.__exit__(*args)
+
+
+# ── ASGI middleware ─────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Record latency, status and in-flight count per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.labels().value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.labels().value -= 1
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unknown paths share one label
+            route_label = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route_label).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route_label, str(status["code"])).value += 1
@@ -0,0 +1,280 @@
+"""
+On-demand profiling for production debugging.
+
+Two capture modes, both admin-only (see app/api/admin.py):
+- a timed CPU sample of the event-loop thread for N seconds
+- a one-shot capture armed for the next request matching a route and/or user
+
+CPU stacks are folded into the collapsed format understood by flamegraph.pl
+and speedscope. Request captures also record tracemalloc top allocations,
+the traced-memory peak and process peak RSS. When nothing is armed the
+middleware costs a single attribute check per request. While armed, requests
+are captured one at a time and the capture is kept only once the router has
+resolved a matching route (scope["route"]), so nothing walks app.routes.
+"""
+import asyncio
+import itertools
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from jose import jwt
+
+_MAX_PROFILES = 20
+_TOP_ALLOCATIONS = 25
+
+_ids = itertools.count(1)
+_profiles: deque = deque(maxlen=_MAX_PROFILES)
+_capture_lock = threading.Lock()  # tracemalloc and the sampler are process-wide
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # Trim interpreter / cwd prefixes to keep flamegraph labels readable
+    idx = path.rfind("site-packages" + os.sep)
+    if idx != -1:
+        path = path[idx + len("site-packages") + 1:]
+    elif path.startswith(os.getcwd()):
+        path = os.path.relpath(path)
+    return f"{code.co_qualname} ({path}:{frame.f_lineno})".replace(";", ",")
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval from a side thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[_fold(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _current_rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Capture:
+    """Owns the sampler and tracemalloc for the duration of one capture."""
+
+    def __init__(self, kind: str, interval: float, trace_memory: bool, **meta):
+        self.kind = kind
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.meta = meta
+        self.sampler: Optional[StackSampler] = None
+        self.discarded = False  # Set before exit to drop the result
+
+    def __enter__(self):
+        if not _capture_lock.acquire(blocking=False):
+            raise RuntimeError("Another profile capture is already running")
+        self.started_at = datetime.now(timezone.utc)
+        self.rss_before_kb = _current_rss_kb()
+        if self.trace_memory:
+            tracemalloc.start()
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.start = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.sampler.stop()
+            duration = time.perf_counter() - self.start
+            profile = {
+                "id": next(_ids),
+                "kind": self.kind,
+                "started_at": self.started_at.isoformat(),
+                "duration_seconds": round(duration, 4),
+                "samples": self.sampler.samples,
+                "interval_ms": self.interval * 1000,
+                "rss_before_kb": self.rss_before_kb,
+                "rss_after_kb": _current_rss_kb(),
+                "peak_rss_kb": _peak_rss_kb(),
+                "traced_peak_bytes": None,
+                "top_allocations": [],
+                **self.meta,
+            }
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                profile["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                profile["top_allocations"] = [
+                    {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:_TOP_ALLOCATIONS]
+                ]
+            profile["collapsed"] = self.sampler.collapsed()
+            if not self.discarded:
+                _profiles.append(profile)
+            self.profile = profile
+        finally:
+            _capture_lock.release()
+        return False
+
+
+async def sample_cpu(seconds: float, interval_ms: float, trace_memory: bool) -> dict:
+    """Sample the event loop thread for ``seconds`` while it keeps serving traffic."""
+    with _Capture("cpu", interval_ms / 1000, trace_memory) as capture:
+        await asyncio.sleep(seconds)
+    return capture.profile
+
+
+def list_profiles() -> list[dict]:
+    return [{k: v for k, v in p.items() if k != "collapsed"} for p in _profiles]
+
+
+def get_profile(profile_id: int) -> Optional[dict]:
+    for profile in _profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+# ── Armed request capture ───────────────────────────────────
+
+class _Trigger:
+    def __init__(self, route: Optional[str], user_id: Optional[str], expires_at: float,
+                 interval: float, trace_memory: bool):
+        self.route = route
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.interval = interval
+        self.trace_memory = trace_memory
+
+    def as_dict(self) -> dict:
+        return {
+            "route": self.route,
+            "user_id": self.user_id,
+            "expires_in_seconds": max(0, round(self.expires_at - time.monotonic(), 1)),
+            "interval_ms": self.interval * 1000,
+            "trace_memory": self.trace_memory,
+        }
+
+
+class Profiler:
+    """Holds the single armed trigger; read by ProfilingMiddleware on every request."""
+
+    def __init__(self):
+        self.armed: Optional[_Trigger] = None
+
+    def arm(self, route: Optional[str], user_id: Optional[str], ttl_seconds: float,
+            interval_ms: float, trace_memory: bool) -> dict:
+        self.armed = _Trigger(route, user_id, time.monotonic() + ttl_seconds, interval_ms / 1000, trace_memory)
+        return self.armed.as_dict()
+
+    def disarm(self):
+        self.armed = None
+
+    def status(self) -> Optional[dict]:
+        trigger = self.armed
+        if trigger and time.monotonic() > trigger.expires_at:
+            self.armed = None
+            return None
+        return trigger.as_dict() if trigger else None
+
+    def candidate(self, scope) -> Optional[_Trigger]:
+        """
+        The armed trigger if this request may match it. The route template is
+        only known once the router has run, so it is checked in ``matched``.
+        """
+        trigger = self.armed
+        if time.monotonic() > trigger.expires_at:
+            self.armed = None
+            return None
+        if trigger.user_id and _request_user(scope) != trigger.user_id:
+            return None
+        if _capture_lock.locked():
+            return None
+        return trigger
+
+    def matched(self, trigger: _Trigger, scope) -> Optional[str]:
+        """After the request: its route template (or path) if it matched ``trigger``, which is then disarmed."""
+        template = getattr(scope.get("route"), "path", None)
+        if trigger.route and trigger.route not in (template, scope["path"]):
+            return None
+        if self.armed is trigger:
+            self.armed = None  # one-shot
+        return template or scope["path"]
+
+
+profiler = Profiler()
+
+
+def _request_user(scope) -> Optional[str]:
+    """Best-effort user id from the bearer token; only used to pick which request to profile."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            token = value.decode("latin-1").removeprefix("Bearer ").strip()
+            try:
+                return jwt.get_unverified_claims(token).get("sub")
+            except Exception:
+                return None
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles the next request matching the armed trigger; a no-op otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if profiler.armed is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = profiler.candidate(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Captured on spec: kept only if the routed request turns out to match
+        meta = {"route": None, "method": scope["method"], "path": scope["path"], "user_id": trigger.user_id}
+        with _Capture("request", trigger.interval, trigger.trace_memory, **meta) as capture:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                capture.meta["route"] = profiler.matched(trigger, scope)
+                capture.discarded = capture.meta["route"] is None
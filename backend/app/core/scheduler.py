@@ -1,9 +1,12 @@
 import asyncio
 import logging
+import time
 from datetime import datetime, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from app.core.config import settings
 from app.core.supabase import supabase_admin
+from app.core.metrics import SCHEDULER_DUE_TASKS, SCHEDULER_LAG, SCHEDULER_TICK_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +16,19 @@ scheduler = AsyncIOScheduler()
 async def execute_scheduled_tasks():
     """Poll for due scheduled tasks and trigger publishing."""
     from app.api.tasks import publish_to_account
+    from app.services.publish_pipeline import publish_batch
 
+    tick_start = time.perf_counter()
     try:
-        now = datetime.now(timezone.utc).isoformat()
+        claimed_at = datetime.now(timezone.utc)
+        now = claimed_at.isoformat()
 
         # Find due tasks with optimistic lock: only update if still scheduled
         due_tasks = supabase_admin.table("publish_tasks").select("*").eq(
             "status", "scheduled"
         ).lte("scheduled_at", now).execute()
+        SCHEDULER_DUE_TASKS.set(len(due_tasks.data))
+        batches: dict[str, list] = {}
 
         for task in due_tasks.data:
             task_id = task["id"]
@@ -35,6 +43,14 @@ async def execute_scheduled_tasks():
                 # Another worker already picked this up
                 continue
 
+            if task.get("scheduled_at"):
+                # The task is claimed: a malformed timestamp must not abort the tick here
+                try:
+                    scheduled_at = datetime.fromisoformat(task["scheduled_at"])
+                    SCHEDULER_LAG.observe((claimed_at - scheduled_at).total_seconds())
+                except (TypeError, ValueError):
+                    logger.warning(f"Task {task_id} has an unreadable scheduled_at: {task['scheduled_at']!r}")
+
             logger.info(f"Executing scheduled task {task_id}: {task['title']}")
 
             # Non-video tasks: mark completed directly (placeholder until API permissions granted)
@@ -50,29 +66,62 @@ async def execute_scheduled_tasks():
                 logger.info(f"Non-video task {task_id} ({content_type}) marked completed (placeholder)")
                 continue
 
-            # Get task accounts
+            # Claim the pending accounts; those published before a deferral, or still
+            # publishing when the task was deferred, are left to their own outcome
             task_accounts = supabase_admin.table("task_accounts").select(
                 "*, social_accounts(*)"
-            ).eq("task_id", task_id).execute()
+            ).eq("task_id", task_id).eq("status", "pending").execute()
+            pending = [ta for ta in task_accounts.data if ta.get("social_accounts")]
+            if pending:
+                claimed = supabase_admin.table("task_accounts").update({
+                    "status": "publishing",
+                }).in_("id", [ta["id"] for ta in pending]).eq("status", "pending").execute()
+                # Rows another path claimed or settled since the select are not ours to send
+                claimed_ids = {row["id"] for row in claimed.data}
+                pending = [ta for ta in pending if ta["id"] in claimed_ids]
+
+            if task.get("batch_id"):
+                batches.setdefault(task["batch_id"], []).append((task, pending))
+                continue
 
             # Trigger publishing for each account
-            for ta in task_accounts.data:
-                account = ta.get("social_accounts")
-                if not account:
-                    continue
+            for ta in pending:
                 asyncio.create_task(
                     publish_to_account(
                         task_id,
                         ta["id"],
-                        account,
+                        ta["social_accounts"],
                         task["video_url"],
                         task["title"],
                         task.get("description"),
                     )
                 )
 
+        # Videos of one batch go through the staged pipeline together
+        for batch_id, items in batches.items():
+            asyncio.create_task(publish_batch(batch_id, items))
+
     except Exception as e:
         logger.error(f"Scheduler error: {e}")
+    finally:
+        SCHEDULER_TICK_DURATION.observe(time.perf_counter() - tick_start)
+
+
+async def flush_transfer_progress():
+    """Write changed transfer progress (see app.services.transfer_progress)."""
+    from app.services import transfer_progress
+
+    await asyncio.to_thread(transfer_progress.flush)
+
+
+async def archive_tasks():
+    """Move old finished tasks to the archive (see app.services.archive)."""
+    from app.services import archive
+
+    try:
+        await archive.run()
+    except Exception as e:
+        logger.error(f"Archive error: {e}")
 
 
 def start_scheduler():
@@ -83,6 +132,20 @@ def start_scheduler():
         id="scheduled_publish",
         replace_existing=True,
     )
+    scheduler.add_job(
+        flush_transfer_progress,
+        "interval",
+        seconds=settings.TRANSFER_PROGRESS_FLUSH_SECONDS,
+        id="transfer_progress_flush",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        archive_tasks,
+        "interval",
+        seconds=settings.ARCHIVE_INTERVAL_SECONDS,
+        id="task_archive",
+        replace_existing=True,
+    )
     scheduler.start()
     logger.info("Scheduler started: polling every 30s for scheduled tasks")
 
@@ -0,0 +1,514 @@
+"""
+Embedded SQLite database backend.
+
+With DATABASE_BACKEND=sqlite, ``supabase_admin`` is a SQLiteClient: the
+part of the supabase-py query builder the app uses (select with embedded
+relations, insert, update, delete, eq / neq / in_ / lt / lte / gt / gte /
+or_ filters, order, limit) plus the rpc() functions of the migrations,
+over a database file on local disk. Single-node installs and CI pay
+in-process latency per query instead of an HTTP round trip to PostgREST.
+
+- The schema (sqlite_schema.sql) mirrors supabase/migrations: same
+  tables, defaults and indexes, and triggers maintaining task_summaries
+  and publish_stats_daily.
+- The database runs in WAL mode, so readers do not block the writer. Each
+  thread has its own connection.
+- Queries are parameterized and built from fixed templates, so each
+  connection's statement cache reuses the prepared statements.
+- jsonb columns hold JSON text and boolean columns 0/1; both are decoded on
+  read from the declared column types. timestamptz values are normalized
+  to UTC ISO 8601 on write so they compare correctly as text.
+
+Sign-in still goes through Supabase Auth (``supabase``) and files through
+Supabase Storage (``storage``, a service-role Storage client); only table
+access moves here.
+"""
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from app.core import deadline
+from app.core.metrics import track_upstream
+
+_SCHEMA = Path(__file__).with_name("sqlite_schema.sql")
+
+# Embedded-resource joins: (table, embedded table) -> foreign key column on table
+_RELATIONS = {
+    ("task_accounts", "social_accounts"): "account_id",
+    ("task_accounts", "publish_tasks"): "task_id",
+}
+
+_IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+_EMBED = re.compile(r"(\w+)\(([^)]*)\)")
+_OPS = {"eq": "=", "neq": "<>", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+
+def _name(identifier: str) -> str:
+    identifier = identifier.strip()
+    if not _IDENTIFIER.fullmatch(identifier):
+        raise ValueError(f"Invalid identifier: {identifier!r}")
+    return identifier
+
+
+def _timestamp(value):
+    if not isinstance(value, str):
+        return value
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:  # Postgres reads naive timestamptz input as UTC (the session zone)
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _local_date(value: Optional[str], zone: str) -> str:
+    """SQL local_date(ts, zone): the calendar day of ``ts`` (now when null) in ``zone``."""
+    moment = datetime.fromisoformat(value) if value else datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(ZoneInfo(zone)).date().isoformat()
+
+
+def _split(expr: str) -> list[str]:
+    """Split a PostgREST logic expression on top-level commas."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return parts
+
+
+class _Result:
+    def __init__(self, data, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, db: "SQLiteClient", table: str):
+        self.db = db
+        self.table = _name(table)
+        self.op = "select"
+        self.columns = "*"
+        self.payload = None
+        self.count = None
+        self.returning = True
+        self.where: list[str] = []
+        self.params: list = []
+        self.order_by: list[str] = []
+        self.row_limit: Optional[int] = None
+
+    # ── Operations ──
+    def select(self, columns: str = "*", count=None, **kwargs):
+        self.op, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, payload, count=None, returning=None, **kwargs):
+        self.op, self.payload, self.count = "insert", payload, count
+        self.returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    def update(self, payload: dict, count=None, returning=None, **kwargs):
+        self.op, self.payload, self.count = "update", payload, count
+        self.returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    def delete(self, count=None, returning=None, **kwargs):
+        self.op, self.count = "delete", count
+        self.returning = getattr(returning, "value", returning) != "minimal"
+        return self
+
+    # ── Filters / modifiers ──
+    def _compare(self, column: str, op: str, value):
+        column = _name(column)
+        self.where.append(f"{column} {_OPS[op]} ?")
+        self.params.append(self.db._encode(self.table, column, value))
+        return self
+
+    def eq(self, column: str, value):
+        return self._compare(column, "eq", value)
+
+    def neq(self, column: str, value):
+        return self._compare(column, "neq", value)
+
+    def lt(self, column: str, value):
+        return self._compare(column, "lt", value)
+
+    def lte(self, column: str, value):
+        return self._compare(column, "lte", value)
+
+    def gt(self, column: str, value):
+        return self._compare(column, "gt", value)
+
+    def gte(self, column: str, value):
+        return self._compare(column, "gte", value)
+
+    def in_(self, column: str, values):
+        column = _name(column)
+        values = [self.db._encode(self.table, column, v) for v in values]
+        self.where.append(f"{column} in ({', '.join('?' * len(values))})" if values else "0")
+        self.params.extend(values)
+        return self
+
+    def _logic(self, expr: str, joiner: str) -> str:
+        terms = []
+        for part in _split(expr):
+            if part.startswith(("and(", "or(")):
+                name, inner = part.split("(", 1)
+                terms.append(self._logic(inner[:-1], " and " if name == "and" else " or "))
+            else:
+                column, op, value = part.split(".", 2)
+                column = _name(column)
+                terms.append(f"{column} {_OPS[op]} ?")
+                self.params.append(self.db._encode(self.table, column, value.strip('"')))
+        return "(" + joiner.join(terms) + ")"
+
+    def or_(self, filters: str):
+        self.where.append(self._logic(filters, " or "))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        # PostgREST's defaults: nulls sort as the largest value
+        self.order_by.append(f"{_name(column)} {'desc nulls first' if desc else 'asc nulls last'}")
+        return self
+
+    def limit(self, n: int):
+        self.row_limit = int(n)
+        return self
+
+    # ── Execution ──
+    def _where(self) -> str:
+        return f" where {' and '.join(self.where)}" if self.where else ""
+
+    def _columns(self) -> tuple[str, list[tuple[str, str]], list[str]]:
+        """SQL column list, the embeds to resolve, and join keys fetched only for them."""
+        embeds = _EMBED.findall(self.columns)
+        plain = [c.strip() for c in _EMBED.sub("", self.columns).split(",") if c.strip()]
+        if not plain or "*" in plain:
+            return "*", embeds, []
+        plain = [_name(c) for c in plain]
+        extra = [key for key in dict.fromkeys(_RELATIONS[(self.table, name)] for name, _ in embeds) if key not in plain]
+        return ", ".join(plain + extra), embeds, extra
+
+    def _embed(self, rows: list[dict], embeds: list[tuple[str, str]]):
+        for name, cols in embeds:
+            fk = _RELATIONS[(self.table, name)]
+            keys = list({row[fk] for row in rows if row.get(fk) is not None})
+            targets = {}
+            if keys:
+                found = self.db._query(
+                    f"select * from {_name(name)} where id in ({', '.join('?' * len(keys))})", keys, name
+                )
+                targets = {t["id"]: t for t in found}
+            wanted = None if cols.strip() == "*" else [_name(c) for c in cols.split(",")]
+            for row in rows:
+                target = targets.get(row.get(fk))
+                if target is not None and wanted is not None:
+                    target = {c: target.get(c) for c in wanted}
+                row[name] = target
+
+    def execute(self) -> _Result:
+        deadline.timeout(None)  # Refuse once the caller's deadline has passed
+        with track_upstream(f"db.{self.table}.{self.op}"):
+            return getattr(self, f"_{self.op}")()
+
+    def _select(self) -> _Result:
+        projected, embeds, extra = self._columns()
+        sql = f"select {projected} from {self.table}{self._where()}"
+        if self.order_by:
+            sql += " order by " + ", ".join(self.order_by)
+        if self.row_limit is not None:
+            sql += f" limit {self.row_limit}"
+        rows = self.db._query(sql, self.params, self.table)
+        if embeds:
+            self._embed(rows, embeds)
+            for row in rows:
+                for key in extra:
+                    del row[key]
+        count = None
+        if self.count:
+            count = self.db._query(f"select count(*) as n from {self.table}{self._where()}", self.params)[0]["n"]
+        return _Result(rows, count)
+
+    def _insert(self) -> _Result:
+        items = self.payload if isinstance(self.payload, list) else [self.payload]
+        if not items:
+            return _Result([])
+        rows = []
+        with self.db._transaction() as conn:
+            for item in items:
+                columns = [_name(c) for c in item]
+                sql = (f"insert into {self.table} ({', '.join(columns)}) "
+                       f"values ({', '.join('?' * len(columns))}) returning *")
+                values = [self.db._encode(self.table, c, item[c]) for c in columns]
+                rows.extend(self.db._decode(self.table, conn.execute(sql, values)))
+        return _Result(rows if self.returning else [], len(rows) if self.count else None)
+
+    def _update(self) -> _Result:
+        columns = [_name(c) for c in self.payload]
+        values = [self.db._encode(self.table, c, self.payload[c]) for c in columns]
+        sql = f"update {self.table} set {', '.join(f'{c} = ?' for c in columns)}{self._where()} returning *"
+        rows = self.db._query(sql, values + self.params, self.table)
+        return _Result(rows if self.returning else [], len(rows) if self.count else None)
+
+    def _delete(self) -> _Result:
+        rows = self.db._query(f"delete from {self.table}{self._where()} returning *", self.params, self.table)
+        return _Result(rows if self.returning else [], len(rows) if self.count else None)
+
+
+def _recount_publish_stats(conn: sqlite3.Connection):
+    """rebuild_publish_stats() of migration 014 on an open transaction."""
+    conn.execute("delete from publish_stats_daily")
+    conn.execute(
+        """
+        insert into publish_stats_daily (user_id, platform, day, publishes, successes, failures)
+        select f.user_id, sa.platform, local_date(f.finished_at, (select timezone from publish_stats_settings)),
+               count(*), sum(f.status = 'success'), sum(f.status = 'failed')
+        from (
+          select pt.user_id, ta.account_id, ta.status,
+                 coalesce(ta.published_at, pt.updated_at, ta.created_at) as finished_at
+          from task_accounts ta join publish_tasks pt on pt.id = ta.task_id
+          where pt.content_type = 'video'
+          union all
+          select a.user_id, json_extract(e.value, '$.account_id'), json_extract(e.value, '$.status'),
+                 coalesce(json_extract(e.value, '$.published_at'), a.finished_at, json_extract(e.value, '$.created_at'))
+          from task_archive a, json_each(a.task_accounts) as e
+          where coalesce(json_extract(a.summary, '$.content_type'), 'video') = 'video'
+        ) as f
+        join social_accounts sa on sa.id = f.account_id
+        where f.status in ('success', 'failed')
+        group by 1, 2, 3
+        """
+    )
+
+
+class _Rpc:
+    """Postgres functions from supabase/migrations, reimplemented for SQLite."""
+
+    def __init__(self, db: "SQLiteClient", name: str, params: dict):
+        self.db = db
+        self.name = _name(name)
+        self.params = params
+
+    def execute(self) -> _Result:
+        deadline.timeout(None)
+        with track_upstream(f"db.rpc.{self.name}"):
+            return getattr(self, f"_{self.name}")(**self.params)
+
+    def _rebuild_publish_stats(self) -> _Result:
+        with self.db._transaction() as conn:
+            _recount_publish_stats(conn)
+        return _Result(None)
+
+    def _set_publish_stats_timezone(self, p_timezone: str) -> _Result:
+        ZoneInfo(p_timezone)  # Unknown zone names raise before anything is written
+        with self.db._transaction() as conn:
+            changed = conn.execute(
+                "update publish_stats_settings set timezone = ? where timezone <> ?", (p_timezone, p_timezone),
+            ).rowcount
+            if changed:
+                _recount_publish_stats(conn)
+        return _Result(bool(changed))
+
+    def _save_transfer_progress(self, rows: list) -> _Result:
+        with self.db._transaction() as conn:
+            conn.executemany(
+                "insert into transfer_progress (task_account_id, task_id, account_id, platform, status, stage, "
+                "bytes_done, bytes_total, rate_bps, avg_bps, started_at, updated_at) "
+                "select ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? where exists (select 1 from task_accounts where id = ?) "
+                "on conflict (task_account_id) do update set status = excluded.status, stage = excluded.stage, "
+                "bytes_done = excluded.bytes_done, bytes_total = excluded.bytes_total, rate_bps = excluded.rate_bps, "
+                "avg_bps = excluded.avg_bps, started_at = excluded.started_at, updated_at = excluded.updated_at "
+                "where excluded.updated_at >= transfer_progress.updated_at",
+                [
+                    (r["task_account_id"], r["task_id"], r["account_id"], r["platform"], r["status"], r["stage"],
+                     r["bytes_done"], r["bytes_total"], r["rate_bps"], r["avg_bps"],
+                     _timestamp(r["started_at"]), _timestamp(r["updated_at"]), r["task_account_id"])
+                    for r in rows
+                ],
+            )
+        return _Result(None)
+
+    def _batch_progress(self, p_batch_id: str, p_user_id: str, p_failure_limit: int) -> _Result:
+        row = self.db._connection().execute(
+            """
+            with tasks as (
+              select id, status, scheduled_at from publish_tasks where batch_id = :batch and user_id = :user
+            ), accounts as (
+              select ta.task_id, ta.account_id, ta.status, ta.error_message, ta.published_at, ta.created_at,
+                     t.status as task_status
+              from task_accounts ta join tasks t on t.id = ta.task_id
+            )
+            select json_object(
+              'tasks', json((select json_group_object(status, n) from (
+                select status, count(*) as n from tasks group by status))),
+              'accounts', json((select json_group_object(status, n) from (
+                select status, count(*) as n from accounts group by status))),
+              'remaining', (select count(*) from accounts
+                            where status in ('pending', 'publishing') and task_status in ('scheduled', 'publishing')),
+              'retryable', (select count(*) from accounts
+                            where status = 'failed' and task_status in ('completed', 'failed')),
+              'last_scheduled_at', (select max(scheduled_at) from tasks where status = 'scheduled'),
+              'first_published_at', (select min(published_at) from accounts where status = 'success'),
+              'last_published_at', (select max(published_at) from accounts where status = 'success'),
+              'failures', json((select json_group_array(json_object(
+                'task_id', task_id, 'account_id', account_id, 'username', username, 'error_message', error_message
+              )) from (
+                select a.task_id, a.account_id, sa.username, a.error_message
+                from accounts a left join social_accounts sa on sa.id = a.account_id
+                where a.status = 'failed'
+                order by a.created_at, a.task_id
+                limit :limit)))
+            )
+            """,
+            {"batch": p_batch_id, "user": p_user_id, "limit": int(p_failure_limit)},
+        ).fetchone()
+        return _Result(json.loads(row[0]))
+
+    def _retry_failed_batch(self, p_batch_id: str, p_user_id: str) -> _Result:
+        finished = (
+            "select id from publish_tasks "
+            "where batch_id = :batch and user_id = :user and status in ('completed', 'failed')"
+        )
+        params = {"batch": p_batch_id, "user": p_user_id, "now": _timestamp(datetime.now(timezone.utc).isoformat())}
+        with self.db._transaction() as conn:
+            accounts = conn.execute(
+                f"update task_accounts set status = 'pending', error_message = null "
+                f"where status = 'failed' and task_id in ({finished})",
+                params,
+            ).rowcount
+            tasks = conn.execute(
+                f"update publish_tasks set status = 'scheduled', scheduled_at = :now, updated_at = :now "
+                f"where id in ({finished}) and exists "
+                f"(select 1 from task_accounts ta where ta.task_id = publish_tasks.id and ta.status = 'pending')",
+                params,
+            ).rowcount
+        return _Result({"tasks": tasks, "accounts": accounts})
+
+    def _archive_tasks(self, p_before: str, p_limit: int) -> _Result:
+        # One write transaction stands in for "for update skip locked": SQLite has a single writer
+        with self.db._transaction() as conn:
+            tasks = self.db._decode("publish_tasks", conn.execute(
+                "select * from publish_tasks where status in ('completed', 'failed', 'cancelled') "
+                "and updated_at < ? order by updated_at limit ?",
+                (_timestamp(p_before), int(p_limit)),
+            ))
+            for task in tasks:
+                summary = conn.execute("select summary from task_summaries where task_id = ?", (task["id"],)).fetchone()
+                task_accounts = self.db._decode("task_accounts", conn.execute(
+                    "select * from task_accounts where task_id = ? order by created_at", (task["id"],)
+                ))
+                conn.execute(
+                    "insert into task_archive (task_id, user_id, created_at, finished_at, summary, task_accounts) "
+                    "values (?, ?, ?, ?, ?, ?) on conflict (task_id) do nothing",
+                    (task["id"], task["user_id"], task["created_at"], task["updated_at"],
+                     summary[0] if summary else json.dumps(task), json.dumps(task_accounts)),
+                )
+                conn.execute("delete from publish_tasks where id = ?", (task["id"],))  # Cascades
+        return _Result(len(tasks))
+
+
+class SQLiteClient:
+    """Drop-in for ``supabase_admin`` backed by a local SQLite database file."""
+
+    def __init__(self, path: str, storage=None):
+        self.path = path
+        self.storage = storage  # Supabase Storage client: files are not kept in SQLite
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._types: Optional[dict[str, dict[str, str]]] = None  # table -> column -> declared type
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma busy_timeout = 5000")
+            conn.execute("pragma foreign_keys = on")
+            conn.execute("pragma synchronous = normal")  # Durable at checkpoints; safe in WAL mode
+            conn.create_function("local_date", 2, _local_date)  # Used by the publish stats triggers
+            with self._lock:
+                if self._types is None:
+                    conn.execute("pragma journal_mode = wal")
+                    conn.executescript(_SCHEMA.read_text())
+                    tables = [r[0] for r in conn.execute("select name from sqlite_master where type = 'table'")]
+                    self._types = {
+                        table: {col[1]: col[2].lower() for col in conn.execute(f"pragma table_info({table})")}
+                        for table in tables
+                    }
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+        return _Transaction(conn)
+
+    def _encode(self, table: str, column: str, value):
+        kind = self._types_for(table).get(column)
+        if value is None:
+            return None
+        if kind == "jsonb":
+            return json.dumps(value, ensure_ascii=False, default=str)
+        if kind == "boolean":
+            return int(value in (True, "true")) if isinstance(value, (bool, str)) else int(bool(value))
+        if kind == "timestamptz":
+            return _timestamp(value)
+        return value
+
+    def _decode(self, table: Optional[str], cursor) -> list[dict]:
+        types = self._types_for(table) if table else {}
+        rows = []
+        for row in cursor:
+            item = dict(row)
+            for column, value in item.items():
+                kind = types.get(column)
+                if value is None:
+                    continue
+                if kind == "jsonb" and isinstance(value, str):
+                    item[column] = json.loads(value)
+                elif kind == "boolean":
+                    item[column] = bool(value)
+            rows.append(item)
+        return rows
+
+    def _types_for(self, table: str) -> dict[str, str]:
+        if self._types is None:
+            self._connection()
+        return self._types.get(table, {})
+
+    def _query(self, sql: str, params, table: Optional[str] = None) -> list[dict]:
+        return self._decode(table, self._connection().execute(sql, params))
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict) -> _Rpc:
+        return _Rpc(self, name, params)
+
+
+class _Transaction:
+    """``with``: BEGIN IMMEDIATE ... COMMIT on one connection, ROLLBACK on error."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("begin immediate")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("rollback" if exc_type else "commit")
+        return False
@@ -0,0 +1,284 @@
+-- Schema for the embedded SQLite backend (app/core/sqlite.py).
+-- Mirrors supabase/migrations 001-014: same tables, columns, defaults,
+-- constraints and indexes, and the task_summaries and publish stats
+-- triggers. Postgres types are kept as declared types: jsonb holds JSON
+-- text, boolean 0/1, timestamptz UTC ISO 8601 text. Safe to run on every start.
+
+-- 1. Social accounts (001, 007)
+create table if not exists social_accounts (
+  id uuid primary key default (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))),
+  user_id uuid not null,
+  platform varchar(50) not null default 'douyin',
+  platform_user_id text not null,
+  username text not null,
+  avatar_url text,
+  access_token text,
+  refresh_token text,
+  token_expires_at timestamptz,
+  status varchar(20) default 'active' check (status in ('active', 'expired')),
+  created_at timestamptz default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  updated_at timestamptz default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  platform_config jsonb default '{}',
+  avatar_hash text,
+  unique (user_id, platform, platform_user_id)
+);
+
+create index if not exists idx_social_accounts_user_id on social_accounts (user_id);
+create index if not exists idx_social_accounts_avatar_hash
+  on social_accounts (avatar_hash)
+  where avatar_hash is not null;
+
+-- 2. Publish tasks (001-005, 010, 012)
+create table if not exists publish_tasks (
+  id uuid primary key default (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))),
+  user_id uuid not null,
+  title text not null,
+  description text,
+  video_url text,
+  cover_url text,
+  status varchar(20) default 'publishing'
+    check (status in ('pending_share', 'scheduled', 'publishing', 'completed', 'failed', 'cancelled')),
+  created_at timestamptz default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  updated_at timestamptz default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  scheduled_at timestamptz,
+  share_id text,
+  content_type varchar(20) not null default 'video',
+  image_urls jsonb not null default '[]',
+  article_content text,
+  visibility varchar(20) not null default 'public',
+  ai_content boolean not null default 0,
+  topics jsonb not null default '[]',
+  distribution_mode varchar(20),
+  batch_id uuid
+);
+
+create index if not exists idx_publish_tasks_user_id on publish_tasks (user_id);
+create index if not exists idx_publish_tasks_scheduled
+  on publish_tasks (scheduled_at)
+  where status = 'scheduled';
+create index if not exists idx_publish_tasks_share_id
+  on publish_tasks (share_id)
+  where share_id is not null;
+create index if not exists idx_publish_tasks_finished
+  on publish_tasks (updated_at)
+  where status in ('completed', 'failed', 'cancelled');
+create index if not exists idx_publish_tasks_batch_id
+  on publish_tasks (batch_id)
+  where batch_id is not null;
+
+-- 3. Task-account rows (001, 005, 013)
+create table if not exists task_accounts (
+  id uuid primary key default (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))),
+  task_id uuid not null references publish_tasks (id) on delete cascade,
+  account_id uuid not null references social_accounts (id) on delete cascade,
+  status varchar(20) default 'pending' check (status in ('pending', 'publishing', 'success', 'failed')),
+  error_message text,
+  published_url text,
+  published_at timestamptz,
+  created_at timestamptz default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  title text,
+  description text,
+  topics jsonb
+);
+
+create index if not exists idx_task_accounts_task_id on task_accounts (task_id);
+create index if not exists idx_task_accounts_account_id on task_accounts (account_id);
+
+-- 4. Drafts (005, 006)
+create table if not exists drafts (
+  id uuid primary key default (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))),
+  user_id uuid not null,
+  content_type varchar(20) not null default 'video',
+  title text,
+  description text,
+  video_urls jsonb not null default '[]',
+  image_urls jsonb not null default '[]',
+  article_content text,
+  cover_url text,
+  visibility varchar(20) not null default 'public',
+  ai_content boolean not null default 0,
+  topics jsonb not null default '[]',
+  account_ids jsonb not null default '[]',
+  account_configs jsonb not null default '{}',
+  distribution_mode varchar(20) not null default 'broadcast',
+  scheduled_at timestamptz,
+  created_at timestamptz not null default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  updated_at timestamptz not null default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  version integer not null default 1
+);
+
+create index if not exists idx_drafts_user_updated on drafts (user_id, updated_at desc);
+
+-- 5. Dashboard counters (008, 014), kept by the triggers of section 9
+create table if not exists publish_stats_daily (
+  user_id uuid not null,
+  platform varchar(50) not null,
+  day date not null,
+  publishes integer not null default 0,
+  successes integer not null default 0,
+  failures integer not null default 0,
+  primary key (user_id, day, platform)
+);
+
+-- 6. Task read model (009): the API's task document, kept current by triggers
+create table if not exists task_summaries (
+  task_id uuid primary key references publish_tasks (id) on delete cascade,
+  user_id uuid not null,
+  created_at timestamptz not null,
+  summary jsonb not null
+);
+
+create index if not exists idx_task_summaries_user_created on task_summaries (user_id, created_at desc);
+
+-- refresh_task_summary(): the summary row of every task, filtered by the triggers
+create view if not exists task_summary_rows as
+select t.id as task_id, t.user_id, t.created_at, json_object(
+  'id', t.id, 'user_id', t.user_id, 'title', t.title, 'description', t.description,
+  'video_url', t.video_url, 'cover_url', t.cover_url, 'status', t.status,
+  'created_at', t.created_at, 'updated_at', t.updated_at, 'scheduled_at', t.scheduled_at,
+  'share_id', t.share_id, 'content_type', t.content_type, 'image_urls', json(t.image_urls),
+  'article_content', t.article_content, 'visibility', t.visibility,
+  'ai_content', json(case when t.ai_content then 'true' else 'false' end),
+  'topics', json(t.topics), 'distribution_mode', t.distribution_mode, 'batch_id', t.batch_id,
+  'accounts', json(coalesce((
+    select json_group_array(json_object(
+      'account_id', a.account_id,
+      'username', a.username,
+      'avatar_url', a.avatar_url,
+      'avatar_hash', a.avatar_hash,
+      'status', a.status,
+      'error_message', a.error_message,
+      'published_url', a.published_url
+    ))
+    from (
+      select ta.account_id, coalesce(sa.username, 'Unknown') as username, sa.avatar_url, sa.avatar_hash,
+             ta.status, ta.error_message, ta.published_url
+      from task_accounts ta
+      left join social_accounts sa on sa.id = ta.account_id
+      where ta.task_id = t.id
+      order by ta.created_at
+    ) as a
+  ), '[]'))
+) as summary
+from publish_tasks t;
+
+create trigger if not exists trg_publish_tasks_summary_insert
+after insert on publish_tasks
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows where task_id = new.id
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+create trigger if not exists trg_publish_tasks_summary_update
+after update on publish_tasks
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows where task_id = new.id
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+create trigger if not exists trg_task_accounts_summary_insert
+after insert on task_accounts
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows where task_id = new.task_id
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+create trigger if not exists trg_task_accounts_summary_update
+after update on task_accounts
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows where task_id = new.task_id
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+create trigger if not exists trg_task_accounts_summary_delete
+after delete on task_accounts
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows where task_id = old.task_id
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+create trigger if not exists trg_social_accounts_summaries
+after update of username, avatar_url, avatar_hash on social_accounts
+when old.username is not new.username
+  or old.avatar_url is not new.avatar_url
+  or old.avatar_hash is not new.avatar_hash
+begin
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select task_id, user_id, created_at, summary from task_summary_rows
+  where task_id in (select task_id from task_accounts where account_id = new.id)
+  on conflict (task_id) do update set summary = excluded.summary;
+end;
+
+-- 7. Cold storage (010); archive_tasks is SQLiteClient.rpc
+create table if not exists task_archive (
+  task_id uuid primary key,
+  user_id uuid not null,
+  created_at timestamptz not null,
+  finished_at timestamptz,
+  archived_at timestamptz not null default (strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')),
+  summary jsonb not null,
+  task_accounts jsonb not null default '[]'
+);
+
+create index if not exists idx_task_archive_user_created on task_archive (user_id, created_at desc);
+
+-- 8. Transfer progress (011); save_transfer_progress is SQLiteClient.rpc
+create table if not exists transfer_progress (
+  task_account_id uuid primary key references task_accounts (id) on delete cascade,
+  task_id uuid not null references publish_tasks (id) on delete cascade,
+  account_id uuid not null,
+  platform varchar(50) not null,
+  status varchar(20) not null default 'active' check (status in ('active', 'succeeded', 'failed')),
+  stage varchar(20) check (stage in ('download', 'upload', 'create')),
+  bytes_done integer not null default 0,
+  bytes_total integer,
+  rate_bps double precision,
+  avg_bps double precision,
+  started_at timestamptz not null,
+  updated_at timestamptz not null
+);
+
+create index if not exists idx_transfer_progress_task_id on transfer_progress (task_id);
+
+-- 9. Dashboard counters kept by triggers on task_accounts (014); local_date()
+--    is registered on each connection by SQLiteClient, and
+--    set_publish_stats_timezone / rebuild_publish_stats are SQLiteClient.rpc
+create table if not exists publish_stats_settings (
+  id boolean primary key default 1 check (id),
+  timezone text not null
+);
+
+insert or ignore into publish_stats_settings (timezone) values ('Asia/Shanghai');
+
+-- Recreated on open, so databases created before a change get the new triggers
+
+drop trigger if exists trg_task_accounts_stats_insert;
+create trigger trg_task_accounts_stats_insert
+after insert on task_accounts
+when new.status in ('success', 'failed')
+begin
+  insert into publish_stats_daily (user_id, platform, day, publishes, successes, failures)
+  select pt.user_id, sa.platform, local_date(null, st.timezone), 1, new.status = 'success', new.status = 'failed'
+  from publish_tasks pt, social_accounts sa, publish_stats_settings st
+  where pt.id = new.task_id and sa.id = new.account_id and pt.content_type = 'video'
+  on conflict (user_id, day, platform) do update set
+    publishes = publishes + 1, successes = successes + excluded.successes, failures = failures + excluded.failures;
+end;
+
+drop trigger if exists trg_task_accounts_stats_update;
+create trigger trg_task_accounts_stats_update
+after update of status on task_accounts
+when new.status in ('success', 'failed') and old.status is not new.status
+begin
+  insert into publish_stats_daily (user_id, platform, day, publishes, successes, failures)
+  select pt.user_id, sa.platform, local_date(null, st.timezone), 1, new.status = 'success', new.status = 'failed'
+  from publish_tasks pt, social_accounts sa, publish_stats_settings st
+  where pt.id = new.task_id and sa.id = new.account_id and pt.content_type = 'video'
+  on conflict (user_id, day, platform) do update set
+    publishes = publishes + 1, successes = successes + excluded.successes, failures = failures + excluded.failures;
+end;
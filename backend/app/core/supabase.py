@@ -1,8 +1,77 @@
-from supabase import create_client, Client
+"""
+Supabase clients, built on first use.
+
+Importing the supabase package and building a client (HTTP/2 transport, TLS
+context) takes a few hundred milliseconds, so ``supabase`` and
+``supabase_admin`` are stand-ins that build their client the first time an
+attribute is read. Importing the app - a cold start, a test run, a script
+that never touches the database - does not pay for it. With
+DATABASE_BACKEND=sqlite, ``supabase_admin`` is the embedded database of
+app.core.sqlite instead; its ``storage`` is still Supabase Storage.
+"""
+import threading
+from typing import TYPE_CHECKING, Callable
+
+import httpx
 from app.core.config import settings
+from app.core.deadline import DeadlineTransport
+from app.core.metrics import InstrumentedTransport
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def _http_client() -> httpx.Client:
+    """
+    HTTP client for Supabase calls, timed per operation (see app.core.metrics)
+    and bounded by the caller's deadline (see app.core.deadline).
+    """
+    return httpx.Client(
+        transport=InstrumentedTransport(DeadlineTransport(httpx.HTTPTransport(http2=True))),
+        timeout=120,
+        follow_redirects=True,
+    )
+
+
+def _create(key: str) -> "Client":
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+
+    return create_client(settings.SUPABASE_URL, key, options=SyncClientOptions(httpx_client=_http_client()))
+
+
+def _admin() -> "Client":
+    if settings.DATABASE_BACKEND == "sqlite":
+        from app.core.sqlite import SQLiteClient
+
+        # Files stay in Supabase Storage; signing needs the service role. Built on first use
+        storage = _LazyClient(lambda: _create(settings.SUPABASE_SERVICE_KEY).storage)
+        return SQLiteClient(settings.SQLITE_PATH, storage=storage)
+    return _create(settings.SUPABASE_SERVICE_KEY)
+
+
+class _LazyClient:
+    """Forwards attribute access to the client ``factory`` returns, called on first use."""
+
+    def __init__(self, factory: Callable[[], "Client"]):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> "Client":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
 
-# Client with anon key (respects RLS)
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# Client with anon key (respects RLS); also verifies sign-ins with either database backend
+supabase: "Client" = _LazyClient(lambda: _create(settings.SUPABASE_KEY))
 
-# Client with service role key (bypasses RLS, for admin operations)
-supabase_admin: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+# Client with service role key (bypasses RLS, for admin operations), or the
+# embedded SQLite database with DATABASE_BACKEND=sqlite (see app.core.sqlite)
+supabase_admin: "Client" = _LazyClient(_admin)
@@ -1,16 +1,27 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.core.admission import AdmissionMiddleware, check_keying
 from app.core.config import settings
+from app.core.deadline import DeadlineMiddleware
+from app.core.metrics import MetricsMiddleware, render_latest
+from app.core.profiling import ProfilingMiddleware
 from app.core.scheduler import start_scheduler, stop_scheduler
-from app.api import auth, accounts, tasks, share, drafts
+from app.services import image_pipeline, media_probe, stats, transfer_progress
+from app.api import auth, accounts, avatars, tasks, task_batches, task_export, task_import, share, drafts, admin, dashboard, topics, system
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    check_keying()
+    stats.sync_timezone()
     start_scheduler()
     yield
     stop_scheduler()
+    transfer_progress.flush()
+    media_probe.shutdown()
+    image_pipeline.shutdown()
 
 
 app = FastAPI(
@@ -20,6 +31,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Deadline innermost: only admitted requests get a budget, and its 504 passes through CORS
+app.add_middleware(DeadlineMiddleware)
+# Admission control sits inside CORS so browsers can read its 429 / 503 responses
+app.add_middleware(AdmissionMiddleware)
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -28,13 +43,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(accounts.router)
+app.include_router(avatars.router)
+app.include_router(task_export.router)  # Before tasks: /export would match /{task_id}
+app.include_router(task_batches.router)
 app.include_router(tasks.router)
+app.include_router(task_import.router)
 app.include_router(share.router)
 app.include_router(drafts.router)
+app.include_router(admin.router)
+app.include_router(dashboard.router)
+app.include_router(topics.router)
+app.include_router(system.router)
 
 
 @app.get("/")
@@ -45,3 +70,8 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from datetime import datetime
 from typing import Literal, Optional
 
+from app.services import avatars
+
 
 # Account schemas
 class AccountBase(BaseModel):
@@ -63,14 +65,49 @@ class TaskCreate(BaseModel):
         return self
 
 
+# Bulk import: one NDJSON line per task
+class TaskImportItem(BaseModel):
+    title: str
+    description: Optional[str] = None
+    content_type: ContentType = "video"
+    video_url: Optional[str] = None
+    image_urls: list[str] = []
+    article_content: Optional[str] = None
+    cover_url: Optional[str] = None
+    visibility: Visibility = "public"
+    ai_content: bool = False
+    topics: list[str] = []
+    account_ids: list[str]
+    scheduled_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def validate_content(self):
+        if self.content_type == "video" and not self.video_url:
+            raise ValueError("video_url is required for video content")
+        if self.content_type == "image_text" and not self.image_urls:
+            raise ValueError("image_urls is required for image_text content")
+        if self.content_type == "article" and not self.article_content:
+            raise ValueError("article_content is required for article content")
+        if not self.account_ids:
+            raise ValueError("account_ids must not be empty")
+        return self
+
+
 class TaskAccountResponse(BaseModel):
     account_id: str
     username: str
     avatar_url: Optional[str] = None
+    avatar_hash: Optional[str] = Field(None, exclude=True)
     status: str
     error_message: Optional[str] = None
     published_url: Optional[str] = None
 
+    @model_validator(mode="after")
+    def proxy_avatar(self):
+        # Rows carry the cached avatar's digest when there is one; clients get the proxy URL
+        self.avatar_url = avatars.proxy_url({"avatar_url": self.avatar_url, "avatar_hash": self.avatar_hash})
+        return self
+
 
 class TaskResponse(BaseModel):
     id: str
@@ -96,6 +133,51 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class BatchFailure(BaseModel):
+    task_id: str
+    account_id: str
+    username: Optional[str] = None
+    error_message: Optional[str] = None
+
+
+class BatchProgressResponse(BaseModel):
+    batch_id: str
+    tasks: dict[str, int]  # Task count by status
+    accounts: dict[str, int]  # Task-account count by status
+    total_tasks: int
+    total_accounts: int
+    remaining: int  # Pending or publishing accounts of scheduled or publishing tasks
+    retryable: int  # Failed accounts retry-failed would requeue
+    publishes_per_minute: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    estimated_completion_at: Optional[datetime] = None
+    failures: list[BatchFailure] = []
+
+
+class BatchReschedule(BaseModel):
+    scheduled_at: datetime
+
+
+class BatchActionResponse(BaseModel):
+    batch_id: str
+    tasks: int  # Tasks updated
+    accounts: int = 0  # Task accounts requeued by retry-failed
+
+
+class TransferProgressResponse(BaseModel):
+    task_account_id: str
+    account_id: str
+    platform: str
+    status: str  # active, succeeded, failed
+    stage: Optional[str] = None  # download, upload, create; None until the first stage starts
+    bytes_done: int = 0
+    bytes_total: Optional[int] = None
+    rate_bps: Optional[float] = None  # Over the last TRANSFER_SAMPLE_SECONDS
+    avg_bps: Optional[float] = None  # Over the whole download / upload stage
+    started_at: datetime
+    updated_at: datetime
+
+
 # Draft schemas
 class DraftCreate(BaseModel):
     content_type: ContentType = "video"
@@ -130,6 +212,7 @@ class DraftResponse(BaseModel):
     account_configs: dict = {}
     distribution_mode: str = "broadcast"
     scheduled_at: Optional[datetime] = None
+    version: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -137,7 +220,61 @@ class DraftResponse(BaseModel):
         from_attributes = True
 
 
+class DraftPatch(BaseModel):
+    """Validated partial draft: only the fields present in a PATCH delta."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    content_type: Optional[ContentType] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    video_urls: Optional[list[str]] = None
+    image_urls: Optional[list[str]] = None
+    article_content: Optional[str] = None
+    cover_url: Optional[str] = None
+    visibility: Optional[Visibility] = None
+    ai_content: Optional[bool] = None
+    topics: Optional[list[str]] = None
+    account_ids: Optional[list[str]] = None
+    account_configs: Optional[dict[str, AccountConfig]] = None
+    distribution_mode: Optional[DistributionMode] = None
+    scheduled_at: Optional[datetime] = None
+
+
+class DraftPatchResponse(BaseModel):
+    id: str
+    version: int
+    updated_at: datetime
+
+
 # Share schemas
 class ShareSchemaResponse(BaseModel):
     schema_url: str
     share_id: str
+
+
+# Topic autocomplete schemas
+class TopicSuggestion(BaseModel):
+    topic: str
+    uses: int
+
+
+# Admin profiling schemas
+class ProfileSampleRequest(BaseModel):
+    seconds: float = Field(5, gt=0, le=60)
+    interval_ms: float = Field(5, ge=1, le=1000)
+    trace_memory: bool = False
+
+
+class ProfileArmRequest(BaseModel):
+    route: Optional[str] = None  # Route template (e.g. /api/tasks) or literal path
+    user_id: Optional[str] = None
+    ttl_seconds: float = Field(300, gt=0, le=3600)
+    interval_ms: float = Field(2, ge=1, le=1000)
+    trace_memory: bool = True
+
+    @model_validator(mode="after")
+    def validate_target(self):
+        if not self.route and not self.user_id:
+            raise ValueError("route or user_id is required")
+        return self
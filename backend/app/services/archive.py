@@ -0,0 +1,70 @@
+"""
+Hot/cold tiering of publish history.
+
+Only tasks that can still change need to live in publish_tasks and
+task_accounts. The archive job moves completed, failed and cancelled tasks
+whose last update is older than ARCHIVE_AFTER_DAYS into task_archive
+(migration 010), ARCHIVE_BATCH_SIZE tasks per archive_tasks call with a
+pause between calls, so the scheduler, list and webhook queries keep
+working on small tables and indexes.
+
+Archived tasks stay readable: by id (GET /api/tasks/{id} falls back to the
+archive) and page by page, newest first (GET /api/tasks/archive).
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.supabase import supabase_admin
+
+logger = logging.getLogger(__name__)
+
+TASKS_ARCHIVED = Counter("tasks_archived_total", "Finished tasks moved to task_archive.")
+
+
+def archive_batch(before: str) -> int:
+    """Move up to ARCHIVE_BATCH_SIZE tasks finished before ``before``; returns how many moved."""
+    result = supabase_admin.rpc("archive_tasks", {
+        "p_before": before,
+        "p_limit": settings.ARCHIVE_BATCH_SIZE,
+    }).execute()
+    return result.data or 0
+
+
+async def run() -> int:
+    """Archive tasks finished more than ARCHIVE_AFTER_DAYS ago, at most ARCHIVE_MAX_BATCHES batches."""
+    if settings.ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    before = (datetime.now(timezone.utc) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)).isoformat()
+    total = 0
+    for _ in range(settings.ARCHIVE_MAX_BATCHES):
+        moved = await asyncio.to_thread(archive_batch, before)
+        total += moved
+        TASKS_ARCHIVED.inc(amount=moved)
+        if moved < settings.ARCHIVE_BATCH_SIZE:
+            break
+        # Throttle: leave the database room for the publish path between batches
+        await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE_SECONDS)
+    if total:
+        logger.info("Archived %d finished tasks older than %s", total, before)
+    return total
+
+
+def get(task_id: str, user_id: str) -> Optional[dict]:
+    """An archived task in the TaskResponse shape, or None."""
+    result = supabase_admin.table("task_archive").select("summary").eq(
+        "task_id", task_id
+    ).eq("user_id", user_id).execute()
+    return result.data[0]["summary"] if result.data else None
+
+
+def page(user_id: str, before: Optional[str] = None, limit: int = 50) -> list[dict]:
+    """Archived tasks created before ``before`` (ISO timestamp), newest first."""
+    query = supabase_admin.table("task_archive").select("summary").eq("user_id", user_id)
+    if before:
+        query = query.lt("created_at", before)
+    result = query.order("created_at", desc=True).limit(limit).execute()
+    return [row["summary"] for row in result.data]
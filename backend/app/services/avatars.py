@@ -0,0 +1,182 @@
+"""
+Avatar proxy: platform avatars cached on local disk and served as thumbnails.
+
+Platform CDN avatar URLs expire and load slowly from our users' regions.
+After get_user_info the avatar is fetched once and stored content-addressed
+(sha256) under AVATAR_CACHE_DIR; the account records the digest in
+``avatar_hash`` and API responses point at /api/avatars/{digest}, a URL whose
+content never changes and can therefore be cached by browsers for good.
+
+Thumbnails (AVATAR_SIZES) are rendered on first request in the image worker
+pool and stored next to the original. The directory is an LRU bounded by
+AVATAR_CACHE_MAX_BYTES; an evicted original is fetched again from the
+platform URL still recorded on the account.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import Counter, track_upstream
+from app.core.supabase import supabase_admin
+from app.services import image_pipeline
+from app.services.platforms.base import ImageSpec
+
+logger = logging.getLogger(__name__)
+
+AVATAR_REQUESTS = Counter("avatar_thumbnails_total", "Avatar thumbnail requests by cache outcome.", ("result",))
+
+
+class _DiskLRU:
+    """Files under ``root`` (fanned out by name prefix), evicted least recently used first."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: Optional[OrderedDict] = None  # name -> size, least recently used first
+        self.total = 0
+
+    def _path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    def _load(self):
+        # Recency survives restarts through file mtimes (touched on every hit)
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = [p for p in self.root.glob("*/*") if p.is_file() and not p.name.endswith(".tmp")]
+        stats = sorted(((p.stat().st_mtime, p.name, p.stat().st_size) for p in files))
+        self.entries = OrderedDict((name, size) for _, name, size in stats)
+        self.total = sum(self.entries.values())
+
+    def read(self, name: str) -> Optional[bytes]:
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+            path = self._path(name)
+            try:
+                os.utime(path)
+                return path.read_bytes()
+            except FileNotFoundError:  # Removed behind our back
+                self.total -= self.entries.pop(name)
+                return None
+
+    def write(self, name: str, data: bytes):
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            path = self._path(name)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self.total += len(data) - self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                evicted, size = self.entries.popitem(last=False)
+                self.total -= size
+                self._path(evicted).unlink(missing_ok=True)
+
+
+_disk = _DiskLRU(Path(settings.AVATAR_CACHE_DIR), settings.AVATAR_CACHE_MAX_BYTES)
+_rendering: dict[str, asyncio.Task] = {}
+_backfilled: set[str] = set()
+
+
+def proxy_url(account: dict) -> Optional[str]:
+    """The avatar URL to hand to clients for an account row (with avatar_url / avatar_hash)."""
+    digest = account.get("avatar_hash")
+    if not digest:
+        return account.get("avatar_url")  # Not cached yet: the platform URL is all we have
+    return f"{settings.PUBLIC_API_URL.rstrip('/')}/api/avatars/{digest}?size={settings.AVATAR_DEFAULT_SIZE}"
+
+
+async def _fetch(avatar_url: str) -> tuple[str, bytes]:
+    async with httpx.AsyncClient(timeout=deadline.timeout(15.0), follow_redirects=True) as client, track_upstream("avatar.fetch"):
+        response = await client.get(avatar_url)
+        response.raise_for_status()
+    data = response.content
+    if len(data) > settings.AVATAR_MAX_BYTES:
+        raise ValueError(f"Avatar is {len(data)} bytes, limit is {settings.AVATAR_MAX_BYTES}")
+    digest = hashlib.sha256(data).hexdigest()
+    await asyncio.to_thread(_disk.write, digest, data)
+    return digest, data
+
+
+async def store(avatar_url: str) -> str:
+    """Fetch a platform avatar into the disk cache; returns its sha256 hex digest."""
+    digest, _ = await _fetch(avatar_url)
+    return digest
+
+
+async def try_store(avatar_url: Optional[str]) -> Optional[str]:
+    """store() for callers that must not fail because of an avatar; None on any error."""
+    if not avatar_url:
+        return None
+    try:
+        return await store(avatar_url)
+    except Exception as e:
+        logger.warning("Could not cache avatar %s: %s", avatar_url, e)
+        return None
+
+
+async def backfill(account_id: str, avatar_url: str):
+    """Cache the avatar of an account linked before the proxy existed (once per process)."""
+    if account_id in _backfilled:
+        return
+    _backfilled.add(account_id)
+    digest = await try_store(avatar_url)
+    if digest:
+        supabase_admin.table("social_accounts").update({"avatar_hash": digest}).eq("id", account_id).execute()
+
+
+async def _original(digest: str) -> bytes:
+    data = await asyncio.to_thread(_disk.read, digest)
+    if data is not None:
+        return data
+    # Evicted (or cached on another instance): fetch again from the platform URL
+    rows = supabase_admin.table("social_accounts").select("avatar_url").eq(
+        "avatar_hash", digest
+    ).limit(1).execute()
+    if not rows.data or not rows.data[0].get("avatar_url"):
+        raise LookupError(digest)
+    fetched, data = await _fetch(rows.data[0]["avatar_url"])
+    if fetched != digest:
+        # The platform changed the image: point accounts at the new one; this digest is gone
+        supabase_admin.table("social_accounts").update({"avatar_hash": fetched}).eq("avatar_hash", digest).execute()
+        raise LookupError(digest)
+    return data
+
+
+async def _render(digest: str, size: int, name: str) -> bytes:
+    thumbnail = await image_pipeline.render(await _original(digest), ImageSpec(max_width=size, max_height=size))
+    await asyncio.to_thread(_disk.write, name, thumbnail)
+    return thumbnail
+
+
+async def thumbnail(digest: str, size: int) -> bytes:
+    """JPEG thumbnail of the avatar ``digest`` fitting size x size. Raises LookupError if unknown."""
+    name = f"{digest}.{size}.jpg"
+    data = await asyncio.to_thread(_disk.read, name)
+    if data is not None:
+        AVATAR_REQUESTS.inc("hit")
+        return data
+
+    task = _rendering.get(name)
+    if task is None:
+        AVATAR_REQUESTS.inc("rendered")
+        task = _rendering[name] = asyncio.create_task(_render(digest, size, name))
+        task.add_done_callback(lambda t: _rendering.pop(name, None) and (t.cancelled() or t.exception()))
+    else:
+        AVATAR_REQUESTS.inc("shared")
+    return await asyncio.shield(task)
@@ -0,0 +1,174 @@
+"""
+Circuit breakers for upstream platform endpoints.
+
+One breaker per (platform, endpoint). Each keeps a sliding time window of
+call outcomes; once enough calls have been seen and the share of failures
+(errors plus calls slower than CIRCUIT_SLOW_CALL_SECONDS) crosses the
+threshold, the breaker opens and calls fail immediately with
+CircuitOpenError instead of waiting out upstream timeouts. After
+CIRCUIT_OPEN_SECONDS it goes half-open and lets a few probe calls through:
+all probes succeeding closes it, any failure re-opens it.
+"""
+import asyncio
+import time
+from collections import deque
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.metrics import Gauge
+from app.services.platforms.base import ContentRejectedError, PlatformError, SourceError, TokenExpiredError
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state", "Breaker state per platform endpoint (0 closed, 1 half-open, 2 open).",
+    ("platform", "endpoint"),
+)
+
+# Outcomes that say nothing about platform health (bad account or content, storage down, caller gave up)
+_IGNORED = (TokenExpiredError, ContentRejectedError, SourceError, asyncio.CancelledError, DeadlineExceeded)
+
+
+class CircuitOpenError(PlatformError):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+    retryable = True
+
+    def __init__(self, platform: str, endpoint: str, retry_after: float):
+        super().__init__(f"{platform} {endpoint} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.platform = platform
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, platform: str, endpoint: str):
+        self.platform = platform
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.window: deque = deque()  # (timestamp, failed, latency)
+        self.rejected = 0
+
+    # ── State machine ────────────────────────────────────────
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], self.platform, self.endpoint)
+
+    def _trim(self, now: float):
+        horizon = now - settings.CIRCUIT_WINDOW_SECONDS
+        while self.window and self.window[0][0] < horizon:
+            self.window.popleft()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + settings.CIRCUIT_OPEN_SECONDS - time.monotonic())
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError."""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.platform, self.endpoint, self.retry_after())
+            self._set_state(HALF_OPEN)
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= settings.CIRCUIT_HALF_OPEN_PROBES:
+                self.rejected += 1
+                raise CircuitOpenError(self.platform, self.endpoint, settings.CIRCUIT_OPEN_SECONDS / 2)
+            self.probes_in_flight += 1
+
+    def after_call(self, failed: bool, latency: float):
+        now = time.monotonic()
+        failed = failed or latency > settings.CIRCUIT_SLOW_CALL_SECONDS
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if failed:
+                self._open(now)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= settings.CIRCUIT_HALF_OPEN_PROBES:
+                self.window.clear()
+                self._set_state(CLOSED)
+            return
+
+        self.window.append((now, failed, latency))
+        self._trim(now)
+        if self.state == CLOSED and len(self.window) >= settings.CIRCUIT_MIN_CALLS:
+            failures = sum(1 for _, f, _ in self.window if f)
+            if failures / len(self.window) >= settings.CIRCUIT_ERROR_THRESHOLD:
+                self._open(now)
+
+    def _open(self, now: float):
+        self.opened_at = now
+        self._set_state(OPEN)
+
+    def reset(self):
+        self.window.clear()
+        self.probes_in_flight = 0
+        self._set_state(CLOSED)
+
+    def snapshot(self) -> dict:
+        self._trim(time.monotonic())
+        calls = len(self.window)
+        failures = sum(1 for _, f, _ in self.window if f)
+        latencies = sorted(lat for _, _, lat in self.window)
+        return {
+            "platform": self.platform,
+            "endpoint": self.endpoint,
+            "state": self.state,
+            "calls_in_window": calls,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "retry_after_s": round(self.retry_after(), 1) if self.state == OPEN else None,
+            "rejected": self.rejected,
+        }
+
+
+class _Guard:
+    """One guarded call: admits it, times it and reports the outcome."""
+
+    __slots__ = ("cb", "started")
+
+    def __init__(self, cb: CircuitBreaker):
+        self.cb = cb
+        self.started = 0.0
+
+    async def __aenter__(self):
+        self.cb.before_call()
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        cb = self.cb
+        if exc_type is not None and issubclass(exc_type, (CircuitOpenError, *_IGNORED)):
+            # Not a verdict on this endpoint; just release the probe slot
+            if cb.state == HALF_OPEN:
+                cb.probes_in_flight = max(0, cb.probes_in_flight - 1)
+            return False
+        cb.after_call(exc_type is not None, time.monotonic() - self.started)
+        return False
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(platform: str, endpoint: str) -> CircuitBreaker:
+    key = (platform, endpoint)
+    cb = _breakers.get(key)
+    if cb is None:
+        cb = _breakers[key] = CircuitBreaker(platform, endpoint)
+    return cb
+
+
+def guard(platform: str, endpoint: str) -> _Guard:
+    """``async with guard("douyin", "upload"): ...`` - fails fast while the breaker is open."""
+    return _Guard(get_breaker(platform, endpoint))
+
+
+def all_breakers() -> list[dict]:
+    return [cb.snapshot() for cb in _breakers.values()]
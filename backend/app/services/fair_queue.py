@@ -0,0 +1,195 @@
+"""
+Weighted fair queueing of publish work across users.
+
+PUBLISH_SLOTS publishes run at once. When they are all busy, callers wait in
+a per-user FIFO and freed slots are handed out by deficit round-robin: each
+round a backlogged user earns credit equal to their plan weight and one
+credit buys one slot. A user scheduling a 500-video campaign therefore gets
+at most ``weight`` slots per round, and a user with one post is served
+within a round instead of waiting behind the whole campaign.
+
+Starvation protection: a job that has waited PUBLISH_MAX_QUEUE_WAIT_SECONDS
+is served next regardless of credit.
+
+    async with fair_queue.slot(user_id):
+        ...
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from app.core.config import plan_weights, settings, user_plans
+from app.core.metrics import Gauge, Histogram
+
+QUEUE_DEPTH = Gauge("publish_queue_depth", "Publish jobs waiting for a slot, per plan.", ("plan",))
+QUEUE_WAIT = Histogram(
+    "publish_queue_wait_seconds", "Time a publish job waited for a slot, per plan.", ("plan",),
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+
+
+def plan_for(user_id: str) -> str:
+    return user_plans.get(user_id, settings.DEFAULT_PLAN)
+
+
+def weight_for(user_id: str) -> float:
+    return max(plan_weights.get(plan_for(user_id), 1.0), 0.01)
+
+
+class _UserQueue:
+    __slots__ = ("user_id", "plan", "weight", "waiters", "deficit", "running", "served", "recent_waits")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.plan = plan_for(user_id)
+        self.weight = weight_for(user_id)
+        self.waiters: deque = deque()  # (enqueued_at, future)
+        self.deficit = 0.0
+        self.running = 0
+        self.served = 0
+        self.recent_waits: deque = deque(maxlen=100)
+
+
+class FairQueue:
+    def __init__(self, slots: int, max_wait: float):
+        self.slots = slots
+        self.max_wait = max_wait
+        self.in_use = 0
+        self.users: dict[str, _UserQueue] = {}
+        self.active: deque = deque()  # Round-robin ring of users with waiters
+        self.starvation_grants = 0
+
+    def _user(self, user_id: str) -> _UserQueue:
+        queue = self.users.get(user_id)
+        if queue is None:
+            queue = self.users[user_id] = _UserQueue(user_id)
+        return queue
+
+    def slot(self, user_id: str) -> "_Slot":
+        return _Slot(self, user_id)
+
+    # ── Acquire / release ────────────────────────────────────
+
+    async def acquire(self, user_id: str):
+        queue = self._user(user_id)
+        if self.in_use < self.slots and not self.active:
+            self._grant(queue, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (time.monotonic(), future)
+        if not queue.waiters:
+            self.active.append(queue)
+        queue.waiters.append(entry)
+        QUEUE_DEPTH.inc(queue.plan)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(user_id)  # Granted just as the caller gave up
+            elif entry in queue.waiters:
+                queue.waiters.remove(entry)
+                QUEUE_DEPTH.dec(queue.plan)
+                if not queue.waiters:
+                    self._deactivate(queue)
+            raise
+
+    def release(self, user_id: str):
+        self.in_use -= 1
+        self.users[user_id].running -= 1
+        self._dispatch()
+
+    def _grant(self, queue: _UserQueue, waited: float):
+        self.in_use += 1
+        queue.running += 1
+        queue.served += 1
+        queue.recent_waits.append(waited)
+        QUEUE_WAIT.observe(waited, queue.plan)
+
+    def _deactivate(self, queue: _UserQueue):
+        self.active.remove(queue)
+        queue.deficit = 0.0  # Credit does not carry over idle periods
+
+    def _dispatch(self):
+        while self.in_use < self.slots and self.active:
+            queue = self._starved() or self._next_by_deficit()
+            enqueued_at, future = queue.waiters.popleft()
+            QUEUE_DEPTH.dec(queue.plan)
+            if not queue.waiters:
+                self._deactivate(queue)
+            if future.cancelled():
+                continue
+            self._grant(queue, time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    def _starved(self) -> Optional[_UserQueue]:
+        horizon = time.monotonic() - self.max_wait
+        oldest = min(self.active, key=lambda q: q.waiters[0][0])
+        if oldest.waiters[0][0] <= horizon:
+            self.starvation_grants += 1
+            return oldest
+        return None
+
+    def _next_by_deficit(self) -> _UserQueue:
+        while True:
+            queue = self.active[0]
+            if queue.deficit < 1:
+                queue.deficit += queue.weight  # A new turn: earn this round's credit
+                if queue.deficit < 1:
+                    self.active.rotate(-1)  # Fractional weights accumulate over several rounds
+                    continue
+            queue.deficit -= 1
+            if queue.deficit < 1:
+                self.active.rotate(-1)  # Credit spent; next user's turn
+            return queue
+
+    # ── Introspection ────────────────────────────────────────
+
+    def user_stats(self, user_id: str) -> dict:
+        queue = self.users.get(user_id)
+        if queue is None:
+            return {"user_id": user_id, "plan": plan_for(user_id), "queued": 0, "running": 0, "served": 0,
+                    "oldest_wait_s": None, "p50_wait_s": None, "max_wait_s": None}
+        waits = sorted(queue.recent_waits)
+        return {
+            "user_id": user_id,
+            "plan": queue.plan,
+            "queued": len(queue.waiters),
+            "running": queue.running,
+            "served": queue.served,
+            "oldest_wait_s": round(time.monotonic() - queue.waiters[0][0], 3) if queue.waiters else None,
+            "p50_wait_s": round(waits[len(waits) // 2], 3) if waits else None,
+            "max_wait_s": round(waits[-1], 3) if waits else None,
+        }
+
+    def waiting(self) -> int:
+        """Jobs waiting for a slot, across all users."""
+        return sum(len(queue.waiters) for queue in self.active)
+
+    def snapshot(self) -> dict:
+        return {
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "starvation_grants": self.starvation_grants,
+            "users": [self.user_stats(user_id) for user_id in self.users],
+        }
+
+
+class _Slot:
+    __slots__ = ("queue", "user_id")
+
+    def __init__(self, queue: FairQueue, user_id: str):
+        self.queue = queue
+        self.user_id = user_id
+
+    async def __aenter__(self):
+        await self.queue.acquire(self.user_id)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.queue.release(self.user_id)
+        return False
+
+
+fair_queue = FairQueue(settings.PUBLISH_SLOTS, settings.PUBLISH_MAX_QUEUE_WAIT_SECONDS)
@@ -0,0 +1,149 @@
+"""
+Image stage for image_text posts and covers.
+
+Decoding, resizing and recompressing are CPU-bound, so imaging.render runs in
+a small process pool instead of on the event loop. Renditions are cached by
+(sha256 of the source bytes, spec): a picture reused across posts, accounts
+or URLs is rendered once per platform spec. upload_images fetches, renders
+and uploads the images of one post in parallel, at most
+IMAGE_UPLOAD_CONCURRENCY at a time, and returns the image ids in post order.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import httpx
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import Counter, track_upstream
+from app.services import imaging
+from app.services.platforms.base import ImageSpec, PlatformAdapter, PlatformError
+
+RENDITIONS = Counter("image_renditions_total", "Image renditions by outcome.", ("result",))
+
+
+class ImageRejectedError(PlatformError):
+    """A source image could not be decoded or is too large; retrying will not help."""
+
+
+# (source sha256, spec) -> rendered bytes, bounded by IMAGE_CACHE_BYTES
+_cache: OrderedDict = OrderedDict()
+_cache_bytes = 0
+_inflight: dict[tuple, asyncio.Future] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _remember(key: tuple, rendered: bytes):
+    global _cache_bytes
+    _cache[key] = rendered
+    _cache_bytes += len(rendered)
+    while _cache_bytes > settings.IMAGE_CACHE_BYTES and _cache:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= len(evicted)
+
+
+async def fetch(client: httpx.AsyncClient, url: str) -> bytes:
+    """Download a source image, refusing anything over IMAGE_MAX_SOURCE_BYTES."""
+    async with track_upstream("storage.image"), client.stream("GET", url) as response:
+        response.raise_for_status()
+        data = bytearray()
+        async for chunk in response.aiter_bytes():
+            data += chunk
+            if len(data) > settings.IMAGE_MAX_SOURCE_BYTES:
+                raise ImageRejectedError(f"Image {url} is larger than {settings.IMAGE_MAX_SOURCE_BYTES} bytes")
+        return bytes(data)
+
+
+async def render(source: bytes, spec: ImageSpec) -> bytes:
+    """Render ``source`` to ``spec`` in the worker pool (uncached). Raises imaging.ImageError."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor(), imaging.render, source, spec.max_width, spec.max_height, spec.format, spec.quality,
+    )
+
+
+async def rendition(source: bytes, spec: ImageSpec) -> bytes:
+    """``source`` rendered to ``spec`` (cached by content hash)."""
+    # hashlib releases the GIL on large inputs, so hashing a photo does not stall the loop
+    digest = await asyncio.to_thread(lambda: hashlib.sha256(source).digest())
+    key = (digest, spec)
+    rendered = _cache.get(key)
+    if rendered is not None:
+        _cache.move_to_end(key)
+        RENDITIONS.inc("cached")
+        return rendered
+
+    future = _inflight.get(key)
+    if future is not None:
+        RENDITIONS.inc("shared")  # Same picture already being rendered
+        return await asyncio.shield(future)
+
+    future = _inflight[key] = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Nobody else may be waiting
+    try:
+        rendered = await render(source, spec)
+    except imaging.ImageError as e:
+        RENDITIONS.inc("rejected")
+        error = ImageRejectedError(f"Unusable image: {e}")
+        future.set_exception(error)
+        raise error from None
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        RENDITIONS.inc("rendered")
+        _remember(key, rendered)
+        future.set_result(rendered)
+        return rendered
+    finally:
+        del _inflight[key]
+
+
+async def upload_images(
+    adapter: PlatformAdapter, account: dict, image_urls: list[str], spec: Optional[ImageSpec] = None,
+) -> list[str]:
+    """
+    Fetch, render to ``spec`` (default: the adapter's image_spec) and upload
+    each image; returns the platform image ids in the order of ``image_urls``.
+    """
+    spec = spec or adapter.image_spec
+    if spec is None:
+        raise ImageRejectedError(f"{adapter.platform_name} does not accept images")
+    access_token, open_id = account["access_token"], account["platform_user_id"]
+    content_type = imaging.content_type(spec.format)
+    limit = asyncio.Semaphore(settings.IMAGE_UPLOAD_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=deadline.timeout(60.0), follow_redirects=True) as client:
+
+        async def one(url: str) -> str:
+            async with limit:
+                rendered = await rendition(await fetch(client, url), spec)
+                return await adapter.upload_image(access_token, open_id, rendered, content_type)
+
+        return list(await asyncio.gather(*(one(url) for url in image_urls)))
+
+
+async def upload_cover(adapter: PlatformAdapter, account: dict, cover_url: str) -> Optional[str]:
+    """Upload a task's cover rendered to the adapter's cover_spec; None if the platform takes no covers."""
+    if adapter.cover_spec is None:
+        return None
+    return (await upload_images(adapter, account, [cover_url], adapter.cover_spec))[0]
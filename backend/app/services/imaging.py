@@ -0,0 +1,61 @@
+"""
+Image normalization: decode, downscale, strip metadata and recompress.
+
+Free of app imports so it loads quickly in image worker processes; only the
+functions here are sent to the pool.
+"""
+import io
+
+from PIL import Image, ImageCms, ImageOps, UnidentifiedImageError
+
+# Refuse decompression bombs outright instead of only warning
+Image.MAX_IMAGE_PIXELS = 64 * 1024 * 1024
+_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+_SRGB = ImageCms.createProfile("sRGB")
+
+
+class ImageError(ValueError):
+    """The bytes are not an image Pillow can decode, or the image is too large."""
+
+
+def content_type(fmt: str) -> str:
+    return _FORMATS[fmt]
+
+
+def _to_srgb(image: Image.Image) -> Image.Image:
+    """Drop the ICC profile, first converting the pixels to sRGB so colours survive."""
+    icc = image.info.pop("icc_profile", None)
+    if not icc or image.mode not in ("RGB", "RGBA", "CMYK"):
+        return image
+    try:
+        converted = ImageCms.profileToProfile(
+            image, ImageCms.ImageCmsProfile(io.BytesIO(icc)), _SRGB,
+            outputMode="RGBA" if image.mode == "RGBA" else "RGB",
+        )
+    except (ImageCms.PyCMSError, OSError):
+        return image  # Unusable profile: keep the pixels as they are
+    converted.info.pop("icc_profile", None)
+    return converted
+
+
+def render(source: bytes, max_width: int, max_height: int, fmt: str = "JPEG", quality: int = 85) -> bytes:
+    """
+    Return ``source`` as ``fmt`` fitting within max_width x max_height (never
+    upscaled). EXIF orientation is applied to the pixels and colours are
+    converted to sRGB, then all metadata (EXIF, ICC, text chunks) is dropped,
+    whatever the format. Runs in an image worker process.
+    """
+    try:
+        with Image.open(io.BytesIO(source)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+            image = _to_srgb(image)
+            if fmt == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            # Pillow writes the ICC profile it finds in image.info (removed above)
+            # and only the other metadata it is given, so bare pixels are saved
+            image.save(out, fmt, quality=quality, optimize=True)
+            return out.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageError(str(e)) from None
@@ -0,0 +1,241 @@
+"""
+Media probing: inspect a video's container header without downloading it.
+
+probe() reads the first MEDIA_PROBE_HEAD_BYTES with a ranged GET, walks the
+top-level MP4 boxes (fetching just a box header for each box it skips) and
+then fetches only the moov box, which holds duration, codecs and
+resolution. Parsing runs in a small process pool, off the event loop.
+Results are cached per video_url, so the check at task creation makes the
+one before upload free.
+
+check() compares a MediaInfo with the MediaLimits an adapter declares and
+returns human-readable problems; an empty list means the file is acceptable.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import httpx
+from httpx import HTTPError
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import Counter, track_upstream
+from app.services import mp4
+from app.services.platforms.base import MediaLimits, PlatformError
+
+logger = logging.getLogger(__name__)
+
+PROBES = Counter("media_probes_total", "Media probes by outcome.", ("result",))
+
+_MAX_TOP_LEVEL_BOXES = 64
+
+
+class ProbeError(Exception):
+    """The file is unreadable as media: unknown container, truncated or corrupt."""
+
+
+class MediaRejectedError(PlatformError):
+    """The video breaks the platform's media limits; uploading it would be wasted."""
+
+
+@dataclass
+class MediaInfo:
+    size: Optional[int]
+    container: str
+    duration_s: Optional[float] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    @property
+    def bitrate(self) -> Optional[int]:
+        if self.size and self.duration_s:
+            return int(self.size * 8 / self.duration_s)
+        return None
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "bitrate": self.bitrate}
+
+
+# video_url -> MediaInfo or ProbeError (definitive failures are cached too)
+_cache: OrderedDict = OrderedDict()
+_inflight: dict[str, asyncio.Future] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.MEDIA_PROBE_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _read(client: httpx.AsyncClient, url: str, start: int, length: int) -> tuple[bytes, Optional[int]]:
+    """Read ``length`` bytes at ``start``. Returns (data, total file size if known)."""
+    headers = {"Range": f"bytes={start}-{start + length - 1}"}
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 416:
+            return b"", start
+        response.raise_for_status()
+        if response.status_code == 206:
+            total = response.headers.get("content-range", "").rpartition("/")[2]
+            data = await response.aread()
+            return data, int(total) if total.isdigit() else None
+        # Server ignored the range: read up to what we need and drop the connection
+        total = int(response.headers.get("content-length") or 0) or None
+        data = bytearray()
+        async for chunk in response.aiter_bytes():
+            data += chunk
+            if len(data) >= start + length:
+                break
+        return bytes(data[start:start + length]), total
+
+
+async def _probe(video_url: str) -> MediaInfo:
+    async with httpx.AsyncClient(timeout=deadline.timeout(30.0), follow_redirects=True) as client, track_upstream("storage.probe"):
+        head, size = await _read(client, video_url, 0, settings.MEDIA_PROBE_HEAD_BYTES)
+        container = mp4.sniff_container(head)
+        if container is None:
+            raise ProbeError("Unrecognized video container")
+        if container != "mp4":
+            return MediaInfo(size=size, container=container)
+
+        total = size if size is not None else len(head)
+        offset = 0
+        for _ in range(_MAX_TOP_LEVEL_BOXES):
+            if offset >= total:
+                break
+            header = head[offset:offset + 16]
+            if len(header) < 16 and offset + len(header) < total:
+                header, _ = await _read(client, video_url, offset, 16)
+            try:
+                kind, header_len, box_len = mp4.box_header(header, offset, total)
+            except mp4.Mp4Error as e:
+                raise ProbeError(f"Corrupt MP4: {e}")
+            if kind == "moov":
+                if box_len > settings.MEDIA_PROBE_MAX_MOOV_BYTES:
+                    raise ProbeError("MP4 header (moov box) is implausibly large")
+                if offset + box_len <= len(head):
+                    moov = head[offset + header_len:offset + box_len]
+                else:
+                    moov, _ = await _read(client, video_url, offset + header_len, box_len - header_len)
+                if len(moov) < box_len - header_len:
+                    raise ProbeError("MP4 is truncated inside its header")
+                break
+            offset += box_len
+        else:
+            raise ProbeError("Too many top-level MP4 boxes")
+        if offset >= total:
+            raise ProbeError("MP4 has no moov box; the file is truncated or not finalized")
+
+    try:
+        fields = await asyncio.get_running_loop().run_in_executor(_executor(), mp4.parse_moov, moov)
+    except mp4.Mp4Error as e:
+        raise ProbeError(str(e))
+    return MediaInfo(size=size, container="mp4", **fields)
+
+
+def cached(video_url: str):
+    """The cached MediaInfo or ProbeError for ``video_url``, or None if it has not been probed."""
+    result = _cache.get(video_url)
+    if result is not None:
+        _cache.move_to_end(video_url)
+        PROBES.inc("cached")
+    return result
+
+
+async def probe(video_url: str) -> MediaInfo:
+    """Inspect ``video_url`` (cached). Raises ProbeError for unreadable media, httpx errors if unreachable."""
+    result = cached(video_url)
+    if isinstance(result, ProbeError):
+        raise result
+    if result is not None:
+        return result
+
+    future = _inflight.get(video_url)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = _inflight[video_url] = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Nobody else may be waiting
+    try:
+        info = await _probe(video_url)
+    except ProbeError as e:
+        PROBES.inc("unreadable")
+        _remember(video_url, e)
+        future.set_exception(e)
+        raise
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        PROBES.inc("error")
+        future.set_exception(e)  # Transient: not cached
+        raise
+    else:
+        PROBES.inc("ok")
+        _remember(video_url, info)
+        future.set_result(info)
+        return info
+    finally:
+        del _inflight[video_url]
+
+
+def _remember(video_url: str, result):
+    _cache[video_url] = result
+    while len(_cache) > settings.MEDIA_PROBE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def check(info: MediaInfo, limits: MediaLimits) -> list[str]:
+    problems = []
+    if limits.containers and info.container not in limits.containers:
+        problems.append(f"container {info.container} is not supported (allowed: {', '.join(limits.containers)})")
+    if limits.video_codecs is not None and info.container == "mp4":
+        if info.video_codec is None:
+            problems.append("no video track found")
+        elif info.video_codec not in limits.video_codecs:
+            problems.append(f"video codec {info.video_codec} is not supported (allowed: {', '.join(limits.video_codecs)})")
+    if limits.max_bytes and info.size and info.size > limits.max_bytes:
+        problems.append(f"file is {info.size / 1024 ** 2:.0f} MB, limit is {limits.max_bytes / 1024 ** 2:.0f} MB")
+    if info.duration_s is not None:
+        if limits.max_duration_s and info.duration_s > limits.max_duration_s:
+            problems.append(f"duration {info.duration_s:.0f}s exceeds {limits.max_duration_s:.0f}s")
+        if limits.min_duration_s and info.duration_s < limits.min_duration_s:
+            problems.append(f"duration {info.duration_s:.1f}s is below {limits.min_duration_s:.0f}s")
+    if limits.max_width and info.width and info.width > limits.max_width:
+        problems.append(f"width {info.width}px exceeds {limits.max_width}px")
+    if limits.max_height and info.height and info.height > limits.max_height:
+        problems.append(f"height {info.height}px exceeds {limits.max_height}px")
+    return problems
+
+
+async def ensure_publishable(video_url: str, platform: str, limits: Optional[MediaLimits]):
+    """
+    Pre-upload check: raise MediaRejectedError if the video breaks ``limits``
+    or is unreadable. If storage cannot be reached the upload is attempted anyway.
+    """
+    if not settings.MEDIA_PROBE_ENABLED or limits is None or not video_url:
+        return
+    try:
+        info = await probe(video_url)
+    except ProbeError as e:
+        raise MediaRejectedError(f"Video rejected for {platform}: {e}")
+    except HTTPError as e:
+        logger.warning("Could not probe %s before upload, uploading anyway: %s", video_url, e)
+        return
+    problems = check(info, limits)
+    if problems:
+        raise MediaRejectedError(f"Video rejected for {platform}: {'; '.join(problems)}")
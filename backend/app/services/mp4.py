@@ -0,0 +1,109 @@
+"""
+Minimal ISO-BMFF (MP4 / MOV) header parsing.
+
+Only what media probing needs: the top-level box layout and, from the moov
+box, duration, codecs and video resolution. Pure stdlib and free of app
+imports so it loads quickly in probe worker processes.
+"""
+import struct
+from typing import Optional
+
+MATROSKA_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+class Mp4Error(ValueError):
+    """The bytes are not a well-formed MP4 header."""
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+        return "mp4"
+    if head[:4] == MATROSKA_MAGIC:
+        return "matroska"
+    return None
+
+
+def box_header(data: bytes, offset: int, total: int) -> tuple[str, int, int]:
+    """(type, header length, box length) for the box at ``offset`` of a file ``total`` bytes long."""
+    if len(data) < 8:
+        raise Mp4Error("Truncated box header")
+    size, kind = struct.unpack(">I4s", data[:8])
+    header = 8
+    if size == 1:
+        if len(data) < 16:
+            raise Mp4Error("Truncated box header")
+        size = struct.unpack(">Q", data[8:16])[0]
+        header = 16
+    elif size == 0:
+        size = total - offset  # Box runs to the end of the file
+    if size < header:
+        raise Mp4Error(f"Invalid size {size} for box {kind!r}")
+    return kind.decode("latin-1"), header, size
+
+
+def _children(payload: bytes):
+    offset = 0
+    while offset + 8 <= len(payload):
+        kind, header, size = box_header(payload[offset:offset + 16], offset, len(payload))
+        if offset + size > len(payload):
+            raise Mp4Error(f"Box {kind} overruns its parent")
+        yield kind.encode("latin-1"), payload[offset + header:offset + size]
+        offset += size
+
+
+def _times(payload: bytes) -> tuple[int, int]:
+    """(timescale, duration) from an mvhd / mdhd payload."""
+    if payload[0] == 1:
+        timescale, duration = struct.unpack(">IQ", payload[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", payload[12:20])
+    return timescale, duration
+
+
+def _track(trak: bytes) -> dict:
+    track: dict = {}
+    for kind, payload in _children(trak):
+        if kind == b"tkhd":
+            base = 88 if payload[0] == 1 else 76
+            width, height = struct.unpack(">II", payload[base:base + 8])
+            track["width"], track["height"] = width >> 16, height >> 16
+        elif kind == b"mdia":
+            for mkind, mpayload in _children(payload):
+                if mkind == b"hdlr":
+                    track["handler"] = mpayload[8:12].decode("latin-1")
+                elif mkind == b"mdhd":
+                    track["timescale"], track["duration"] = _times(mpayload)
+                elif mkind == b"minf":
+                    for nkind, npayload in _children(mpayload):
+                        if nkind != b"stbl":
+                            continue
+                        for skind, spayload in _children(npayload):
+                            if skind == b"stsd" and len(spayload) >= 16:
+                                track["codec"] = spayload[12:16].decode("latin-1")
+    return track
+
+
+def parse_moov(moov: bytes) -> dict:
+    """
+    Parse a moov box payload. Returns duration_s, video_codec, audio_codec,
+    width and height (None where absent). Runs in a probe worker process.
+    """
+    info: dict = {"duration_s": None, "video_codec": None, "audio_codec": None, "width": None, "height": None}
+    try:
+        for kind, payload in _children(moov):
+            if kind == b"mvhd":
+                timescale, duration = _times(payload)
+                if timescale:
+                    info["duration_s"] = duration / timescale
+            elif kind == b"trak":
+                track = _track(payload)
+                if track.get("handler") == "vide" and info["video_codec"] is None:
+                    info["video_codec"] = track.get("codec")
+                    info["width"], info["height"] = track.get("width"), track.get("height")
+                    if info["duration_s"] is None and track.get("timescale"):
+                        info["duration_s"] = track["duration"] / track["timescale"]
+                elif track.get("handler") == "soun" and info["audio_codec"] is None:
+                    info["audio_codec"] = track.get("codec")
+    except (struct.error, IndexError) as e:
+        raise Mp4Error(f"Corrupt moov box: {e}") from None
+    return info
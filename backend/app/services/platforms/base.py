@@ -1,5 +1,66 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+
+class PlatformError(Exception):
+    """Error reported by a platform API. ``retryable`` errors may succeed if attempted again."""
+
+    retryable = False
+
+
+class RateLimitedError(PlatformError):
+    """The platform throttled the call; retry after ``retry_after`` seconds."""
+
+    retryable = True
+
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenExpiredError(PlatformError):
+    """The account's access token is expired or revoked; the account must be refreshed."""
+
+
+class ContentRejectedError(PlatformError):
+    """The platform answered but refused the request: the content, its format or the account's rights."""
+
+
+class SourceError(Exception):
+    """Reading the source media from our storage failed; not the platform's doing."""
+
+
+@dataclass(frozen=True)
+class MediaLimits:
+    """What a platform accepts for video uploads; None means unchecked."""
+
+    containers: tuple[str, ...] = ("mp4",)
+    video_codecs: Optional[tuple[str, ...]] = None  # MP4 sample entry fourccs, e.g. "avc1"
+    max_bytes: Optional[int] = None
+    min_duration_s: Optional[float] = None
+    max_duration_s: Optional[float] = None
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    """How a platform wants images: fit within max_width x max_height, re-encoded as ``format``."""
+
+    max_width: int
+    max_height: int
+    format: str = "JPEG"  # Pillow format name
+    quality: int = 85
+
+
+# Media transfer capabilities, cheapest for our worker first. Every staged
+# adapter also supports the buffered fallback (fetch_source + upload_video).
+PULL_URL = "pull_url"  # The platform downloads the source from a signed URL we hand it
+PUSH_STREAM = "push_stream"  # We stream the source through in one request, chunk by chunk
+PART_UPLOAD = "part_upload"  # We stream the source through as a multi-part upload
+BUFFERED = "buffered"  # We download the whole source, then upload it
+TRANSFER_MODES = (PULL_URL, PUSH_STREAM, PART_UPLOAD, BUFFERED)
 
 
 class PlatformAdapter(ABC):
@@ -7,6 +68,17 @@ class PlatformAdapter(ABC):
 
     platform_name: str
 
+    # Adapters that can split publish_video into fetch / upload / create calls
+    # set this, so multi-video batches can be pipelined across those stages.
+    supports_staged_publish: bool = False
+    # Transfer modes beyond BUFFERED this adapter implements (see upload_from_url etc.)
+    transfer_modes: tuple[str, ...] = ()
+    # Checked against probed media before a task is created and before upload
+    media_limits: Optional[MediaLimits] = None
+    # Renditions for image_text post images and for covers; None means images are unsupported
+    image_spec: Optional[ImageSpec] = None
+    cover_spec: Optional[ImageSpec] = None
+
     @abstractmethod
     def get_auth_url(self, state: str) -> str:
         """Generate OAuth authorization URL."""
@@ -34,6 +106,41 @@ class PlatformAdapter(ABC):
     ) -> str:
         """Publish video. Returns item_id or published URL."""
 
+    async def fetch_source(self, video_url: str) -> bytes:
+        """Download the source video (staged publishing)."""
+        raise NotImplementedError
+
+    async def upload_video(self, access_token: str, open_id: str, content: bytes) -> str:
+        """Upload fetched video bytes. Returns the platform media id (staged publishing)."""
+        raise NotImplementedError
+
+    async def upload_from_url(self, access_token: str, open_id: str, source_url: str) -> str:
+        """Have the platform pull the video from ``source_url``. Returns the media id (PULL_URL)."""
+        raise NotImplementedError
+
+    async def upload_stream(self, access_token: str, open_id: str, chunks: AsyncIterator[bytes]) -> str:
+        """Upload the video from a chunk stream in one request. Returns the media id (PUSH_STREAM)."""
+        raise NotImplementedError
+
+    async def upload_parts(self, access_token: str, open_id: str, chunks: AsyncIterator[bytes]) -> str:
+        """Upload the video one chunk per part. Returns the media id (PART_UPLOAD)."""
+        raise NotImplementedError
+
+    async def create_post(
+        self,
+        access_token: str,
+        open_id: str,
+        media_id: str,
+        title: str,
+        description: Optional[str] = None,
+    ) -> str:
+        """Create the post for an uploaded video. Returns item_id (staged publishing)."""
+        raise NotImplementedError
+
+    async def upload_image(self, access_token: str, open_id: str, content: bytes, content_type: str) -> str:
+        """Upload one rendered image. Returns the platform image id (see image_spec)."""
+        raise NotImplementedError
+
     async def generate_share_url(self, **kwargs) -> Optional[str]:
         """Generate share/redirect URL (optional, Douyin H5 share only)."""
         return None
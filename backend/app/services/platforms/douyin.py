@@ -2,13 +2,26 @@ import hashlib
 import logging
 import secrets
 import time
-from typing import Optional
+from typing import AsyncIterator, Optional
 from urllib.parse import quote
 
 import httpx
 
+from app.core import deadline
 from app.core.config import settings
-from app.services.platforms.base import PlatformAdapter
+from app.core.metrics import track_upstream
+from app.services import circuit_breaker
+from app.services.platforms.base import (
+    PART_UPLOAD,
+    ContentRejectedError,
+    ImageSpec,
+    MediaLimits,
+    PlatformAdapter,
+    PlatformError,
+    RateLimitedError,
+    SourceError,
+    TokenExpiredError,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +32,64 @@ DOUYIN_REFRESH_URL = "https://open.douyin.com/oauth/refresh_token/"
 DOUYIN_USER_URL = "https://open.douyin.com/oauth/userinfo/"
 DOUYIN_VIDEO_CREATE_URL = "https://open.douyin.com/api/douyin/v1/video/create/"
 DOUYIN_VIDEO_UPLOAD_URL = "https://open.douyin.com/api/douyin/v1/video/upload/"
+DOUYIN_PART_INIT_URL = "https://open.douyin.com/api/douyin/v1/video/init_video_part_upload/"
+DOUYIN_PART_UPLOAD_URL = "https://open.douyin.com/api/douyin/v1/video/upload_video_part/"
+DOUYIN_PART_COMPLETE_URL = "https://open.douyin.com/api/douyin/v1/video/complete_video_part_upload/"
+DOUYIN_IMAGE_UPLOAD_URL = "https://open.douyin.com/api/douyin/v1/video/upload_image/"
 DOUYIN_CLIENT_TOKEN_URL = "https://open.douyin.com/oauth/client_token/"
 DOUYIN_TICKET_URL = "https://open.douyin.com/open/getticket/"
 
+# ── Error codes (data.error_code) ───────────────────────────
+# Busy / throttled: retried with backoff, and counted by the circuit breaker
+_RATE_LIMITED_CODES = {
+    2100004,  # 系统繁忙, retry later
+    2190001,  # App call quota used up
+}
+# The account's token is invalid or expired: refresh the account, do not retry
+_TOKEN_EXPIRED_CODES = {
+    2190002,  # access_token invalid
+    2190008,  # access_token expired
+    28001003,  # access_token invalid (v2 APIs)
+    28001008,  # access_token expired (v2 APIs)
+}
+# Douyin refused this request: its content or parameters, or the account's rights
+_REJECTED_CODES = {
+    2100005,  # Invalid parameters
+    2100007,  # No permission for this operation
+    2100009,  # User is banned from this operation
+    2190004,  # App lacks the scope
+    2190015,  # access_token and open_id do not match
+}
+
+
+def _checked(response: httpx.Response, failure: str) -> dict:
+    """
+    The response body, or the PlatformError subclass its status or error_code
+    maps to. Unlisted codes are treated as server-side failures, so an outage
+    reported as an unknown code still opens the breaker.
+    """
+    if response.status_code == 429:
+        retry_after = response.headers.get("Retry-After")
+        raise RateLimitedError(
+            f"{failure}: rate limited",
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+    if response.status_code >= 500:
+        raise PlatformError(f"{failure}: HTTP {response.status_code}")
+    data = response.json()
+    code = data.get("data", {}).get("error_code", 0)
+    if code == 0:
+        return data
+    message = f"{failure}: {data['data'].get('description') or code}"
+    if code in _RATE_LIMITED_CODES:
+        raise RateLimitedError(message)
+    if code in _TOKEN_EXPIRED_CODES:
+        raise TokenExpiredError(message)
+    if code in _REJECTED_CODES:
+        raise ContentRejectedError(message)
+    raise PlatformError(message)
+
+
 # ── H5 Share: token/ticket cache ────────────────────────────
 _client_token_cache: dict = {"token": None, "expires_at": 0}
 _ticket_cache: dict = {"ticket": None, "expires_at": 0}
@@ -31,6 +99,18 @@ class DouyinAdapter(PlatformAdapter):
     """Douyin platform adapter wrapping the full Douyin Open API."""
 
     platform_name = "douyin"
+    supports_staged_publish = True
+    transfer_modes = (PART_UPLOAD,)
+    media_limits = MediaLimits(
+        containers=("mp4",),
+        video_codecs=("avc1", "avc3", "hvc1", "hev1"),
+        max_bytes=4 * 1024 ** 3,
+        min_duration_s=1.0,
+        max_duration_s=15 * 60,
+        max_width=4096,
+        max_height=4096,
+    )
+    image_spec = ImageSpec(max_width=1080, max_height=1920)
 
     # ── OAuth ────────────────────────────────────────────────
 
@@ -47,7 +127,7 @@ class DouyinAdapter(PlatformAdapter):
 
     async def exchange_token(self, code: str) -> dict:
         """Exchange authorization code for access token."""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.exchange_token"):
             response = await client.post(
                 DOUYIN_TOKEN_URL,
                 data={
@@ -66,7 +146,7 @@ class DouyinAdapter(PlatformAdapter):
 
     async def refresh_token(self, refresh_token: str) -> dict:
         """Refresh expired access token."""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.refresh_token"):
             response = await client.post(
                 DOUYIN_REFRESH_URL,
                 data={
@@ -86,7 +166,7 @@ class DouyinAdapter(PlatformAdapter):
 
     async def get_user_info(self, access_token: str, open_id: str) -> dict:
         """Get user info from Douyin. Returns normalized {username, avatar_url}."""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.user_info"):
             response = await client.get(
                 DOUYIN_USER_URL,
                 params={"access_token": access_token, "open_id": open_id},
@@ -104,36 +184,79 @@ class DouyinAdapter(PlatformAdapter):
 
     # ── Video Publishing ─────────────────────────────────────
 
-    async def _upload_video(
-        self, access_token: str, open_id: str, video_url: str
-    ) -> str:
+    async def fetch_source(self, video_url: str) -> bytes:
+        """Download the source video from Supabase Storage."""
+        async with httpx.AsyncClient(timeout=deadline.timeout(300.0)) as client, track_upstream("storage.download"):
+            try:
+                video_response = await client.get(video_url)
+                video_response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise SourceError(f"Source download failed: {e}") from e
+            return video_response.content
+
+    async def upload_video(self, access_token: str, open_id: str, content: bytes) -> str:
         """
         Upload video to Douyin.
         Returns video_id for creating the post.
         """
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            # First download the video from Supabase Storage
-            video_response = await client.get(video_url)
-            video_content = video_response.content
-
-            # Upload to Douyin
-            response = await client.post(
-                DOUYIN_VIDEO_UPLOAD_URL,
-                params={"access_token": access_token, "open_id": open_id},
-                files={"video": ("video.mp4", video_content, "video/mp4")},
-            )
-            data = response.json()
-            if data.get("data", {}).get("error_code", 0) != 0:
-                raise Exception(
-                    data.get("data", {}).get("description", "Video upload failed")
+        async with circuit_breaker.guard("douyin", "upload"), httpx.AsyncClient(timeout=deadline.timeout(300.0)) as client:
+            with track_upstream("douyin.upload"):
+                response = await client.post(
+                    DOUYIN_VIDEO_UPLOAD_URL,
+                    params={"access_token": access_token, "open_id": open_id},
+                    files={"video": ("video.mp4", content, "video/mp4")},
                 )
+            data = _checked(response, "Video upload failed")
+            return data["data"]["video"]["video_id"]
+
+    async def upload_parts(self, access_token: str, open_id: str, chunks: AsyncIterator[bytes]) -> str:
+        """
+        Multi-part upload: the source is streamed through one chunk at a time.
+        Returns video_id for creating the post.
+        """
+        params = {"access_token": access_token, "open_id": open_id}
+        async with circuit_breaker.guard("douyin", "upload"), httpx.AsyncClient(timeout=deadline.timeout(300.0)) as client:
+            with track_upstream("douyin.upload_init"):
+                response = await client.post(DOUYIN_PART_INIT_URL, params=params)
+            data = _checked(response, "Video part upload init failed")
+            upload_id = data["data"]["upload_id"]
+
+            part_number = 0
+            async for chunk in chunks:
+                part_number += 1
+                with track_upstream("douyin.upload_part"):
+                    response = await client.post(
+                        DOUYIN_PART_UPLOAD_URL,
+                        params={**params, "upload_id": upload_id, "part_number": part_number},
+                        files={"video": ("video.mp4", chunk, "video/mp4")},
+                    )
+                _checked(response, f"Video part {part_number} upload failed")
+
+            with track_upstream("douyin.upload_complete"):
+                response = await client.post(DOUYIN_PART_COMPLETE_URL, params={**params, "upload_id": upload_id})
+            data = _checked(response, "Video part upload complete failed")
             return data["data"]["video"]["video_id"]
 
-    async def _create_video_post(
+    async def upload_image(self, access_token: str, open_id: str, content: bytes, content_type: str) -> str:
+        """
+        Upload one image of an image_text post.
+        Returns image_id for creating the post.
+        """
+        async with circuit_breaker.guard("douyin", "upload"), httpx.AsyncClient(timeout=deadline.timeout(60.0)) as client:
+            with track_upstream("douyin.upload_image"):
+                response = await client.post(
+                    DOUYIN_IMAGE_UPLOAD_URL,
+                    params={"access_token": access_token, "open_id": open_id},
+                    files={"image": ("image", content, content_type)},
+                )
+            data = _checked(response, "Image upload failed")
+            return data["data"]["image"]["image_id"]
+
+    async def create_post(
         self,
         access_token: str,
         open_id: str,
-        video_id: str,
+        media_id: str,
         title: str,
         description: Optional[str] = None,
     ) -> str:
@@ -141,7 +264,7 @@ class DouyinAdapter(PlatformAdapter):
         Create a video post on Douyin.
         Returns the published item_id.
         """
-        async with httpx.AsyncClient() as client:
+        async with circuit_breaker.guard("douyin", "create"), httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.create"):
             text = title
             if description:
                 text = f"{title}\n{description}"
@@ -150,15 +273,11 @@ class DouyinAdapter(PlatformAdapter):
                 DOUYIN_VIDEO_CREATE_URL,
                 params={"access_token": access_token, "open_id": open_id},
                 json={
-                    "video_id": video_id,
+                    "video_id": media_id,
                     "text": text,
                 },
             )
-            data = response.json()
-            if data.get("data", {}).get("error_code", 0) != 0:
-                raise Exception(
-                    data.get("data", {}).get("description", "Video create failed")
-                )
+            data = _checked(response, "Video create failed")
             return data["data"]["item_id"]
 
     async def publish_video(
@@ -170,11 +289,13 @@ class DouyinAdapter(PlatformAdapter):
         description: Optional[str] = None,
     ) -> str:
         """
-        Full flow: upload video and create post.
+        Full flow: download, upload video and create post.
         Returns the item_id (can be used to construct the video URL).
         """
-        video_id = await self._upload_video(access_token, open_id, video_url)
-        item_id = await self._create_video_post(
+        content = await self.fetch_source(video_url)
+        video_id = await self.upload_video(access_token, open_id, content)
+        del content
+        item_id = await self.create_post(
             access_token, open_id, video_id, title, description
         )
         return item_id
@@ -190,7 +311,7 @@ class DouyinAdapter(PlatformAdapter):
         ):
             return _client_token_cache["token"]
 
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.client_token"):
             response = await client.post(
                 DOUYIN_CLIENT_TOKEN_URL,
                 json={
@@ -219,7 +340,7 @@ class DouyinAdapter(PlatformAdapter):
             return _ticket_cache["ticket"]
 
         client_token = await self._get_client_token()
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(5.0)) as client, track_upstream("douyin.ticket"):
             response = await client.get(
                 DOUYIN_TICKET_URL,
                 params={"access_token": client_token},
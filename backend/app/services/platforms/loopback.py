@@ -0,0 +1,212 @@
+"""
+Loopback platform adapter for publish-engine stress testing.
+
+Never talks to the network. Each call sleeps for a latency drawn from a
+configurable distribution, source fetches and uploads are charged
+``video_bytes / bandwidth`` seconds, and calls can be rate limited, hit
+token expiry or fail at random. Behaviour is configured per account (keyed
+by open_id) with a default profile for everything else:
+
+    from app.services.platforms import register
+    from app.services.platforms.loopback import LoopbackAdapter, LoopbackProfile
+
+    adapter = LoopbackAdapter()
+    adapter.configure("open-id-1", LoopbackProfile(failure_rate=0.2))
+    register(adapter)
+"""
+import asyncio
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+from app.services.platforms.base import (
+    PULL_URL,
+    ImageSpec,
+    PlatformAdapter,
+    PlatformError,
+    RateLimitedError,
+    TokenExpiredError,
+)
+
+LatencyDistribution = Literal["fixed", "uniform", "lognormal"]
+
+
+@dataclass
+class LoopbackProfile:
+    # Per-call latency: fixed -> latency_s; uniform -> [latency_s, latency_max_s];
+    # lognormal -> median latency_s with shape latency_sigma
+    latency: LatencyDistribution = "lognormal"
+    latency_s: float = 0.05
+    latency_max_s: float = 0.2
+    latency_sigma: float = 0.5
+    video_bytes: int = 8 * 1024 * 1024
+    upload_bandwidth: float = 50 * 1024 * 1024  # bytes/s; 0 = instant
+    rate_limit_per_s: float = 0.0  # 0 = unlimited
+    rate_limit_burst: int = 5
+    retry_after_s: float = 1.0
+    token_ttl_s: float = 86400.0
+    failure_rate: float = 0.0
+    create_failure_rate: float = 0.0
+
+
+@dataclass
+class _AccountState:
+    tokens: float = 0.0
+    refilled_at: float = field(default_factory=time.monotonic)
+    calls: int = 0
+    published: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+
+
+class LoopbackAdapter(PlatformAdapter):
+    """In-process fake platform with per-account fault injection."""
+
+    platform_name = "loopback"
+    supports_staged_publish = True
+    image_spec = ImageSpec(max_width=1080, max_height=1440)
+    cover_spec = ImageSpec(max_width=720, max_height=1280)
+
+    def __init__(self, default: Optional[LoopbackProfile] = None, seed: Optional[int] = None,
+                 transfer_modes: tuple[str, ...] = (PULL_URL,)):
+        self.default = default or LoopbackProfile()
+        self.transfer_modes = transfer_modes
+        self.profiles: dict[str, LoopbackProfile] = {}
+        self.state: dict[str, _AccountState] = {}
+        self.random = random.Random(seed)
+
+    def configure(self, open_id: str, profile: LoopbackProfile):
+        self.profiles[open_id] = profile
+
+    def profile_for(self, open_id: str) -> LoopbackProfile:
+        return self.profiles.get(open_id, self.default)
+
+    def stats(self) -> dict[str, dict]:
+        return {open_id: vars(state).copy() for open_id, state in self.state.items()}
+
+    # ── Fault injection ──────────────────────────────────────
+
+    async def _latency(self, profile: LoopbackProfile):
+        if profile.latency == "fixed":
+            delay = profile.latency_s
+        elif profile.latency == "uniform":
+            delay = self.random.uniform(profile.latency_s, profile.latency_max_s)
+        else:
+            delay = self.random.lognormvariate(0, profile.latency_sigma) * profile.latency_s
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _admit(self, open_id: str, profile: LoopbackProfile) -> _AccountState:
+        state = self.state.setdefault(open_id, _AccountState(tokens=profile.rate_limit_burst))
+        state.calls += 1
+        if profile.rate_limit_per_s > 0:
+            now = time.monotonic()
+            state.tokens = min(
+                profile.rate_limit_burst,
+                state.tokens + (now - state.refilled_at) * profile.rate_limit_per_s,
+            )
+            state.refilled_at = now
+            if state.tokens < 1:
+                state.rate_limited += 1
+                raise RateLimitedError("Loopback rate limit exceeded", retry_after=profile.retry_after_s)
+            state.tokens -= 1
+        return state
+
+    def _check_token(self, access_token: str):
+        try:
+            _, _, expires_at = access_token.split(":", 2)
+            expired = time.time() >= float(expires_at)
+        except ValueError:
+            expired = False  # Tokens not issued by this adapter never expire
+        if expired:
+            raise TokenExpiredError("Loopback access token expired")
+
+    def _maybe_fail(self, state: _AccountState, rate: float, what: str):
+        if rate and self.random.random() < rate:
+            state.failures += 1
+            raise PlatformError(f"Loopback injected {what} failure")
+
+    def _issue_token(self, open_id: str) -> dict:
+        ttl = self.profile_for(open_id).token_ttl_s
+        return {
+            "access_token": f"loopback:{open_id}:{time.time() + ttl}",
+            "refresh_token": f"loopback-refresh:{open_id}",
+            "open_id": open_id,
+            "expires_in": int(ttl),
+        }
+
+    # ── PlatformAdapter ──────────────────────────────────────
+
+    def get_auth_url(self, state: str) -> str:
+        return f"/api/auth/loopback/callback?code=loopback-{secrets.token_hex(4)}&state={state}"
+
+    async def exchange_token(self, code: str) -> dict:
+        await self._latency(self.default)
+        return self._issue_token(code.removeprefix("loopback-"))
+
+    async def refresh_token(self, refresh_token: str) -> dict:
+        await self._latency(self.default)
+        return self._issue_token(refresh_token.removeprefix("loopback-refresh:"))
+
+    async def get_user_info(self, access_token: str, open_id: str) -> dict:
+        await self._latency(self.profile_for(open_id))
+        return {"username": f"loopback {open_id}", "avatar_url": None}
+
+    async def fetch_source(self, video_url: str) -> bytes:
+        # Storage downloads use the default profile; no bytes are materialized
+        profile = self.default
+        await self._latency(profile)
+        if profile.upload_bandwidth > 0:
+            await asyncio.sleep(profile.video_bytes / profile.upload_bandwidth)
+        return b""
+
+    async def _upload(self, access_token: str, open_id: str, transfer: bool) -> str:
+        profile = self.profile_for(open_id)
+        state = self._admit(open_id, profile)
+        self._check_token(access_token)
+
+        # Per-call latency plus transfer time at the simulated bandwidth
+        await self._latency(profile)
+        if transfer and profile.upload_bandwidth > 0:
+            await asyncio.sleep(profile.video_bytes / profile.upload_bandwidth)
+        self._maybe_fail(state, profile.failure_rate, "upload")
+        return f"loopback-media-{secrets.token_hex(8)}"
+
+    async def upload_video(self, access_token: str, open_id: str, content: bytes) -> str:
+        return await self._upload(access_token, open_id, transfer=True)
+
+    async def upload_from_url(self, access_token: str, open_id: str, source_url: str) -> str:
+        # The platform pulls from storage on its own bandwidth: only the API call is charged
+        return await self._upload(access_token, open_id, transfer=False)
+
+    async def upload_image(self, access_token: str, open_id: str, content: bytes, content_type: str) -> str:
+        return await self._upload(access_token, open_id, transfer=False)
+
+    async def create_post(
+        self,
+        access_token: str,
+        open_id: str,
+        media_id: str,
+        title: str,
+        description: Optional[str] = None,
+    ) -> str:
+        profile = self.profile_for(open_id)
+        state = self.state.setdefault(open_id, _AccountState(tokens=profile.rate_limit_burst))
+        await self._latency(profile)
+        self._maybe_fail(state, profile.create_failure_rate, "create")
+        state.published += 1
+        return f"loopback-{secrets.token_hex(8)}"
+
+    async def publish_video(
+        self,
+        access_token: str,
+        open_id: str,
+        video_url: str,
+        title: str,
+        description: Optional[str] = None,
+    ) -> str:
+        content = await self.fetch_source(video_url)
+        media_id = await self.upload_video(access_token, open_id, content)
+        return await self.create_post(access_token, open_id, media_id, title, description)
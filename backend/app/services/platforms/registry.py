@@ -1,29 +1,59 @@
+"""
+Platform adapter registry.
+
+Platforms are listed by name with the import path of their adapter class,
+written "module:Class" as in package entry points, and each adapter module
+is imported the first time its platform is asked for. Importing the API
+therefore does not import every platform's client code. register() adds a
+ready-made adapter instance instead (the configurable loopback adapter in
+benchmarks, tests).
+"""
+import importlib
+import threading
+
+from app.core.config import settings
 from app.services.platforms.base import PlatformAdapter
 
+_BUILTIN = {
+    "douyin": "app.services.platforms.douyin:DouyinAdapter",
+    "kuaishou": "app.services.platforms.kuaishou:KuaishouAdapter",
+    "xiaohongshu": "app.services.platforms.xiaohongshu:XiaohongshuAdapter",
+}
+_LOOPBACK = "app.services.platforms.loopback:LoopbackAdapter"
+
 _adapters: dict[str, PlatformAdapter] = {}
+_lock = threading.Lock()
+
+
+def _entry_points() -> dict[str, str]:
+    entry_points = dict(_BUILTIN)
+    if settings.ENABLE_LOOPBACK_PLATFORM:
+        entry_points["loopback"] = _LOOPBACK
+    return entry_points
+
+
+def _load(entry_point: str) -> PlatformAdapter:
+    module_name, _, class_name = entry_point.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
 
 
 def register(adapter: PlatformAdapter):
-    _adapters[adapter.platform_name] = adapter
+    with _lock:
+        _adapters[adapter.platform_name] = adapter
 
 
 def get_adapter(platform: str) -> PlatformAdapter:
     adapter = _adapters.get(platform)
-    if not adapter:
-        raise ValueError(f"Unsupported platform: {platform}")
+    if adapter is None:
+        entry_point = _entry_points().get(platform)
+        if entry_point is None:
+            raise ValueError(f"Unsupported platform: {platform}")
+        with _lock:
+            adapter = _adapters.get(platform)
+            if adapter is None:
+                adapter = _adapters[platform] = _load(entry_point)
     return adapter
 
 
 def get_all_platforms() -> list[str]:
-    return list(_adapters.keys())
-
-
-def _register_all():
-    from app.services.platforms.douyin import DouyinAdapter
-    from app.services.platforms.kuaishou import KuaishouAdapter
-    from app.services.platforms.xiaohongshu import XiaohongshuAdapter
-    register(DouyinAdapter())
-    register(KuaishouAdapter())
-    register(XiaohongshuAdapter())
-
-_register_all()
+    return list({**_entry_points(), **_adapters})
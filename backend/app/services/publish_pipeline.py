@@ -0,0 +1,283 @@
+"""
+Pipelined publishing for multi-video batches.
+
+publish_to_account runs download, upload and create back to back for one
+account. Tasks that share a batch_id are instead pushed through a pipeline of
+stages - fetch source -> upload -> create post -> write status - each with its
+own worker pool and a bounded queue in front of it. While video k uploads,
+video k+1 is already downloading, so a batch finishes at about the pace of
+its slowest stage rather than the sum of all stages, and the bounded queues
+cap how many fetched videos are held in memory at once.
+
+Sources that are not pulled by the platform itself are fetched once per
+platform when several accounts share them (see transfer.should_prefetch);
+otherwise the fetch stage passes jobs straight through. The fetch stage also
+checks each source against the platform's media limits (see media_probe), so
+a video the platform would refuse fails before any upload. Accounts whose adapter
+lacks ``supports_staged_publish`` are published with publish_to_account as
+before.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from app.api import tasks as tasks_api
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import PIPELINE_STAGE_DURATION, PIPELINE_STAGE_ITEMS, PUBLISH_IN_FLIGHT, PUBLISH_RESULTS
+from app.services import media_probe, transfer, transfer_progress
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.fair_queue import fair_queue
+from app.services.platforms import get_adapter
+from app.services.platforms.base import PlatformAdapter
+
+logger = logging.getLogger(__name__)
+
+# Reports of recently finished batches, newest last (see /api/system/pipelines)
+recent_reports: deque = deque(maxlen=20)
+
+
+@dataclass
+class _Job:
+    """One (task, account) publish travelling through the stages."""
+
+    task: dict
+    task_account_id: str
+    account: dict
+    adapter: PlatformAdapter
+    content: Optional[bytes] = None
+    media_id: Optional[str] = None
+    item_id: Optional[str] = None
+    error: Optional[BaseException] = None
+    progress: Optional[transfer_progress.Transfer] = None
+
+
+class _Stage:
+    """Per-stage counters. An item is one fetched source for "fetch" and one job elsewhere."""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def record(self, started: float, failed: bool):
+        finished = time.perf_counter()
+        self.busy += finished - started
+        self.items += 1
+        self.errors += failed
+        if self.first_started is None:
+            self.first_started = started
+        self.last_finished = finished
+        PIPELINE_STAGE_DURATION.observe(finished - started, self.name)
+        PIPELINE_STAGE_ITEMS.inc(self.name, "error" if failed else "ok")
+
+    def report(self) -> dict:
+        active = (self.last_finished - self.first_started) if self.first_started is not None else 0.0
+        return {
+            "concurrency": self.concurrency,
+            "items": self.items,
+            "errors": self.errors,
+            "busy_s": round(self.busy, 3),
+            "active_s": round(active, 3),
+            "throughput_per_s": round(self.items / active, 2) if active else None,
+            "utilization": round(self.busy / (active * self.concurrency), 2) if active else None,
+        }
+
+
+class BatchPipeline:
+    def __init__(self, batch_id: str):
+        self.batch_id = batch_id
+        size = settings.PIPELINE_QUEUE_SIZE
+        self.fetch_queue: asyncio.Queue = asyncio.Queue(size)
+        self.upload_queue: asyncio.Queue = asyncio.Queue(size)
+        self.create_queue: asyncio.Queue = asyncio.Queue(size)
+        self.status_queue: asyncio.Queue = asyncio.Queue(size)
+        self.stages = {
+            "fetch": _Stage("fetch", settings.PIPELINE_FETCH_CONCURRENCY),
+            "upload": _Stage("upload", settings.PIPELINE_UPLOAD_CONCURRENCY),
+            "create": _Stage("create", settings.PIPELINE_CREATE_CONCURRENCY),
+            "status": _Stage("status", 1),  # Sync DB writes; more workers would only queue on the threadpool
+        }
+        self.remaining: dict[str, int] = {}  # task_id -> jobs not yet written
+        self.deferred: set[str] = set()
+
+    # ── Stages ───────────────────────────────────────────────
+    # Each takes the jobs of one queue item and returns them for routing;
+    # a raised exception marks all of them failed.
+
+    async def _fetch(self, jobs: list[_Job]) -> list[_Job]:
+        for job in jobs:
+            job.progress = transfer_progress.begin(job.task_account_id, job.task["id"], job.account)
+        adapter = jobs[0].adapter
+        await media_probe.ensure_publishable(jobs[0].task["video_url"], adapter.platform_name, adapter.media_limits)
+        if not transfer.should_prefetch(adapter, len(jobs)):
+            return jobs  # Pulled by the platform, or streamed in the upload stage
+        for job in jobs:
+            job.progress.enter("download")
+        content = await adapter.fetch_source(jobs[0].task["video_url"])
+        transfer.TRANSFER_BYTES.inc(adapter.platform_name, "prefetch", amount=len(content))
+        for job in jobs:
+            job.progress.advance(len(content))
+            job.content = content
+        return jobs
+
+    async def _upload(self, jobs: list[_Job]) -> list[_Job]:
+        job = jobs[0]
+        account = job.account
+        # Uploads are the contended resource: share them fairly with other users' publishes
+        async with fair_queue.slot(account["user_id"]):
+            with transfer_progress.track(job.progress):
+                job.media_id = await tasks_api._with_retry(
+                    account["platform"], account["id"],
+                    lambda: transfer.upload_media(job.adapter, account, job.task["video_url"], job.content),
+                )
+        job.content = None  # Let the video bytes go as soon as the last account has uploaded
+        return jobs
+
+    async def _create(self, jobs: list[_Job]) -> list[_Job]:
+        job = jobs[0]
+        account = job.account
+        job.progress.enter("create")
+        job.item_id = await tasks_api._with_retry(
+            account["platform"], account["id"],
+            lambda: job.adapter.create_post(
+                account["access_token"], account["platform_user_id"], job.media_id,
+                job.task["title"], job.task.get("description"),
+            ),
+        )
+        return jobs
+
+    async def _write_status(self, jobs: list[_Job]) -> list[_Job]:
+        job = jobs[0]
+        task_id = job.task["id"]
+        platform = job.account["platform"]
+        if job.progress is not None:
+            job.progress.finish(job.error)
+        try:
+            if isinstance(job.error, CircuitOpenError):
+                PUBLISH_RESULTS.inc(platform, "deferred")
+                if task_id not in self.deferred:
+                    self.deferred.add(task_id)
+                    logger.warning("Deferring task %s: %s", task_id, job.error)
+                tasks_api._defer_task(task_id, job.task_account_id, job.error.retry_after)
+            elif job.error is not None:
+                PUBLISH_RESULTS.inc(platform, "failure")
+                tasks_api._mark_failed(job.task_account_id, job.error)
+            else:
+                tasks_api._mark_success(job.task_account_id, job.item_id)
+                PUBLISH_RESULTS.inc(platform, "success")
+        finally:
+            PUBLISH_IN_FLIGHT.dec(platform)
+
+        self.remaining[task_id] -= 1
+        if self.remaining[task_id] == 0 and task_id not in self.deferred:
+            tasks_api._finalize_task(task_id)
+        return jobs
+
+    # ── Plumbing ─────────────────────────────────────────────
+
+    async def _worker(self, stage: _Stage, queue: asyncio.Queue, handle, next_queue: Optional[asyncio.Queue]):
+        while True:
+            jobs = await queue.get()
+            try:
+                started = time.perf_counter()
+                try:
+                    if next_queue is None:  # Status writes are never cut short
+                        jobs = await handle(jobs)
+                    else:
+                        with deadline.start(settings.PUBLISH_DEADLINE_SECONDS):
+                            async with deadline.enforce():
+                                jobs = await handle(jobs)
+                    stage.record(started, failed=False)
+                except Exception as e:
+                    for job in jobs:
+                        job.error = e
+                    stage.record(started, failed=True)
+                if next_queue is None:
+                    continue
+                # Put outside the timed section: waiting on a full queue is back-pressure, not work
+                for job in jobs:
+                    await (self.status_queue if job.error is not None else next_queue).put([job])
+            finally:
+                queue.task_done()
+
+    async def run(self, groups: list[list[_Job]]) -> dict:
+        """Publish ``groups`` (jobs sharing one fetched source each) and return the per-stage report."""
+        for jobs in groups:
+            for job in jobs:
+                self.remaining[job.task["id"]] = self.remaining.get(job.task["id"], 0) + 1
+                PUBLISH_IN_FLIGHT.inc(job.account["platform"])
+
+        started = time.perf_counter()
+        plan = [
+            (self.stages["fetch"], self.fetch_queue, self._fetch, self.upload_queue),
+            (self.stages["upload"], self.upload_queue, self._upload, self.create_queue),
+            (self.stages["create"], self.create_queue, self._create, self.status_queue),
+            (self.stages["status"], self.status_queue, self._write_status, None),
+        ]
+        pools = [
+            [asyncio.create_task(self._worker(stage, queue, handle, next_queue)) for _ in range(stage.concurrency)]
+            for stage, queue, handle, next_queue in plan
+        ]
+        try:
+            for jobs in groups:
+                await self.fetch_queue.put(jobs)
+            # Drain stage by stage: once a queue is joined its producers are done
+            for (_, queue, _, _), workers in zip(plan, pools):
+                await queue.join()
+                for worker in workers:
+                    worker.cancel()
+        finally:
+            workers = [w for pool in pools for w in pool]
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        report = {
+            "batch_id": self.batch_id,
+            "tasks": len(self.remaining),
+            "jobs": sum(len(jobs) for jobs in groups),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            "stages": {name: stage.report() for name, stage in self.stages.items()},
+        }
+        recent_reports.append(report)
+        logger.info("Batch %s published: %s", self.batch_id, report)
+        return report
+
+
+async def publish_batch(batch_id: str, items: list[tuple[dict, list[dict]]]) -> Optional[dict]:
+    """
+    Publish claimed tasks of one batch. ``items`` are (task, task_accounts)
+    pairs whose task_accounts rows embed ``social_accounts`` and were claimed
+    (set to publishing) by the scheduler.
+    """
+    groups: list[list[_Job]] = []
+    fallback = []
+    for task, task_accounts in items:
+        by_platform: dict[str, list[_Job]] = {}
+        for ta in task_accounts:
+            account = ta["social_accounts"]
+            try:
+                adapter = get_adapter(account["platform"])
+            except ValueError:
+                adapter = None
+            if adapter is None or not adapter.supports_staged_publish:
+                fallback.append((task, ta))
+                continue
+            by_platform.setdefault(account["platform"], []).append(_Job(task, ta["id"], account, adapter))
+        groups.extend(by_platform.values())
+
+    for task, ta in fallback:
+        asyncio.create_task(tasks_api.publish_to_account(
+            task["id"], ta["id"], ta["social_accounts"], task["video_url"], task["title"], task.get("description"),
+        ))
+    if not groups:
+        return None
+    return await BatchPipeline(batch_id).run(groups)
@@ -0,0 +1,85 @@
+"""
+Publish statistics rollups.
+
+Every per-account publish that reaches success or failure bumps a counter in
+publish_stats_daily (user, platform, day). A trigger on task_accounts does
+the counting (migration 014), in the transaction that changes the status, so
+every path is counted the same way - API publishes, the H5 share webhook,
+the scheduler and bulk RPCs - and nothing is lost if the API dies. Days are
+calendar days in STATS_TIMEZONE, which sync_timezone() hands to the database
+at startup; a changed zone recounts the history in the new calendar.
+
+Dashboard reads (see /api/stats) are one indexed range read of at most
+days x platforms rows per user.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+
+logger = logging.getLogger(__name__)
+
+_FIELDS = ("publishes", "successes", "failures")
+_zone = ZoneInfo(settings.STATS_TIMEZONE)
+
+
+def today() -> date:
+    return datetime.now(_zone).date()
+
+
+def sync_timezone():
+    """Make the database count in STATS_TIMEZONE; logged, not raised, so startup goes on."""
+    try:
+        changed = supabase_admin.rpc(
+            "set_publish_stats_timezone", {"p_timezone": settings.STATS_TIMEZONE},
+        ).execute().data
+    except Exception as e:
+        logger.error("Could not set the publish stats timezone: %s", e)
+        return
+    if changed:
+        logger.info("Publish stats recounted in %s", settings.STATS_TIMEZONE)
+
+
+def _window(rows: list[dict], since: date, until: date) -> dict:
+    """Totals and per-platform counts of ``rows`` with since <= day <= until."""
+    totals = dict.fromkeys(_FIELDS, 0)
+    by_platform: dict[str, dict] = {}
+    for row in rows:
+        if since <= date.fromisoformat(row["day"]) <= until:
+            platform = by_platform.setdefault(row["platform"], dict.fromkeys(_FIELDS, 0))
+            for field in _FIELDS:
+                platform[field] += row[field]
+                totals[field] += row[field]
+    return {**totals, "platforms": by_platform}
+
+
+def dashboard(user_id: str, days: int = 30, platform: Optional[str] = None) -> dict:
+    """Daily trend over ``days`` plus yesterday / 7-day / 30-day cards, from one range read."""
+    end = today()
+    since = end - timedelta(days=max(days, 30) - 1)
+    query = supabase_admin.table("publish_stats_daily").select(
+        "platform, day, publishes, successes, failures"
+    ).eq("user_id", user_id).gte("day", since.isoformat())
+    if platform:
+        query = query.eq("platform", platform)
+    rows = query.execute().data
+
+    trend_start = end - timedelta(days=days - 1)
+    trend = {(trend_start + timedelta(days=i)).isoformat(): dict.fromkeys(_FIELDS, 0) for i in range(days)}
+    for row in rows:
+        point = trend.get(row["day"])
+        if point is not None:
+            for field in _FIELDS:
+                point[field] += row[field]
+
+    yesterday = end - timedelta(days=1)
+    return {
+        "today": end.isoformat(),
+        "yesterday": _window(rows, yesterday, yesterday),
+        "last_7_days": _window(rows, end - timedelta(days=6), end),
+        "last_30_days": _window(rows, end - timedelta(days=29), end),
+        "trend": [{"day": day, **counts} for day, counts in trend.items()],
+    }
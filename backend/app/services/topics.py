@@ -0,0 +1,128 @@
+"""
+Per-user topic (hashtag) autocomplete.
+
+Each user's topics live in memory in a sorted list of normalized keys, so a
+prefix lookup is two bisects, plus a score per topic: a use count that
+halves every TOPIC_HALF_LIFE_DAYS without use, so recent favourites rank
+above topics used often long ago. An index is loaded from the user's latest
+TOPIC_HISTORY_TASKS tasks the first time they ask for suggestions, then kept
+current by record() as tasks are created. At most TOPIC_INDEX_MAX_USERS
+indexes are held; the least recently used is dropped and rebuilt on demand.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable
+
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+
+_HALF_LIFE = settings.TOPIC_HALF_LIFE_DAYS * 86400.0
+
+
+def _clean(topic: str) -> str:
+    return topic.strip().lstrip("#").strip()
+
+
+def normalize(topic: str) -> str:
+    """Lookup key: no leading '#' or surrounding spaces, case-folded."""
+    return _clean(topic).casefold()
+
+
+class _Topic:
+    __slots__ = ("text", "uses", "score", "last_used")
+
+    def __init__(self, text: str):
+        self.text = text  # Spelling of the latest use
+        self.uses = 0
+        self.score = 0.0  # Decayed use count as of last_used
+        self.last_used = 0.0
+
+    def use(self, text: str, at: float):
+        if at >= self.last_used:
+            self.score = self.score * 0.5 ** ((at - self.last_used) / _HALF_LIFE) + 1
+            self.last_used = at
+            self.text = text
+        else:  # Older than what we have (history loaded after a recent use)
+            self.score += 0.5 ** ((self.last_used - at) / _HALF_LIFE)
+        self.uses += 1
+
+    def rank(self, now: float) -> float:
+        return self.score * 0.5 ** ((now - self.last_used) / _HALF_LIFE)
+
+
+class _UserIndex:
+    def __init__(self):
+        self.keys: list[str] = []  # Sorted normalized topics
+        self.topics: dict[str, _Topic] = {}
+
+    def add(self, text: str, at: float):
+        text = _clean(text)
+        key = text.casefold()
+        if not key:
+            return
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = _Topic(text)
+            insort(self.keys, key)
+        topic.use(text, at)
+
+    def suggest(self, prefix: str, limit: int) -> list[_Topic]:
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        now = time.time()
+        return heapq.nlargest(limit, (self.topics[k] for k in self.keys[start:end]), key=lambda t: t.rank(now))
+
+
+_indexes: OrderedDict[str, _UserIndex] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _load(user_id: str) -> _UserIndex:
+    result = supabase_admin.table("publish_tasks").select("topics, created_at").eq(
+        "user_id", user_id
+    ).order("created_at", desc=True).limit(settings.TOPIC_HISTORY_TASKS).execute()
+    index = _UserIndex()
+    for row in reversed(result.data):
+        at = datetime.fromisoformat(row["created_at"]).timestamp()
+        for topic in row.get("topics") or []:
+            index.add(topic, at)
+    return index
+
+
+def _index(user_id: str) -> _UserIndex:
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+            return index
+    index = _load(user_id)
+    with _lock:
+        # A concurrent load may have won; keep the one record() may already have updated
+        index = _indexes.setdefault(user_id, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.TOPIC_INDEX_MAX_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def record(user_id: str, topics: Iterable[str]):
+    """Count one use of each topic (duplicates once). Users not loaded pick it up from history."""
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            return
+        now = time.time()
+        for topic in {normalize(t): t for t in topics}.values():
+            index.add(topic, now)
+
+
+def suggest(user_id: str, q: str, limit: int = 10) -> list[dict]:
+    """The user's topics starting with ``q`` (any case, leading '#' ignored), best first."""
+    index = _index(user_id)
+    with _lock:
+        return [{"topic": t.text, "uses": t.uses} for t in index.suggest(normalize(q), limit)]
+
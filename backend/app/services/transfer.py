@@ -0,0 +1,188 @@
+"""
+Media transfer from our storage to a platform.
+
+The engine uses the cheapest mode the adapter declares in ``transfer_modes``:
+
+- PULL_URL: hand the platform a short-lived signed storage URL; no video
+  bytes pass through the worker.
+- PUSH_STREAM / PART_UPLOAD: stream the source from storage to the platform
+  in TRANSFER_PART_BYTES chunks, so memory per publish is about one chunk.
+  Sources that fit in a single part are sent with one plain upload.
+- BUFFERED: download the whole file, then upload it (the old behaviour).
+
+Stages and bytes are reported to the caller's current transfer (see
+app.services.transfer_progress). Storage failures are raised as SourceError,
+which circuit breakers do not count against the platform.
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import unquote, urlsplit
+
+import httpx
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import Counter, track_upstream
+from app.core.supabase import supabase_admin
+from app.services import transfer_progress
+from app.services.platforms.base import (
+    BUFFERED, PART_UPLOAD, PULL_URL, PUSH_STREAM, TRANSFER_MODES, PlatformAdapter, SourceError,
+)
+
+TRANSFERS = Counter("media_transfers_total", "Media transfers to platforms, per transfer mode.", ("platform", "mode"))
+TRANSFER_BYTES = Counter(
+    "media_transfer_worker_bytes_total", "Video bytes that passed through the worker, per transfer mode.",
+    ("platform", "mode"),
+)
+
+_PUBLIC_PREFIX = "/storage/v1/object/public/"
+
+# source URL -> (signed URL, monotonic expiry); reused for every account of a broadcast
+_signed_urls: dict[str, tuple[str, float]] = {}
+
+
+def choose_mode(adapter: PlatformAdapter) -> str:
+    """The cheapest transfer mode the adapter supports."""
+    for mode in TRANSFER_MODES:
+        if mode in adapter.transfer_modes:
+            return mode
+    return BUFFERED
+
+
+def _storage_object(video_url: str) -> Optional[tuple[str, str]]:
+    """(bucket, path) for a public URL of our Supabase Storage, else None."""
+    parts = urlsplit(video_url)
+    if f"{parts.scheme}://{parts.netloc}" != settings.SUPABASE_URL.rstrip("/"):
+        return None
+    if not parts.path.startswith(_PUBLIC_PREFIX):
+        return None
+    bucket, _, path = parts.path[len(_PUBLIC_PREFIX):].partition("/")
+    return (bucket, unquote(path)) if path else None
+
+
+def signed_source_url(video_url: str) -> str:
+    """
+    A URL the platform can pull the video from for SIGNED_URL_TTL_SECONDS.
+    URLs outside our storage are returned unchanged.
+    """
+    obj = _storage_object(video_url)
+    if obj is None:
+        return video_url
+    now = time.monotonic()
+    cached = _signed_urls.get(video_url)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    bucket, path = obj
+    try:
+        signed = supabase_admin.storage.from_(bucket).create_signed_url(path, settings.SIGNED_URL_TTL_SECONDS)
+    except Exception as e:
+        raise SourceError(f"Could not sign source URL: {e}") from e
+    url = signed["signedURL"]
+    # Reuse for half the lifetime so a platform never receives a nearly expired URL
+    _signed_urls[video_url] = (url, now + settings.SIGNED_URL_TTL_SECONDS / 2)
+    for key in [k for k, (_, expires_at) in _signed_urls.items() if expires_at <= now]:
+        del _signed_urls[key]
+    return url
+
+
+@asynccontextmanager
+async def open_source(video_url: str, platform: str, mode: str):
+    """
+    ``async with open_source(...) as (size, chunks)``: the source video as
+    TRANSFER_PART_BYTES chunks without holding the whole file; ``size`` is None
+    when storage does not send a Content-Length.
+    """
+    async with httpx.AsyncClient(timeout=deadline.timeout(300.0)) as client, track_upstream("storage.download"):
+        try:
+            response = await client.send(client.build_request("GET", video_url), stream=True)
+        except httpx.HTTPError as e:
+            raise SourceError(f"Source download failed: {e}") from e
+        try:
+            if response.is_error:
+                raise SourceError(f"Source download failed: HTTP {response.status_code}")
+            size = int(response.headers.get("content-length") or 0) or None
+
+            async def chunks() -> AsyncIterator[bytes]:
+                # Read errors surface inside the platform upload; tag them as ours
+                try:
+                    async for chunk in response.aiter_bytes(settings.TRANSFER_PART_BYTES):
+                        TRANSFER_BYTES.inc(platform, mode, amount=len(chunk))
+                        yield chunk
+                except httpx.HTTPError as e:
+                    raise SourceError(f"Source download failed: {e}") from e
+
+            yield size, chunks()
+        finally:
+            await response.aclose()
+
+
+async def _chunks_of(content: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(content), settings.TRANSFER_PART_BYTES):
+        yield content[start:start + settings.TRANSFER_PART_BYTES]
+
+
+async def _upload_chunks(
+    adapter: PlatformAdapter, mode: str, access_token: str, open_id: str,
+    size: Optional[int], chunks: AsyncIterator[bytes],
+) -> str:
+    transfer_progress.stage("upload", size)
+    if mode == PUSH_STREAM:
+        return await adapter.upload_stream(access_token, open_id, transfer_progress.counted(chunks))
+    if size is not None and size <= settings.TRANSFER_PART_BYTES:
+        # Fits in one part: a plain upload saves the init / complete round trips
+        content = b"".join([chunk async for chunk in chunks])
+        media_id = await adapter.upload_video(access_token, open_id, content)
+        transfer_progress.advance(len(content))
+        return media_id
+    return await adapter.upload_parts(access_token, open_id, transfer_progress.counted(chunks))
+
+
+def should_prefetch(adapter: PlatformAdapter, consumers: int) -> bool:
+    """
+    Whether a caller publishing one source to ``consumers`` accounts should
+    download it once up front: always for BUFFERED, and for streamed modes when
+    one download can replace several.
+    """
+    mode = choose_mode(adapter)
+    return mode == BUFFERED or (mode != PULL_URL and consumers > 1)
+
+
+async def download(adapter: PlatformAdapter, video_url: str) -> bytes:
+    """
+    The whole source, for a BUFFERED upload. Callers download before entering
+    the platform's circuit breaker, so storage time never counts as a slow call.
+    """
+    transfer_progress.stage("download")
+    content = await adapter.fetch_source(video_url)
+    transfer_progress.advance(len(content))
+    TRANSFER_BYTES.inc(adapter.platform_name, BUFFERED, amount=len(content))
+    return content
+
+
+async def upload_media(adapter: PlatformAdapter, account: dict, video_url: str, content: Optional[bytes] = None) -> str:
+    """
+    Get the video onto the platform with the cheapest supported mode; returns the media id.
+    ``content`` is a source already fetched by the caller (batch pipelines share one download).
+    """
+    platform = adapter.platform_name
+    access_token, open_id = account["access_token"], account["platform_user_id"]
+    mode = choose_mode(adapter)
+    TRANSFERS.inc(platform, mode)
+
+    if mode == PULL_URL:
+        transfer_progress.stage("upload")  # The platform pulls; no bytes pass through here
+        return await adapter.upload_from_url(access_token, open_id, signed_source_url(video_url))
+    if mode in (PUSH_STREAM, PART_UPLOAD):
+        if content is not None:
+            return await _upload_chunks(adapter, mode, access_token, open_id, len(content), _chunks_of(content))
+        async with open_source(video_url, platform, mode) as (size, chunks):
+            return await _upload_chunks(adapter, mode, access_token, open_id, size, chunks)
+
+    if content is None:
+        content = await download(adapter, video_url)
+    transfer_progress.stage("upload", len(content))
+    media_id = await adapter.upload_video(access_token, open_id, content)
+    transfer_progress.advance(len(content))
+    return media_id
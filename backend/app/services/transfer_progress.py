@@ -0,0 +1,252 @@
+"""
+Byte-level progress of media transfers, per task account.
+
+Every per-account publish gets a Transfer that follows it through its
+stages: "download" (the worker fetching the source), "upload" (video bytes
+handed to the platform) and "create" (the call that makes the post). The
+transfer engine reports chunks as they pass; a report is an addition and a
+clock read, and the instantaneous throughput is resampled at most every
+TRANSFER_SAMPLE_SECONDS. Code reports to the Transfer made current with
+track(), so the engine needs no extra arguments.
+
+Transfers are kept in memory. The ones that changed are written every
+TRANSFER_PROGRESS_FLUSH_SECONDS with a single save_transfer_progress RPC
+(migration 011), and finished ones are dropped once written. Each finished
+stage is added to per-platform totals and to a throughput histogram, for
+capacity planning (see /api/system/transfers).
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.supabase import supabase_admin
+
+logger = logging.getLogger(__name__)
+
+_DATA_STAGES = ("download", "upload")  # Stages that move video bytes; "create" does not
+
+TRANSFER_THROUGHPUT = Histogram(
+    "media_transfer_throughput_bytes_per_second", "Average throughput of finished transfer stages.",
+    ("platform", "stage"), buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6),
+)
+
+
+def _iso(wall: float) -> str:
+    return datetime.fromtimestamp(wall, timezone.utc).isoformat()
+
+
+def _rate(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+class Transfer:
+    """
+    Progress of one per-account publish. The byte counters and rates are those
+    of the latest download or upload stage; "create" moves no video bytes and
+    leaves them as they were.
+    """
+
+    __slots__ = (
+        "task_account_id", "task_id", "account_id", "platform", "status", "stage", "bytes_done", "bytes_total",
+        "rate", "started_at", "updated_at", "dirty",
+        "_stage_started", "_data_started", "_data_ended", "_sample_at", "_sample_bytes",
+    )
+
+    def __init__(self, task_account_id: str, task_id: str, account_id: str, platform: str):
+        self.task_account_id = task_account_id
+        self.task_id = task_id
+        self.account_id = account_id
+        self.platform = platform
+        self.status = "active"
+        self.stage: Optional[str] = None
+        self.bytes_done = 0
+        self.bytes_total: Optional[int] = None
+        self.rate: Optional[float] = None  # Bytes/s over the last sample window
+        self.started_at = self.updated_at = time.time()
+        self.dirty = True
+        self._stage_started = self._data_started = self._sample_at = time.monotonic()
+        self._data_ended: Optional[float] = None
+        self._sample_bytes = 0
+
+    def enter(self, stage: str, total: Optional[int] = None):
+        """Start ``stage`` with ``total`` bytes if known; a retried stage starts over."""
+        now = time.monotonic()
+        self._close(now)
+        self.stage = stage
+        self._stage_started = now
+        if stage in _DATA_STAGES:
+            self.bytes_done = self._sample_bytes = 0
+            self.bytes_total = total
+            self.rate = None
+            self._data_started = self._sample_at = now
+            self._data_ended = None
+        self._touch()
+
+    def advance(self, n: int):
+        self.bytes_done += n
+        now = time.monotonic()
+        elapsed = now - self._sample_at
+        if elapsed >= settings.TRANSFER_SAMPLE_SECONDS:
+            self.rate = (self.bytes_done - self._sample_bytes) / elapsed
+            self._sample_at, self._sample_bytes = now, self.bytes_done
+            self._touch()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self._close(time.monotonic())
+        self.rate = None
+        self.status = "failed" if error is not None else "succeeded"
+        self._touch()
+
+    def average_rate(self) -> Optional[float]:
+        elapsed = (self._data_ended or time.monotonic()) - self._data_started
+        return self.bytes_done / elapsed if self.bytes_done and elapsed > 0 else None
+
+    def _touch(self):
+        self.updated_at = time.time()
+        self.dirty = True
+
+    def _close(self, now: float):
+        """Add the stage being left to the platform totals."""
+        if self.stage is None or self.status != "active":
+            return
+        nbytes = 0
+        if self.stage in _DATA_STAGES:
+            self._data_ended = now
+            nbytes = self.bytes_done
+        seconds = now - self._stage_started
+        with _lock:
+            totals = _totals.setdefault((self.platform, self.stage), [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += nbytes
+            totals[2] += seconds
+        if nbytes and seconds > 0:
+            TRANSFER_THROUGHPUT.observe(nbytes / seconds, self.platform, self.stage)
+
+    def snapshot(self) -> dict:
+        return {
+            "task_account_id": self.task_account_id,
+            "task_id": self.task_id,
+            "account_id": self.account_id,
+            "platform": self.platform,
+            "status": self.status,
+            "stage": self.stage,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+            "rate_bps": _rate(self.rate),
+            "avg_bps": _rate(self.average_rate()),
+            "started_at": _iso(self.started_at),
+            "updated_at": _iso(self.updated_at),
+        }
+
+
+_transfers: dict[str, Transfer] = {}  # task_account_id -> its latest transfer
+_totals: dict[tuple[str, str], list] = {}  # (platform, stage) -> [stages finished, bytes, seconds]
+_lock = threading.Lock()  # flush() runs in a worker thread
+_current: ContextVar[Optional[Transfer]] = ContextVar("transfer", default=None)
+
+
+def begin(task_account_id: str, task_id: str, account: dict) -> Transfer:
+    """A new Transfer for a publish of ``account``; replaces the record of an earlier attempt."""
+    transfer = Transfer(task_account_id, task_id, account["id"], account["platform"])
+    with _lock:
+        _transfers[task_account_id] = transfer
+    return transfer
+
+
+@contextmanager
+def track(transfer: Optional[Transfer]):
+    """Make ``transfer`` the one stage(), advance() and counted() report to in this context."""
+    token = _current.set(transfer)
+    try:
+        yield transfer
+    finally:
+        _current.reset(token)
+
+
+def stage(name: str, total: Optional[int] = None):
+    transfer = _current.get()
+    if transfer is not None:
+        transfer.enter(name, total)
+
+
+def advance(n: int):
+    transfer = _current.get()
+    if transfer is not None:
+        transfer.advance(n)
+
+
+def counted(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """``chunks``, each reported to the current transfer as it is handed on."""
+    transfer = _current.get()
+    return chunks if transfer is None else _counted(transfer, chunks)
+
+
+async def _counted(transfer: Transfer, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        transfer.advance(len(chunk))
+        yield chunk
+
+
+def flush():
+    """Write changed transfers in one RPC, then drop finished ones; on failure they are kept for the next flush."""
+    with _lock:
+        batch = [transfer for transfer in _transfers.values() if transfer.dirty]
+        for transfer in batch:
+            transfer.dirty = False
+        rows = [transfer.snapshot() for transfer in batch]
+    if rows:
+        try:
+            supabase_admin.rpc("save_transfer_progress", {"rows": rows}).execute()
+        except Exception as e:
+            logger.error("Transfer progress flush failed, retrying next time: %s", e)
+            for transfer in batch:
+                transfer.dirty = True
+            return
+    with _lock:
+        for key in [key for key, transfer in _transfers.items() if transfer.status != "active" and not transfer.dirty]:
+            del _transfers[key]
+
+
+def for_task(task_id: str) -> list[dict]:
+    """Progress of the task's accounts: saved rows, overlaid with the newer ones still in memory."""
+    rows = supabase_admin.table("transfer_progress").select("*").eq("task_id", task_id).execute().data
+    by_id = {row["task_account_id"]: row for row in rows}
+    with _lock:
+        by_id.update(
+            (transfer.task_account_id, transfer.snapshot())
+            for transfer in _transfers.values() if transfer.task_id == task_id
+        )
+    return list(by_id.values())
+
+
+def platform_totals() -> dict:
+    """Per platform: transfers running now with their summed current throughput, and per-stage totals."""
+    with _lock:
+        totals = list(_totals.items())
+        active = [transfer for transfer in _transfers.values() if transfer.status == "active"]
+    platforms: dict[str, dict] = {}
+
+    def platform(name: str) -> dict:
+        return platforms.setdefault(name, {"active": 0, "current_bps": 0.0, "stages": {}})
+
+    for transfer in active:
+        entry = platform(transfer.platform)
+        entry["active"] += 1
+        entry["current_bps"] += transfer.rate or 0.0
+    for (name, stage_name), (count, nbytes, seconds) in totals:
+        platform(name)["stages"][stage_name] = {
+            "finished": count,
+            "bytes": nbytes,
+            "seconds": round(seconds, 3),
+            "avg_seconds": round(seconds / count, 3),
+            "avg_bps": _rate(nbytes / seconds) if nbytes and seconds > 0 else None,
+        }
+    for entry in platforms.values():
+        entry["current_bps"] = round(entry["current_bps"], 1)
+    return platforms
@@ -0,0 +1,623 @@
+"""
+Offline stand-ins for Supabase (PostgREST) and the Douyin Open API.
+
+FakeSupabase implements the subset of the supabase-py query builder the app
+uses (select with embedded relations, insert, update, delete, eq / in_ / lte
+/ or_ filters, order, limit) over in-memory tables. Calls are synchronous,
+exactly like the real client, and can be given a per-call latency to model
+the PostgREST network hop. The triggers maintaining task_summaries and
+publish_stats_daily are emulated on every write.
+
+FakeDouyin is an httpx transport answering the Douyin upload (single and
+multi-part, image) / create endpoints and streaming a fake MP4 (a real
+header, zero sample data, Range requests honoured) or, for .jpg URLs, a
+camera-sized JPEG for storage URLs, with configurable latency and error rates.
+"""
+import asyncio
+import io
+import operator
+import random
+import re
+import struct
+import time
+import uuid
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import httpx
+from PIL import Image
+
+# Embedded-resource joins: (table, embedded table) -> foreign key column on table
+_RELATIONS = {
+    ("task_accounts", "social_accounts"): "account_id",
+    ("task_accounts", "publish_tasks"): "task_id",
+}
+
+_DEFAULTS = {
+    "social_accounts": {"status": "active", "platform_config": {}},
+    "publish_tasks": {
+        "content_type": "video", "image_urls": [], "visibility": "public", "ai_content": False,
+        "topics": [], "status": "publishing",
+    },
+    "task_accounts": {"status": "pending", "error_message": None, "published_url": None, "published_at": None},
+    "drafts": {
+        "content_type": "video", "video_urls": [], "image_urls": [], "topics": [], "account_ids": [],
+        "account_configs": {}, "visibility": "public", "ai_content": False, "distribution_mode": "broadcast",
+        "version": 1,
+    },
+    "publish_stats_daily": {"publishes": 0, "successes": 0, "failures": 0},
+    "task_summaries": {},
+    "task_archive": {},
+    "transfer_progress": {"status": "active", "bytes_done": 0},
+}
+
+# Columns with a hash index in the fake (never updated after insert)
+_INDEXED = ("id", "task_id", "account_id")
+
+_EMBED = re.compile(r"(\w+)\(([^)]*)\)")
+
+_OPS = {"eq": operator.eq, "neq": operator.ne, "lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge}
+
+
+def _split(expr: str) -> list[str]:
+    """Split a PostgREST logic expression on top-level commas."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return parts
+
+
+def _condition(expr: str, combine=any):
+    """Row predicate for an or=(...) expression: col.op.value terms, nested and(...) / or(...)."""
+    terms = []
+    for part in _split(expr):
+        if part.startswith(("and(", "or(")):
+            name, inner = part.split("(", 1)
+            terms.append(_condition(inner[:-1], all if name == "and" else any))
+        else:
+            column, op, value = part.split(".", 2)
+            terms.append(lambda row, c=column, o=_OPS[op], v=value.strip('"'): row.get(c) is not None and o(row.get(c), v))
+    return lambda row: combine(term(row) for term in terms)
+
+
+class _Result:
+    def __init__(self, data: list, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters: list = []
+        self.order_by: list = []
+        self.row_limit: Optional[int] = None
+        self.lookup: Optional[tuple] = None
+
+    # ── Operations ──
+    def select(self, columns: str = "*", **kwargs):
+        self.op, self.columns = "select", columns
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload: dict, **kwargs):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # ── Filters / modifiers ──
+    def eq(self, column: str, value):
+        if column in _INDEXED and self.lookup is None:
+            self.lookup = (column, [value])
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column: str, values):
+        values = set(values)
+        if column in _INDEXED and self.lookup is None:
+            self.lookup = (column, values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def or_(self, filters: str):
+        self.filters.append(_condition(filters))
+        return self
+
+    def lte(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) <= value)
+        return self
+
+    def lt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self.row_limit = n
+        return self
+
+    # ── Execution ──
+    def _matches(self, row: dict) -> bool:
+        return all(f(row) for f in self.filters)
+
+    def _project(self, row: dict) -> dict:
+        if self.columns.strip() == "*":
+            return dict(row)
+        out: dict = {}
+        plain = _EMBED.sub("", self.columns)
+        for col in (c.strip() for c in plain.split(",")):
+            if col == "*":
+                out.update(row)
+            elif col:
+                out[col] = row.get(col)
+        for name, cols in _EMBED.findall(self.columns):
+            fk = _RELATIONS[(self.table, name)]
+            target = self.db.index[name].get(row.get(fk))
+            if target is None:
+                out[name] = None
+            elif cols.strip() == "*":
+                out[name] = dict(target)
+            else:
+                out[name] = {c.strip(): target.get(c.strip()) for c in cols.split(",")}
+        return out
+
+    def execute(self) -> _Result:
+        self.db._tick()
+        rows = self.db.tables[self.table]
+        if self.op == "insert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = [self.db._insert(self.table, item) for item in payload]
+            return _Result([dict(r) for r in inserted])
+
+        if self.lookup:
+            index = self.db.columns[self.table][self.lookup[0]]
+            rows = [row for value in self.lookup[1] for row in index.get(value, ())]
+        matched = [row for row in rows if self._matches(row)]
+        if self.op == "update":
+            before = [row.get("status") for row in matched]
+            for row in matched:
+                row.update(self.payload)
+            self.db._triggers(self.table, matched, before=before)
+            return _Result([dict(r) for r in matched], count=len(matched))
+        if self.op == "delete":
+            self.db._delete(self.table, matched)
+            return _Result([dict(r) for r in matched])
+
+        for column, desc in reversed(self.order_by):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self.row_limit is not None:
+            matched = matched[: self.row_limit]
+        return _Result([self._project(r) for r in matched])
+
+
+class _Rpc:
+    """Postgres functions from supabase/migrations, reimplemented over the fake tables."""
+
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self) -> _Result:
+        self.db._tick()
+        return getattr(self, f"_{self.name}")(**self.params)
+
+    def _archive_tasks(self, p_before: str, p_limit: int) -> _Result:
+        finished = sorted(
+            (t for t in self.db.tables["publish_tasks"]
+             if t["status"] in ("completed", "failed", "cancelled") and t["updated_at"] < p_before),
+            key=lambda t: t["updated_at"],
+        )[:p_limit]
+        for task in finished:
+            summary = self.db.columns["task_summaries"]["task_id"].get(task["id"])
+            task_accounts = list(self.db.columns["task_accounts"]["task_id"].get(task["id"], []))
+            self.db._insert("task_archive", {
+                "task_id": task["id"], "user_id": task["user_id"], "created_at": task["created_at"],
+                "finished_at": task["updated_at"], "summary": summary[0]["summary"] if summary else dict(task),
+                "task_accounts": [dict(ta) for ta in task_accounts],
+            })
+            self.db._delete("transfer_progress", list(self.db.columns["transfer_progress"]["task_id"].get(task["id"], [])))
+            self.db._delete("task_accounts", task_accounts)  # on delete cascade
+            self.db._delete("publish_tasks", [task])
+        return _Result(len(finished))
+
+    def _rebuild_publish_stats(self) -> _Result:
+        db = self.db
+        finished = [
+            (task["user_id"], ta, ta.get("published_at") or task.get("updated_at") or ta["created_at"])
+            for ta in db.tables["task_accounts"]
+            for task in [db.index["publish_tasks"].get(ta["task_id"])]
+            if task and task.get("content_type", "video") == "video"
+        ] + [
+            (archived["user_id"], ta, ta.get("published_at") or archived.get("finished_at") or ta["created_at"])
+            for archived in db.tables["task_archive"]
+            if (archived.get("summary") or {}).get("content_type", "video") == "video"
+            for ta in archived["task_accounts"]
+        ]
+        db._delete("publish_stats_daily", list(db.tables["publish_stats_daily"]))
+        zone = ZoneInfo(db.stats_timezone)
+        for user_id, ta, finished_at in finished:
+            account = db.index["social_accounts"].get(ta["account_id"])
+            if account and ta["status"] in ("success", "failed"):
+                day = datetime.fromisoformat(finished_at).astimezone(zone).date().isoformat()
+                db._add_stats(user_id, account["platform"], day, ta["status"] == "success", ta["status"] == "failed")
+        return _Result(None)
+
+    def _set_publish_stats_timezone(self, p_timezone: str) -> _Result:
+        ZoneInfo(p_timezone)
+        if p_timezone == self.db.stats_timezone:
+            return _Result(False)
+        self.db.stats_timezone = p_timezone
+        self._rebuild_publish_stats()
+        return _Result(True)
+
+    def _batch_tasks(self, batch_id: str, user_id: str) -> list[dict]:
+        return [t for t in self.db.tables["publish_tasks"] if t.get("batch_id") == batch_id and t["user_id"] == user_id]
+
+    def _batch_progress(self, p_batch_id: str, p_user_id: str, p_failure_limit: int) -> _Result:
+        tasks = self._batch_tasks(p_batch_id, p_user_id)
+        accounts = [
+            (ta, task) for task in tasks for ta in self.db.columns["task_accounts"]["task_id"].get(task["id"], [])
+        ]
+        published = [ta["published_at"] for ta, _ in accounts if ta["status"] == "success" and ta["published_at"]]
+        failed = sorted(
+            (ta for ta, _ in accounts if ta["status"] == "failed"), key=lambda ta: (ta["created_at"], ta["task_id"]),
+        )
+        return _Result({
+            "tasks": dict(Counter(t["status"] for t in tasks)),
+            "accounts": dict(Counter(ta["status"] for ta, _ in accounts)),
+            "remaining": sum(
+                ta["status"] in ("pending", "publishing") and task["status"] in ("scheduled", "publishing")
+                for ta, task in accounts
+            ),
+            "retryable": sum(
+                ta["status"] == "failed" and task["status"] in ("completed", "failed") for ta, task in accounts
+            ),
+            "last_scheduled_at": max(
+                (t["scheduled_at"] for t in tasks if t["status"] == "scheduled" and t.get("scheduled_at")), default=None,
+            ),
+            "first_published_at": min(published, default=None),
+            "last_published_at": max(published, default=None),
+            "failures": [
+                {
+                    "task_id": ta["task_id"], "account_id": ta["account_id"],
+                    "username": (self.db.index["social_accounts"].get(ta["account_id"]) or {}).get("username"),
+                    "error_message": ta["error_message"],
+                }
+                for ta in failed[:p_failure_limit]
+            ],
+        })
+
+    def _retry_failed_batch(self, p_batch_id: str, p_user_id: str) -> _Result:
+        now = datetime.now(timezone.utc).isoformat()
+        requeued = accounts = 0
+        for task in self._batch_tasks(p_batch_id, p_user_id):
+            if task["status"] not in ("completed", "failed"):
+                continue
+            task_accounts = self.db.columns["task_accounts"]["task_id"].get(task["id"], [])
+            failed = [ta for ta in task_accounts if ta["status"] == "failed"]
+            if not failed:
+                continue
+            for ta in failed:
+                ta.update({"status": "pending", "error_message": None})
+            task.update({"status": "scheduled", "scheduled_at": now, "updated_at": now})
+            self.db._triggers("publish_tasks", [task])
+            requeued += 1
+            accounts += len(failed)
+        return _Result({"tasks": requeued, "accounts": accounts})
+
+    def _save_transfer_progress(self, rows: list) -> _Result:
+        for row in rows:
+            if row["task_account_id"] not in self.db.index["task_accounts"]:
+                continue
+            saved = next(
+                (p for p in self.db.columns["transfer_progress"]["task_id"].get(row["task_id"], [])
+                 if p["task_account_id"] == row["task_account_id"]),
+                None,
+            )
+            if saved is None:
+                self.db._insert("transfer_progress", row)
+            elif row["updated_at"] >= saved["updated_at"]:
+                saved.update(row)
+        return _Result([])
+
+
+class FakeSupabase:
+    """In-memory stand-in for ``supabase_admin``; ``latency`` seconds are slept per call."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.tables: dict[str, list] = {name: [] for name in _DEFAULTS}
+        self.index: dict[str, dict] = {name: {} for name in _DEFAULTS}
+        self.columns: dict[str, dict] = {name: {c: defaultdict(list) for c in _INDEXED} for name in _DEFAULTS}
+        self.stats_timezone = "Asia/Shanghai"  # publish_stats_settings (migration 014)
+
+    def _tick(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)  # Blocking, like the real sync client
+
+    def _insert(self, table: str, item: dict) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        row = {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **_DEFAULTS[table], **item}
+        self.tables[table].append(row)
+        self.index[table][row["id"]] = row
+        for column, index in self.columns[table].items():
+            index[row.get(column)].append(row)
+        self._triggers(table, [row])
+        return row
+
+    def _delete(self, table: str, rows: list):
+        ids = {row["id"] for row in rows}
+        self.tables[table] = [row for row in self.tables[table] if row["id"] not in ids]
+        for row in rows:
+            self.index[table].pop(row["id"], None)
+            for column, index in self.columns[table].items():
+                index[row.get(column)].remove(row)
+        self._triggers(table, rows, deleted=True)
+
+    # ── task_summaries (migration 009) and publish stats (migration 014) triggers ──
+    def _triggers(self, table: str, rows: list, deleted: bool = False, before: Optional[list] = None):
+        if table == "publish_tasks":
+            for row in rows:
+                if deleted:
+                    self._drop_summary(row["id"])
+                else:
+                    self._refresh_summary(row["id"])
+        elif table == "task_accounts":
+            for task_id in {row["task_id"] for row in rows}:
+                self._refresh_summary(task_id)
+            if not deleted:
+                for row, old in zip(rows, before or [None] * len(rows)):
+                    if row["status"] in ("success", "failed") and row["status"] != old:
+                        self._count_outcome(row)
+        elif table == "social_accounts" and not deleted:
+            for row in rows:
+                for task_id in {ta["task_id"] for ta in self.columns["task_accounts"]["account_id"].get(row["id"], [])}:
+                    self._refresh_summary(task_id)
+
+    def _count_outcome(self, ta: dict):
+        task = self.index["publish_tasks"].get(ta["task_id"])
+        account = self.index["social_accounts"].get(ta["account_id"])
+        if task and account and task.get("content_type", "video") == "video":
+            day = datetime.now(ZoneInfo(self.stats_timezone)).date().isoformat()
+            self._add_stats(task["user_id"], account["platform"], day, ta["status"] == "success", ta["status"] == "failed")
+
+    def _add_stats(self, user_id: str, platform: str, day: str, successes: int, failures: int):
+        for row in self.tables["publish_stats_daily"]:
+            if (row["user_id"], row["platform"], row["day"]) == (user_id, platform, day):
+                break
+        else:
+            row = self._insert("publish_stats_daily", {"user_id": user_id, "platform": platform, "day": day})
+        row["publishes"] += successes + failures
+        row["successes"] += successes
+        row["failures"] += failures
+
+    def _refresh_summary(self, task_id: str):
+        task = self.index["publish_tasks"].get(task_id)
+        if task is None:
+            return
+        accounts = []
+        for ta in self.columns["task_accounts"]["task_id"].get(task_id, []):
+            account = self.index["social_accounts"].get(ta["account_id"]) or {}
+            accounts.append({
+                "account_id": ta["account_id"],
+                "username": account.get("username") or "Unknown",
+                "avatar_url": account.get("avatar_url"),
+                "avatar_hash": account.get("avatar_hash"),
+                "status": ta["status"],
+                "error_message": ta.get("error_message"),
+                "published_url": ta.get("published_url"),
+            })
+        summary = {**task, "accounts": accounts}
+        existing = self.columns["task_summaries"]["task_id"].get(task_id)
+        if existing:
+            existing[0]["summary"] = summary
+        else:
+            self._insert("task_summaries", {
+                "task_id": task_id, "user_id": task["user_id"], "created_at": task["created_at"], "summary": summary,
+            })
+
+    def _drop_summary(self, task_id: str):
+        for row in self.columns["task_summaries"]["task_id"].pop(task_id, []):
+            self.tables["task_summaries"].remove(row)
+            self.index["task_summaries"].pop(row["id"], None)
+            self.columns["task_summaries"]["id"].pop(row["id"], None)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict) -> "_Rpc":
+        return _Rpc(self, name, params)
+
+    # Seeding helper that bypasses latency accounting
+    def seed(self, table: str, item: dict) -> dict:
+        return self._insert(table, item)
+
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _mp4_header(size: int, duration_s: int = 30, width: int = 1920, height: int = 1080) -> bytes:
+    """ftyp + moov (one avc1 track) + the header of an mdat box filling the file to ``size`` bytes."""
+    timescale = 1000
+    times = struct.pack(">IIIII", 0, 0, 0, timescale, duration_s * timescale)  # version/flags, ctime, mtime
+    tkhd = struct.pack(">IIIIII", 0, 0, 0, 1, 0, duration_s * timescale) + bytes(52) + struct.pack(
+        ">II", width << 16, height << 16)
+    stsd = _box(b"stsd", struct.pack(">II", 0, 1), _box(b"avc1", bytes(78)))
+    trak = _box(
+        b"trak", _box(b"tkhd", tkhd),
+        _box(b"mdia", _box(b"mdhd", times, bytes(4)), _box(b"hdlr", struct.pack(">I4s4s", 0, b"\0" * 4, b"vide"), bytes(13)),
+             _box(b"minf", _box(b"stbl", stsd))),
+    )
+    head = _box(b"ftyp", b"isom", struct.pack(">I", 512), b"isomavc1") + _box(b"moov", _box(b"mvhd", times, bytes(80)), trak)
+    return head + struct.pack(">I4s", max(size - len(head), 8), b"mdat")
+
+
+class _VideoStream(httpx.AsyncByteStream):
+    """
+    Fake MP4 body (bytes ``start`` to ``end`` of a ``size``-byte file) produced
+    in 1 MiB pieces, so only consumers that buffer hold it all.
+    """
+
+    def __init__(self, size: int, start: int = 0, end: Optional[int] = None):
+        self.size = size
+        self.start = start
+        self.end = size if end is None else end
+
+    async def __aiter__(self):
+        header = _mp4_header(self.size)
+        if self.start < len(header):
+            yield header[self.start:self.end]
+        position = max(self.start, len(header))
+        piece = b"\0" * min(max(self.end - position, 0), 1024 * 1024)
+        while position < self.end:
+            yield piece[: self.end - position]
+            position += len(piece)
+
+
+_PHOTOS: dict[int, bytes] = {}
+
+
+def _photo(variant: int, size: tuple = (2400, 3200)) -> bytes:
+    """A noisy camera-sized JPEG with an EXIF orientation tag; one per variant, generated once."""
+    if variant not in _PHOTOS:
+        bands = [Image.effect_noise(size, 24 + 8 * (variant + band) % 40) for band in range(3)]
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees
+        out = io.BytesIO()
+        Image.merge("RGB", bands).save(out, "JPEG", quality=90, exif=exif)
+        _PHOTOS[variant] = out.getvalue()
+    return _PHOTOS[variant]
+
+
+class FakeDouyin(httpx.AsyncBaseTransport):
+    """
+    Answers Douyin Open API and storage download requests in-process.
+
+    latency: (min, max) seconds per API call, drawn uniformly.
+    error_rate: probability an upload/create call returns a Douyin error payload.
+    video_bytes: size of the fake source video served for non-Douyin URLs.
+    bandwidth: bytes/second used to model upload and download transfer time (0 = instant).
+    """
+
+    def __init__(self, latency: tuple = (0.0, 0.0), error_rate: float = 0.0,
+                 video_bytes: int = 1024 * 1024, bandwidth: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.video_bytes = video_bytes
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    async def _delay(self, size: int = 0):
+        delay = self.random.uniform(*self.latency)
+        if self.bandwidth and size:
+            delay += size / self.bandwidth
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _douyin_error(self, description: str) -> httpx.Response:
+        self.errors += 1
+        return httpx.Response(200, json={"data": {"error_code": 2190008, "description": description}})
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path
+        if request.url.host != "open.douyin.com" and path.endswith(".jpg"):
+            photo = _photo(zlib.crc32(path.encode()) % 8)
+            await self._delay(len(photo))
+            return httpx.Response(200, content=photo, headers={"content-type": "image/jpeg"})
+        if request.url.host != "open.douyin.com":
+            ranged = re.fullmatch(r"bytes=(\d+)-(\d+)", request.headers.get("range", ""))
+            if ranged:
+                start, end = int(ranged[1]), min(int(ranged[2]) + 1, self.video_bytes)
+                await self._delay(end - start)
+                return httpx.Response(206, stream=_VideoStream(self.video_bytes, start, end), headers={
+                    "content-type": "video/mp4", "content-length": str(end - start),
+                    "content-range": f"bytes {start}-{end - 1}/{self.video_bytes}",
+                })
+            await self._delay(self.video_bytes)
+            return httpx.Response(200, stream=_VideoStream(self.video_bytes), headers={
+                "content-type": "video/mp4", "content-length": str(self.video_bytes),
+            })
+
+        if path.endswith("/video/upload/"):
+            body = await request.aread()
+            await self._delay(len(body))
+            if self.random.random() < self.error_rate:
+                return self._douyin_error("fake upload failure")
+            return httpx.Response(200, json={"data": {"error_code": 0, "video": {"video_id": uuid.uuid4().hex}}})
+        if path.endswith("/video/init_video_part_upload/"):
+            await self._delay()
+            return httpx.Response(200, json={"data": {"error_code": 0, "upload_id": uuid.uuid4().hex}})
+        if path.endswith("/video/upload_video_part/"):
+            body = await request.aread()
+            await self._delay(len(body))
+            return httpx.Response(200, json={"data": {"error_code": 0}})
+        if path.endswith("/video/complete_video_part_upload/"):
+            await self._delay()
+            if self.random.random() < self.error_rate:
+                return self._douyin_error("fake upload failure")
+            return httpx.Response(200, json={"data": {"error_code": 0, "video": {"video_id": uuid.uuid4().hex}}})
+        if path.endswith("/video/upload_image/"):
+            body = await request.aread()
+            await self._delay(len(body))
+            if self.random.random() < self.error_rate:
+                return self._douyin_error("fake image upload failure")
+            return httpx.Response(200, json={"data": {"error_code": 0, "image": {"image_id": uuid.uuid4().hex}}})
+        if path.endswith("/video/create/"):
+            await self._delay()
+            if self.random.random() < self.error_rate:
+                return self._douyin_error("fake create failure")
+            return httpx.Response(200, json={"data": {"error_code": 0, "item_id": uuid.uuid4().hex}})
+        if path.startswith("/oauth/"):
+            await self._delay()
+            return httpx.Response(200, json={"data": {
+                "error_code": 0, "access_token": "tok", "refresh_token": "ref", "open_id": "oid",
+                "expires_in": 86400, "nickname": "bench", "avatar": "https://example.invalid/a.png",
+            }})
+        return httpx.Response(404, json={"data": {"error_code": 404, "description": "unknown endpoint"}})
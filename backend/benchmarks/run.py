@@ -0,0 +1,667 @@
+"""
+Offline load-test benchmarks for the API and publish pipeline.
+
+Usage (from backend/):
+    python -m benchmarks.run                      # run all scenarios, compare to baseline
+    python -m benchmarks.run -s list_tasks        # one scenario
+    python -m benchmarks.run --update-baseline    # record current results as the baseline
+    python -m benchmarks.run --check              # exit 1 on regression beyond --tolerance
+    python -m benchmarks.run --db sqlite          # against the embedded SQLite backend
+
+Supabase is replaced by benchmarks.fakes.FakeSupabase (or, with --db sqlite,
+the embedded SQLite backend on a temporary file) and Douyin by FakeDouyin,
+so nothing leaves the process. Results are printed as throughput, p50/p99
+latency and tracemalloc peak, and compared against benchmarks/baseline.json.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Settings() requires these; the fakes never use them
+for _key in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_SERVICE_KEY",
+             "DOUYIN_CLIENT_KEY", "DOUYIN_CLIENT_SECRET", "DOUYIN_REDIRECT_URI"):
+    os.environ.setdefault(_key, "http://127.0.0.1:9" if _key == "SUPABASE_URL" else "bench")
+
+import httpx  # noqa: E402
+from fastapi import Request  # noqa: E402
+
+from app.core.sqlite import SQLiteClient  # noqa: E402
+from benchmarks import fakes  # noqa: E402
+from benchmarks.fakes import FakeDouyin, FakeSupabase  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+BENCH_USER = "00000000-0000-0000-0000-000000000001"
+VIDEO_URL = "https://storage.bench.invalid/storage/v1/object/public/videos/bench.mp4"
+IMAGE_URL_PREFIX = "https://storage.bench.invalid/storage/v1/object/public/images"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+class BenchSQLite(SQLiteClient):
+    """The embedded SQLite backend on a throwaway file, with FakeSupabase's seeding helper."""
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix="mediahub-bench-")
+        super().__init__(str(Path(self._dir.name) / "bench.db"))
+
+    def seed(self, table: str, item: dict) -> dict:
+        return self.table(table).insert(item).execute().data[0]
+
+
+class Harness:
+    """Wires the app to in-process fakes for the duration of one scenario."""
+
+    def __init__(self, opts, douyin: FakeDouyin):
+        from app.main import app
+        from app.core.auth import get_current_user
+        from app.core.config import settings
+        import app.services.platforms.douyin as douyin_module
+        import app.services.transfer as transfer_module
+        from app.services import circuit_breaker, image_pipeline, media_probe
+
+        self.app = app
+        self.db = BenchSQLite() if opts.db == "sqlite" else FakeSupabase(latency=opts.db_latency)
+        self.douyin = douyin
+
+        for name, module in list(sys.modules.items()):
+            if name.startswith("app.") and hasattr(module, "supabase_admin"):
+                module.supabase_admin = self.db
+
+        settings.ADMISSION_ENABLED = False  # Scenarios measure the handlers, not the rate limits
+        circuit_breaker._breakers.clear()  # Breakers tripped by an earlier scenario would skew this one
+        media_probe._cache.clear()
+        image_pipeline._cache.clear()
+        image_pipeline._cache_bytes = 0
+        fake_httpx = types.SimpleNamespace(AsyncClient=functools.partial(httpx.AsyncClient, transport=douyin))
+        douyin_module.httpx = fake_httpx
+        transfer_module.httpx = fake_httpx
+        media_probe.httpx = fake_httpx
+        image_pipeline.httpx = fake_httpx
+
+        async def bench_user(request: Request) -> str:
+            return request.headers.get("x-bench-user", BENCH_USER)
+
+        app.dependency_overrides[get_current_user] = bench_user
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://bench")
+
+    def seed_accounts(self, count: int, user_id: str = BENCH_USER, platform: str = "douyin") -> list[str]:
+        return [
+            self.db.seed("social_accounts", {
+                "user_id": user_id, "platform": platform, "platform_user_id": f"open-{user_id[-4:]}-{i}",
+                "username": f"account {i}", "avatar_url": None, "access_token": "tok", "refresh_token": "ref",
+            })["id"]
+            for i in range(count)
+        ]
+
+
+async def _timed_requests(make_request, count: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies
+
+
+async def _drain_background_tasks():
+    current = asyncio.current_task()
+    while True:
+        pending = [t for t in asyncio.all_tasks() if t is not current and not t.done()]
+        if not pending:
+            return
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _wrap_publish(harness: Harness, completions: list[float], origin: list[float]):
+    """Record completion time of every publish_to_account relative to ``origin[0]``."""
+    import app.api.tasks as tasks_module
+
+    original = tasks_module.publish_to_account
+
+    @functools.wraps(original)
+    async def recorded(*args, **kwargs):
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            completions.append(time.perf_counter() - origin[0])
+
+    tasks_module.publish_to_account = recorded
+    return lambda: setattr(tasks_module, "publish_to_account", original)
+
+
+def _start_workload() -> float:
+    """Exclude seeding from the measurement: reset the memory peak and start the clock."""
+    tracemalloc.reset_peak()
+    return time.perf_counter()
+
+
+# ── Scenarios ───────────────────────────────────────────────
+# Each returns (operation count, per-operation latencies, workload seconds).
+
+async def scenario_create_task(opts) -> tuple[int, list[float], float]:
+    """Bulk POST /api/tasks: multi-video broadcast tasks against a handful of accounts."""
+    harness = Harness(opts, FakeDouyin())
+    account_ids = harness.seed_accounts(3)
+    body = {
+        "title": "bench", "content_type": "video", "account_ids": account_ids,
+        "video_urls": [f"{VIDEO_URL}?v={i}" for i in range(opts.videos_per_task)],
+    }
+    async with harness.client() as client:
+        start = _start_workload()
+        latencies = await _timed_requests(
+            lambda i: client.post("/api/tasks", json=body), opts.requests, opts.concurrency,
+        )
+    return opts.requests, latencies, time.perf_counter() - start
+
+
+async def scenario_list_tasks(opts) -> tuple[int, list[float], float]:
+    """GET /api/tasks for a user with a large publish history."""
+    harness = Harness(opts, FakeDouyin())
+    account_ids = harness.seed_accounts(3)
+    base = datetime.now(timezone.utc) - timedelta(days=365)
+    for i in range(opts.history):
+        created = (base + timedelta(minutes=i)).isoformat()
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"task {i}", "video_url": VIDEO_URL,
+            "status": "completed", "created_at": created,
+        })
+        for account_id in account_ids:
+            harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_id, "status": "success"})
+    async with harness.client() as client:
+        start = _start_workload()
+        latencies = await _timed_requests(lambda i: client.get("/api/tasks"), opts.requests, opts.concurrency)
+    return opts.requests, latencies, time.perf_counter() - start
+
+
+async def scenario_scheduler_burst(opts) -> tuple[int, list[float], float]:
+    """One scheduler tick finding ``--due`` tasks at once; latency = claim to publish completion."""
+    from app.core.scheduler import execute_scheduled_tasks
+
+    harness = Harness(opts, FakeDouyin(latency=(opts.api_latency, opts.api_latency * 3),
+                                       error_rate=opts.error_rate, video_bytes=opts.video_bytes))
+    account_ids = harness.seed_accounts(10)
+    due = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    for i in range(opts.due):
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"due {i}", "video_url": VIDEO_URL,
+            "status": "scheduled", "scheduled_at": due,
+        })
+        harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_ids[i % len(account_ids)]})
+
+    completions: list[float] = []
+    origin = [_start_workload()]
+    restore = _wrap_publish(harness, completions, origin)
+    try:
+        await execute_scheduled_tasks()
+        await _drain_background_tasks()
+    finally:
+        restore()
+    return len(completions), completions, time.perf_counter() - origin[0]
+
+
+async def scenario_broadcast_large(opts) -> tuple[int, list[float], float]:
+    """One video task broadcast to many accounts with a large source file."""
+    from app.api.tasks import publish_to_account
+
+    harness = Harness(opts, FakeDouyin(latency=(opts.api_latency, opts.api_latency),
+                                       video_bytes=opts.large_video_bytes, bandwidth=opts.bandwidth))
+    account_ids = harness.seed_accounts(opts.accounts)
+    task = harness.db.seed("publish_tasks", {
+        "user_id": BENCH_USER, "title": "broadcast", "video_url": VIDEO_URL, "status": "publishing",
+    })
+    task_accounts = [
+        harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_id})
+        for account_id in account_ids
+    ]
+    accounts = {a["id"]: a for a in harness.db.table("social_accounts").select("*").execute().data}
+
+    latencies: list[float] = []
+    start = _start_workload()
+
+    async def one(ta: dict):
+        account = accounts[ta["account_id"]]
+        await publish_to_account(task["id"], ta["id"], account, VIDEO_URL, task["title"], None)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(ta) for ta in task_accounts))
+    return len(task_accounts), latencies, time.perf_counter() - start
+
+
+async def scenario_loopback_publish(opts) -> tuple[int, list[float], float, dict]:
+    """
+    Scheduler + publish throughput at high volume against the loopback adapter,
+    with a share of accounts rate limited, failing or holding expired tokens.
+    """
+    from app.core.config import settings
+    from app.core.scheduler import execute_scheduled_tasks
+    from app.services.platforms import register
+    from app.services.platforms.loopback import LoopbackAdapter, LoopbackProfile
+
+    adapter = LoopbackAdapter(LoopbackProfile(latency_s=opts.api_latency, video_bytes=opts.video_bytes), seed=1)
+    register(adapter)
+    settings.PUBLISH_RETRY_BASE_DELAY = 0.05
+
+    harness = Harness(opts, FakeDouyin())
+    account_ids = harness.seed_accounts(opts.accounts * 5, platform="loopback")
+    accounts = {a["id"]: a for a in harness.db.table("social_accounts").select("*").execute().data}
+    for i, account_id in enumerate(account_ids):
+        account = accounts[account_id]
+        open_id = account["platform_user_id"]
+        if i % 5 == 1:
+            adapter.configure(open_id, LoopbackProfile(latency_s=opts.api_latency, rate_limit_per_s=20,
+                                                       rate_limit_burst=2, retry_after_s=0.05))
+        elif i % 5 == 2:
+            adapter.configure(open_id, LoopbackProfile(latency_s=opts.api_latency, failure_rate=opts.error_rate * 5))
+        elif i % 5 == 3:
+            harness.db.table("social_accounts").update({
+                "access_token": f"loopback:{open_id}:0",  # already expired
+            }).eq("id", account_id).execute()
+
+    due = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    for i in range(opts.due):
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"loopback {i}", "video_url": VIDEO_URL,
+            "status": "scheduled", "scheduled_at": due,
+        })
+        harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_ids[i % len(account_ids)]})
+
+    completions: list[float] = []
+    origin = [_start_workload()]
+    restore = _wrap_publish(harness, completions, origin)
+    try:
+        await execute_scheduled_tasks()
+        await _drain_background_tasks()
+    finally:
+        restore()
+
+    stats = adapter.stats().values()
+    extra = {key: sum(s[key] for s in stats) for key in ("published", "rate_limited", "failures")}
+    return len(completions), completions, time.perf_counter() - origin[0], extra
+
+
+async def scenario_batch_pipeline(opts) -> tuple[int, list[float], float, dict]:
+    """
+    One ``--videos-per-task``-video batch to ``--accounts`` accounts through the
+    staged pipeline; latency = claim to status write per (video, account).
+    """
+    import app.api.tasks as tasks_module
+    from app.core.scheduler import execute_scheduled_tasks
+    from app.services import publish_pipeline
+
+    harness = Harness(opts, FakeDouyin(latency=(opts.api_latency, opts.api_latency),
+                                       video_bytes=opts.video_bytes * 16, bandwidth=opts.bandwidth / 20))
+    account_ids = harness.seed_accounts(opts.accounts)
+    due = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    batch_id = "00000000-0000-0000-0000-00000000ba7c"
+    for i in range(opts.videos_per_task * 4):
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"batch {i}", "video_url": f"{VIDEO_URL}?v={i}",
+            "status": "scheduled", "scheduled_at": due, "batch_id": batch_id,
+        })
+        for account_id in account_ids:
+            harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_id})
+
+    completions: list[float] = []
+    origin = [_start_workload()]
+    originals = {name: getattr(tasks_module, name) for name in ("_mark_success", "_mark_failed")}
+
+    def recorded(original):
+        def wrapper(*args, **kwargs):
+            try:
+                return original(*args, **kwargs)
+            finally:
+                completions.append(time.perf_counter() - origin[0])
+        return wrapper
+
+    for name, original in originals.items():
+        setattr(tasks_module, name, recorded(original))
+    try:
+        await execute_scheduled_tasks()
+        await _drain_background_tasks()
+    finally:
+        for name, original in originals.items():
+            setattr(tasks_module, name, original)
+
+    report = publish_pipeline.recent_reports[-1]
+    extra = {f"{name}_per_s": stage["throughput_per_s"] for name, stage in report["stages"].items()}
+    return len(completions), completions, time.perf_counter() - origin[0], extra
+
+
+async def scenario_fair_share(opts) -> tuple[int, list[float], float, dict]:
+    """
+    A ``--due``-video campaign from one user plus one post from each of 20
+    small users, all due at once; latency = claim to completion for the small
+    users' posts, which fair queueing should keep low.
+    """
+    from app.core.scheduler import execute_scheduled_tasks
+
+    harness = Harness(opts, FakeDouyin(latency=(opts.api_latency, opts.api_latency * 3),
+                                       video_bytes=opts.video_bytes))
+    due = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    small_users = [f"00000000-0000-0000-0000-0000000005{i:02d}" for i in range(20)]
+    owners = {}
+    for user_id, count in [(BENCH_USER, opts.due), *((u, 1) for u in small_users)]:
+        account_id = harness.seed_accounts(1, user_id=user_id)[0]
+        for i in range(count):
+            task = harness.db.seed("publish_tasks", {
+                "user_id": user_id, "title": f"fair {i}", "video_url": VIDEO_URL,
+                "status": "scheduled", "scheduled_at": due,
+            })
+            harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_id})
+            owners[task["id"]] = user_id
+
+    completions: list[float] = []
+    origin = [_start_workload()]
+    import app.api.tasks as tasks_module
+
+    original = tasks_module.publish_to_account
+
+    async def recorded(task_id, *args, **kwargs):
+        try:
+            return await original(task_id, *args, **kwargs)
+        finally:
+            if owners[task_id] != BENCH_USER:
+                completions.append(time.perf_counter() - origin[0])
+
+    tasks_module.publish_to_account = recorded
+    try:
+        await execute_scheduled_tasks()
+        await _drain_background_tasks()
+    finally:
+        tasks_module.publish_to_account = original
+    return len(completions), completions, time.perf_counter() - origin[0], {"campaign_tasks": opts.due}
+
+
+async def scenario_image_post(opts) -> tuple[int, list[float], float, dict]:
+    """
+    ``--requests`` / 10 nine-image posts uploaded to Douyin, ``--concurrency``
+    at a time; latency = one post's fetch + render + upload. The images are 8
+    camera-sized JPEGs under distinct URLs, so most renditions are cache hits.
+    """
+    from app.services import image_pipeline
+    from app.services.platforms import get_adapter
+
+    Harness(opts, FakeDouyin(latency=(opts.api_latency, opts.api_latency * 3), bandwidth=opts.bandwidth))
+    account = {"access_token": "bench", "platform_user_id": "bench-open-id"}
+    adapter = get_adapter("douyin")
+    posts = [[f"{IMAGE_URL_PREFIX}/post{p}/img{i}.jpg" for i in range(9)] for p in range(max(opts.requests // 10, 1))]
+    for variant in range(8):
+        fakes._photo(variant)  # Generated outside the timed section
+    image_pipeline._executor().submit(int).result()  # Likewise the worker processes
+    before = {result: image_pipeline.RENDITIONS.labels(result).value for result in ("rendered", "cached", "shared")}
+
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(opts.concurrency)
+
+    async def post(urls: list[str]):
+        async with semaphore:
+            started = time.perf_counter()
+            await image_pipeline.upload_images(adapter, account, urls)
+            latencies.append(time.perf_counter() - started)
+
+    start = _start_workload()
+    await asyncio.gather(*(post(urls) for urls in posts))
+    elapsed = time.perf_counter() - start
+    return len(posts), latencies, elapsed, {
+        result: image_pipeline.RENDITIONS.labels(result).value - count for result, count in before.items()
+    }
+
+
+async def scenario_export_history(opts) -> tuple[int, list[float], float, dict]:
+    """
+    ``--requests`` / 50 gzipped CSV exports of a ``--history``-task history
+    (3 accounts per task), one at a time; latency = whole download.
+    """
+    harness = Harness(opts, FakeDouyin())
+    account_ids = harness.seed_accounts(3)
+    base = datetime.now(timezone.utc) - timedelta(days=365)
+    for i in range(opts.history):
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"task {i}", "video_url": VIDEO_URL,
+            "status": "completed", "created_at": (base + timedelta(minutes=i // 10)).isoformat(),
+        })
+        for account_id in account_ids:
+            harness.db.seed("task_accounts", {"task_id": task["id"], "account_id": account_id, "status": "success"})
+
+    # httpx.ASGITransport buffers whole responses, so the app is driven directly to see the first byte
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/tasks/export", "raw_path": b"/api/tasks/export", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", b"gzip")], "server": ("bench", 80), "client": None,
+        "root_path": "",
+    }
+    latencies: list[float] = []
+    first_bytes: list[float] = []
+    size = 0
+
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()  # Disconnect only once the whole response was sent
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            if not size and message.get("body"):
+                first_bytes.append(time.perf_counter() - started)
+            size += len(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    start = _start_workload()
+    for _ in range(max(opts.requests // 50, 1)):
+        started, size = time.perf_counter(), 0
+        done.clear()
+        await harness.app(dict(scope), receive, send)
+        latencies.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - start
+    return len(latencies), latencies, elapsed, {
+        "ttfb_ms": round(percentile(first_bytes, 50) * 1000, 3), "gzip_kb": round(size / 1024, 1),
+    }
+
+
+async def scenario_batch_ops(opts) -> tuple[int, list[float], float, dict]:
+    """
+    GET /api/tasks/batches/{id} on a ``--due`` / 5-video batch to 3 accounts in
+    every task state, then one bulk reschedule, cancel and retry-failed on it.
+    """
+    harness = Harness(opts, FakeDouyin())
+    account_ids = harness.seed_accounts(3)
+    now = datetime.now(timezone.utc)
+    batch_id = "00000000-0000-0000-0000-00000000ba7c"
+    states = ("completed", "failed", "scheduled", "pending_share")
+    for i in range(opts.due // 5):
+        status = states[i % len(states)]
+        task = harness.db.seed("publish_tasks", {
+            "user_id": BENCH_USER, "title": f"batch {i}", "video_url": f"{VIDEO_URL}?v={i}", "status": status,
+            "scheduled_at": (now + timedelta(hours=1)).isoformat() if status == "scheduled" else None,
+            "batch_id": batch_id,
+        })
+        for j, account_id in enumerate(account_ids):
+            row = {"task_id": task["id"], "account_id": account_id}
+            if status == "failed" or (status == "completed" and j == 0):
+                row.update(status="failed", error_message="upload rejected")
+            elif status == "completed":
+                row.update(status="success", published_at=(now - timedelta(seconds=opts.due - i)).isoformat())
+            harness.db.seed("task_accounts", row)
+
+    path = f"/api/tasks/batches/{batch_id}"
+    bulk: dict[str, float] = {}
+    async with harness.client() as client:
+        start = _start_workload()
+        latencies = await _timed_requests(lambda i: client.get(path), opts.requests, opts.concurrency)
+        elapsed = time.perf_counter() - start
+        for action, body in (("reschedule", {"scheduled_at": (now + timedelta(hours=2)).isoformat()}),
+                             ("cancel", None), ("retry-failed", None)):
+            started = time.perf_counter()
+            response = await client.post(f"{path}/{action}", json=body)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{action} {response.status_code}: {response.text[:200]}")
+            bulk[f"{action.replace('-', '_')}_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return opts.requests, latencies, elapsed, bulk
+
+
+async def scenario_cold_import(opts) -> tuple[int, list[float], float, dict]:
+    """
+    ``--import-runs`` fresh interpreters importing app.main under ``python -X importtime``;
+    latency = app.main's cumulative import time. Fails the run above ``--import-budget-ms``.
+    """
+    latencies: list[float] = []
+    slowest: dict[str, list[float]] = {}
+    start = _start_workload()
+    for _ in range(opts.import_runs):
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-X", "importtime", "-c", "import app.main",
+            cwd=Path(__file__).parent.parent, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode:
+            raise RuntimeError(f"import app.main failed:\n{stderr.decode()[-2000:]}")
+        # "import time: <self us> | <cumulative us> | <indented module>"
+        for line in stderr.decode().splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, module = line.split("|")
+            if not cumulative.strip().isdigit():
+                continue
+            if module.strip() == "app.main":
+                latencies.append(int(cumulative) / 1e6)
+            elif module.startswith("   ") and not module.startswith("    "):  # Direct imports of app.main
+                slowest.setdefault(module.strip(), []).append(int(cumulative) / 1e6)
+    elapsed = time.perf_counter() - start
+    name, times = max(slowest.items(), key=lambda item: percentile(item[1], 50))
+    return len(latencies), latencies, elapsed, {
+        "budget_ms": opts.import_budget_ms, "slowest": f"{name}:{percentile(times, 50) * 1000:.0f}ms",
+    }
+
+
+SCENARIOS = {
+    "create_task": scenario_create_task,
+    "list_tasks": scenario_list_tasks,
+    "scheduler_burst": scenario_scheduler_burst,
+    "broadcast_large": scenario_broadcast_large,
+    "loopback_publish": scenario_loopback_publish,
+    "batch_pipeline": scenario_batch_pipeline,
+    "fair_share": scenario_fair_share,
+    "image_post": scenario_image_post,
+    "export_history": scenario_export_history,
+    "batch_ops": scenario_batch_ops,
+    "cold_import": scenario_cold_import,
+}
+
+
+# ── Runner ──────────────────────────────────────────────────
+
+def run_scenario(name: str, opts) -> dict:
+    tracemalloc.start()
+    count, latencies, elapsed, *extra = asyncio.run(SCENARIOS[name](opts))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        **(extra[0] if extra else {}),
+        "operations": count,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_mem_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+_STANDARD_KEYS = {"operations", "elapsed_s", "throughput_per_s", "p50_ms", "p99_ms", "peak_mem_mb"}
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return human-readable regressions versus the baseline entry for ``name``."""
+    regressions = []
+    budget = result.get("budget_ms")
+    if budget and result["p50_ms"] > budget:
+        regressions.append(f"{name}.p50_ms: {result['p50_ms']} over the {budget}ms budget")
+    base = baseline.get(name)
+    if not base:
+        return regressions
+    for key, higher_is_better in (("throughput_per_s", True), ("p50_ms", False),
+                                  ("p99_ms", False), ("peak_mem_mb", False)):
+        old, new = base.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}.{key}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit non-zero on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--db", choices=("fake", "sqlite"), default="fake",
+                        help="in-memory PostgREST fake, or the embedded SQLite backend")
+    parser.add_argument("--db-latency", type=float, default=0.0005, help="seconds per fake PostgREST call")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="seconds per fake Douyin API call")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--bandwidth", type=float, default=200 * 1024 * 1024, help="bytes/s for fake transfers")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--videos-per-task", type=int, default=5)
+    parser.add_argument("--history", type=int, default=5000)
+    parser.add_argument("--due", type=int, default=1000)
+    parser.add_argument("--video-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--large-video-bytes", type=int, default=32 * 1024 * 1024)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--import-runs", type=int, default=5, help="fresh interpreters for cold_import")
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0, help="cold_import p50 limit")
+    opts = parser.parse_args(argv)
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    results, regressions = {}, []
+    for name in opts.scenario or list(SCENARIOS):
+        result = run_scenario(name, opts)
+        key = name if opts.db == "fake" else f"{name}@{opts.db}"  # Backends keep separate baselines
+        results[key] = result
+        print(f"{name:<18} ops={result['operations']:<6} {result['throughput_per_s']:>9}/s "
+              f"p50={result['p50_ms']:>9}ms p99={result['p99_ms']:>9}ms peak={result['peak_mem_mb']:>8}MB"
+              + "".join(f" {k}={v}" for k, v in result.items() if k not in _STANDARD_KEYS))
+        regressions.extend(compare(key, result, baseline, opts.tolerance))
+
+    if opts.update_baseline:
+        BASELINE_PATH.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif regressions:
+        print("\nRegressions vs baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        if opts.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+from app.core.profiling import ProfilingMiddleware, profiler
+
+
+def _client() -> TestClient:
+    router = APIRouter(prefix="/api/items")
+
+    @router.get("/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware)
+    return TestClient(app)
+
+
+def _request_profiles() -> list[dict]:
+    return [p for p in profiling.list_profiles() if p["kind"] == "request"]
+
+
+def test_armed_route_on_included_router_is_captured():
+    client = _client()
+    before = len(_request_profiles())
+    profiler.arm("/api/items/{item_id}", None, ttl_seconds=60, interval_ms=1, trace_memory=False)
+
+    response = client.get("/api/items/42")
+
+    assert response.status_code == 200
+    assert profiler.armed is None
+    profiles = _request_profiles()
+    assert len(profiles) == before + 1
+    assert profiles[-1]["route"] == "/api/items/{item_id}"
+    assert profiles[-1]["path"] == "/api/items/42"
+
+
+def test_other_routes_pass_through_and_stay_armed():
+    client = _client()
+    before = len(_request_profiles())
+    profiler.arm("/api/other", None, ttl_seconds=60, interval_ms=1, trace_memory=False)
+    try:
+        assert client.get("/api/items/42").status_code == 200
+        assert client.get("/missing").status_code == 404
+        assert profiler.armed is not None
+        assert len(_request_profiles()) == before
+    finally:
+        profiler.disarm()
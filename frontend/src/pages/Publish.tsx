@@ -1,7 +1,7 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate, useLocation } from 'react-router-dom'
 import { api } from '../services/api'
-import type { Account, Task, ContentType, Visibility, DistributionMode, AccountConfig, Draft } from '../services/api'
+import type { Account, Task, ContentType, Visibility, DistributionMode, AccountConfig, Draft, DraftFields } from '../services/api'
 import type { VideoFile } from '../components/publish/ContentUpload'
 import { supabase } from '../lib/supabase'
 import ContentUpload from '../components/publish/ContentUpload'
@@ -217,6 +217,8 @@ export default function Publish() {
   // Drafts
   const [drafts, setDrafts] = useState<Draft[]>([])
   const [currentDraftId, setCurrentDraftId] = useState<string | null>(null)
+  // The current draft as last saved, so a save sends only what changed since
+  const savedDraft = useRef<{ version: number; fields: DraftFields } | null>(null)
 
   // UI
   const [showTopicPicker, setShowTopicPicker] = useState(false)
@@ -224,6 +226,9 @@ export default function Publish() {
   const [publishing, setPublishing] = useState(false)
   const [createdTasks, setCreatedTasks] = useState<Task[]>([])
 
+  // Idempotency-Key of the last submit, reused while the same form is resubmitted
+  const publishAttempt = useRef<{ body: string; key: string } | null>(null)
+
   const location = useLocation()
 
   // Load accounts and drafts on mount
@@ -294,6 +299,10 @@ export default function Publish() {
       setScheduledTime(d.toTimeString().slice(0, 5))
     }
     setCurrentDraftId(draft.id)
+    const fields = Object.fromEntries(
+      Object.entries(draft).filter(([field]) => !['id', 'version', 'created_at', 'updated_at'].includes(field)),
+    ) as DraftFields
+    savedDraft.current = { version: draft.version, fields }
     setStep('form')
   }
 
@@ -302,12 +311,13 @@ export default function Publish() {
       setDrafts(prev => prev.filter(d => d.id !== id))
       if (currentDraftId === id) {
         setCurrentDraftId(null)
+        savedDraft.current = null
       }
     }).catch(console.error)
   }
 
   const handleSaveDraft = async () => {
-    const draftData = {
+    const draftData: DraftFields = {
       content_type: contentType,
       title: title || null,
       description: description || null,
@@ -325,11 +335,21 @@ export default function Publish() {
     }
 
     try {
-      if (currentDraftId) {
-        await api.updateDraft(currentDraftId, draftData)
+      if (currentDraftId && savedDraft.current) {
+        const { version, fields } = savedDraft.current
+        const changes: Partial<DraftFields> = Object.fromEntries(
+          Object.entries(draftData).filter(
+            ([field, value]) => JSON.stringify(value) !== JSON.stringify(fields[field as keyof DraftFields]),
+          ),
+        )
+        if (Object.keys(changes).length > 0) {
+          const saved = await api.patchDraft(currentDraftId, version, changes)
+          savedDraft.current = { version: saved.version, fields: draftData }
+        }
       } else {
         const saved = await api.createDraft(draftData)
         setCurrentDraftId(saved.id)
+        savedDraft.current = { version: saved.version, fields: draftData }
       }
       alert('草稿已保存')
     } catch (err) {
@@ -346,7 +366,7 @@ export default function Publish() {
 
       const scheduledAt = getScheduledISOString()
 
-      const tasks = await api.createTask({
+      const data = {
         title,
         description: description || undefined,
         content_type: contentType,
@@ -362,7 +382,12 @@ export default function Publish() {
         account_configs: Object.keys(accountConfigs).length > 0 ? accountConfigs : undefined,
         distribution_mode: distributionMode,
         scheduled_at: scheduledAt,
-      })
+      }
+      const body = JSON.stringify(data)
+      const key = publishAttempt.current?.body === body ? publishAttempt.current.key : crypto.randomUUID()
+      publishAttempt.current = { body, key }
+      const tasks = await api.createTask(data, key)
+      publishAttempt.current = null
 
       setCreatedTasks(tasks)
       setStep('success')
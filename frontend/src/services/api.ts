@@ -21,7 +21,8 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
 
   if (!response.ok) {
     const error = await response.json().catch(() => ({}))
-    throw new Error(error.detail || `Request failed: ${response.status}`)
+    const detail = typeof error.detail === 'object' ? error.detail?.message : error.detail
+    throw new Error(detail || `Request failed: ${response.status}`)
   }
 
   return response.json()
@@ -54,7 +55,7 @@ export interface TaskAccount {
   account_id: string
   username: string
   avatar_url: string | null
-  status: 'pending' | 'success' | 'failed'
+  status: 'pending' | 'publishing' | 'success' | 'failed'
   error_message: string | null
   published_url: string | null
 }
@@ -101,10 +102,13 @@ export interface Draft {
   account_configs: Record<string, AccountConfig>
   distribution_mode: DistributionMode
   scheduled_at: string | null
+  version: number
   created_at: string
   updated_at: string
 }
 
+export type DraftFields = Omit<Draft, 'id' | 'version' | 'created_at' | 'updated_at'>
+
 // API functions
 export const api = {
   // Auth
@@ -143,7 +147,23 @@ export const api = {
     account_configs?: Record<string, AccountConfig>
     distribution_mode?: DistributionMode
     scheduled_at?: string
-  }) => request<Task[]>('/api/tasks', { method: 'POST', body: JSON.stringify(data) }),
+  }, idempotencyKey: string = crypto.randomUUID()) => {
+    // Dropped connections are retried with the same key, so a create the
+    // server already ran is replayed instead of publishing twice
+    const attempt = async (retries: number): Promise<Task[]> => {
+      try {
+        return await request<Task[]>('/api/tasks', {
+          method: 'POST',
+          body: JSON.stringify(data),
+          headers: { 'Idempotency-Key': idempotencyKey },
+        })
+      } catch (err) {
+        if (!(err instanceof TypeError) || retries === 0) throw err
+        return attempt(retries - 1)
+      }
+    }
+    return attempt(2)
+  },
 
   cancelTask: (id: string) =>
     request<Task>(`/api/tasks/${id}/cancel`, { method: 'POST' }),
@@ -153,11 +173,19 @@ export const api = {
 
   getDraft: (id: string) => request<Draft>(`/api/drafts/${id}`),
 
-  createDraft: (data: Omit<Draft, 'id' | 'created_at' | 'updated_at'>) =>
+  createDraft: (data: DraftFields) =>
     request<Draft>('/api/drafts', { method: 'POST', body: JSON.stringify(data) }),
 
-  updateDraft: (id: string, data: Omit<Draft, 'id' | 'created_at' | 'updated_at'>) =>
-    request<Draft>(`/api/drafts/${id}`, { method: 'PUT', body: JSON.stringify(data) }),
+  // Save only changed fields, each replaced whole (JSON patch), if the draft is
+  // still at `version`; 409 means it changed elsewhere
+  patchDraft: (id: string, version: number, changes: Partial<DraftFields>) =>
+    request<{ id: string; version: number; updated_at: string }>(`/api/drafts/${id}`, {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/json-patch+json', 'If-Match': String(version) },
+      body: JSON.stringify(
+        Object.entries(changes).map(([field, value]) => ({ op: 'replace', path: `/${field}`, value })),
+      ),
+    }),
 
   deleteDraft: (id: string) =>
     request<void>(`/api/drafts/${id}`, { method: 'DELETE' }),
@@ -0,0 +1,9 @@
+-- Migration: optimistic versioning for draft autosave (PATCH /api/drafts/{id})
+
+-- 1. Version counter, bumped on every write; PATCH updates are conditional on it
+alter table drafts
+  add column if not exists version integer not null default 1;
+
+-- 2. Listing drafts filters by user and sorts by updated_at
+create index if not exists idx_drafts_user_updated
+  on drafts (user_id, updated_at desc);
@@ -0,0 +1,10 @@
+-- Migration: avatar proxy (GET /api/avatars/{digest})
+
+-- 1. sha256 of the cached avatar image; API responses point at the proxy when set
+alter table social_accounts
+  add column if not exists avatar_hash text;
+
+-- 2. A proxy cache miss finds the platform URL to refetch by digest
+create index if not exists idx_social_accounts_avatar_hash
+  on social_accounts (avatar_hash)
+  where avatar_hash is not null;
@@ -0,0 +1,50 @@
+-- Migration: pre-aggregated publish statistics for the dashboard (GET /api/stats/publishing)
+
+-- 1. Per-user, per-platform, per-day counters of finished per-account publishes.
+--    Days are calendar days in STATS_TIMEZONE (default Asia/Shanghai).
+create table if not exists publish_stats_daily (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  platform varchar(50) not null,
+  day date not null,
+  publishes integer not null default 0,
+  successes integer not null default 0,
+  failures integer not null default 0,
+  primary key (user_id, day, platform)
+);
+
+alter table publish_stats_daily enable row level security;
+
+create policy "Users view own publish stats"
+  on publish_stats_daily for select using (auth.uid() = user_id);
+
+-- 2. Apply buffered increments from the API in one round trip:
+--    deltas = [{"user_id", "platform", "day", "publishes", "successes", "failures"}, ...]
+create or replace function bump_publish_stats(deltas jsonb)
+returns void
+language sql
+as $$
+  insert into publish_stats_daily as s (user_id, platform, day, publishes, successes, failures)
+  select (d->>'user_id')::uuid, d->>'platform', (d->>'day')::date,
+         (d->>'publishes')::int, (d->>'successes')::int, (d->>'failures')::int
+  from jsonb_array_elements(deltas) as d
+  on conflict (user_id, day, platform) do update set
+    publishes = s.publishes + excluded.publishes,
+    successes = s.successes + excluded.successes,
+    failures = s.failures + excluded.failures;
+$$;
+
+-- 3. One-time backfill from history (failures have no timestamp of their own;
+--    the task's last update stands in for it)
+insert into publish_stats_daily (user_id, platform, day, publishes, successes, failures)
+select pt.user_id,
+       sa.platform,
+       (coalesce(ta.published_at, pt.updated_at, ta.created_at) at time zone 'Asia/Shanghai')::date,
+       count(*),
+       count(*) filter (where ta.status = 'success'),
+       count(*) filter (where ta.status = 'failed')
+from task_accounts ta
+join publish_tasks pt on pt.id = ta.task_id
+join social_accounts sa on sa.id = ta.account_id
+where ta.status in ('success', 'failed')
+group by 1, 2, 3
+on conflict (user_id, day, platform) do nothing;
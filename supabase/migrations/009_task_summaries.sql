@@ -0,0 +1,100 @@
+-- Migration: denormalized task read model for GET /api/tasks and GET /api/tasks/{id}
+
+-- 1. One row per task: the task's columns plus a compact accounts array, exactly
+--    the shape the API returns. Maintained by the triggers below; never written by the API.
+create table if not exists task_summaries (
+  task_id uuid primary key references publish_tasks(id) on delete cascade,
+  user_id uuid not null,
+  created_at timestamptz not null,
+  summary jsonb not null
+);
+
+create index if not exists idx_task_summaries_user_created
+  on task_summaries (user_id, created_at desc);
+
+alter table task_summaries enable row level security;
+
+create policy "Users view own task summaries"
+  on task_summaries for select using (auth.uid() = user_id);
+
+-- 2. Rebuild one task's summary
+create or replace function refresh_task_summary(p_task_id uuid)
+returns void
+language sql
+as $$
+  insert into task_summaries (task_id, user_id, created_at, summary)
+  select t.id, t.user_id, t.created_at,
+         to_jsonb(t) || jsonb_build_object('accounts', coalesce((
+           select jsonb_agg(jsonb_build_object(
+                    'account_id', ta.account_id,
+                    'username', coalesce(sa.username, 'Unknown'),
+                    'avatar_url', sa.avatar_url,
+                    'avatar_hash', sa.avatar_hash,
+                    'status', ta.status,
+                    'error_message', ta.error_message,
+                    'published_url', ta.published_url
+                  ) order by ta.created_at)
+           from task_accounts ta
+           left join social_accounts sa on sa.id = ta.account_id
+           where ta.task_id = t.id
+         ), '[]'::jsonb))
+  from publish_tasks t
+  where t.id = p_task_id
+  on conflict (task_id) do update set summary = excluded.summary;
+$$;
+
+-- 3. Triggers: task changes, account status transitions, account profile changes
+create or replace function publish_tasks_refresh_summary()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform refresh_task_summary(new.id);
+  return null;
+end;
+$$;
+
+create or replace function task_accounts_refresh_summary()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform refresh_task_summary(coalesce(new.task_id, old.task_id));
+  return null;
+end;
+$$;
+
+create or replace function social_accounts_refresh_summaries()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform refresh_task_summary(task_id)
+  from (select distinct task_id from task_accounts where account_id = new.id) as affected;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_publish_tasks_summary on publish_tasks;
+create trigger trg_publish_tasks_summary
+  after insert or update on publish_tasks
+  for each row execute function publish_tasks_refresh_summary();
+
+drop trigger if exists trg_task_accounts_summary on task_accounts;
+create trigger trg_task_accounts_summary
+  after insert or update or delete on task_accounts
+  for each row execute function task_accounts_refresh_summary();
+
+drop trigger if exists trg_social_accounts_summaries on social_accounts;
+create trigger trg_social_accounts_summaries
+  after update of username, avatar_url, avatar_hash on social_accounts
+  for each row
+  when (old.username is distinct from new.username
+        or old.avatar_url is distinct from new.avatar_url
+        or old.avatar_hash is distinct from new.avatar_hash)
+  execute function social_accounts_refresh_summaries();
+
+-- 4. Social account lookups by account (profile changes) and the one-time backfill
+create index if not exists idx_task_accounts_account_id on task_accounts (account_id);
+
+select refresh_task_summary(id) from publish_tasks;
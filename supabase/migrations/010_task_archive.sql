@@ -0,0 +1,68 @@
+-- Migration: hot/cold tiering of publish history (see app/services/archive.py)
+
+-- 1. Cold storage: one row per finished task moved out of publish_tasks /
+--    task_accounts / task_summaries. summary is the document the API serves;
+--    task_accounts keeps the raw per-account rows (overrides, item ids).
+--    Large jsonb values are compressed by TOAST.
+create table if not exists task_archive (
+  task_id uuid primary key,
+  user_id uuid not null references auth.users(id) on delete cascade,
+  created_at timestamptz not null,
+  finished_at timestamptz,
+  archived_at timestamptz not null default now(),
+  summary jsonb not null,
+  task_accounts jsonb not null default '[]'::jsonb
+);
+
+create index if not exists idx_task_archive_user_created
+  on task_archive (user_id, created_at desc);
+
+alter table task_archive enable row level security;
+
+create policy "Users view own archived tasks"
+  on task_archive for select using (auth.uid() = user_id);
+
+-- 2. Archive candidates without scanning live tasks
+create index if not exists idx_publish_tasks_finished
+  on publish_tasks (updated_at)
+  where status in ('completed', 'failed', 'cancelled');
+
+-- 3. Move one batch of tasks finished before p_before; returns how many moved.
+--    Rows locked by a running publish are skipped, and deleting the task
+--    cascades to its task_accounts and task_summaries rows.
+create or replace function archive_tasks(p_before timestamptz, p_limit integer)
+returns integer
+language plpgsql
+as $$
+declare
+  moved integer;
+begin
+  with batch as (
+    select id from publish_tasks
+    where status in ('completed', 'failed', 'cancelled') and updated_at < p_before
+    order by updated_at
+    limit p_limit
+    for update skip locked
+  ), archived as (
+    insert into task_archive (task_id, user_id, created_at, finished_at, summary, task_accounts)
+    select t.id, t.user_id, t.created_at, t.updated_at,
+           coalesce(s.summary, to_jsonb(t)),
+           coalesce((
+             select jsonb_agg(to_jsonb(ta) order by ta.created_at)
+             from task_accounts ta
+             where ta.task_id = t.id
+           ), '[]'::jsonb)
+    from publish_tasks t
+    join batch b on b.id = t.id
+    left join task_summaries s on s.task_id = t.id
+    on conflict (task_id) do nothing
+    returning task_id
+  )
+  delete from publish_tasks t
+  using archived a
+  where t.id = a.task_id;
+
+  get diagnostics moved = row_count;
+  return moved;
+end;
+$$;
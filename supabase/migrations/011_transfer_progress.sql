@@ -0,0 +1,59 @@
+-- Migration: byte-level transfer progress per task account (see app/services/transfer_progress.py)
+
+-- 1. Latest progress of each per-account publish: stage, bytes of that stage,
+--    instantaneous / average throughput in bytes per second. Written from
+--    memory every TRANSFER_PROGRESS_FLUSH_SECONDS; goes with its task.
+create table if not exists transfer_progress (
+  task_account_id uuid primary key references task_accounts(id) on delete cascade,
+  task_id uuid not null references publish_tasks(id) on delete cascade,
+  account_id uuid not null,
+  platform varchar(50) not null,
+  status varchar(20) not null default 'active' check (status in ('active', 'succeeded', 'failed')),
+  stage varchar(20) check (stage in ('download', 'upload', 'create')),
+  bytes_done bigint not null default 0,
+  bytes_total bigint,
+  rate_bps double precision,
+  avg_bps double precision,
+  started_at timestamptz not null,
+  updated_at timestamptz not null
+);
+
+create index if not exists idx_transfer_progress_task_id on transfer_progress (task_id);
+
+alter table transfer_progress enable row level security;
+
+create policy "Users view progress of own tasks"
+  on transfer_progress for select using (
+    exists (select 1 from publish_tasks pt where pt.id = task_id and pt.user_id = auth.uid())
+  );
+
+-- 2. Save buffered progress from the API in one round trip:
+--    rows = [{"task_account_id", "task_id", "account_id", "platform", "status", "stage",
+--             "bytes_done", "bytes_total", "rate_bps", "avg_bps", "started_at", "updated_at"}, ...]
+--    Rows of task accounts deleted (or archived) meanwhile are skipped.
+create or replace function save_transfer_progress(rows jsonb)
+returns void
+language sql
+as $$
+  insert into transfer_progress as p (
+    task_account_id, task_id, account_id, platform, status, stage,
+    bytes_done, bytes_total, rate_bps, avg_bps, started_at, updated_at
+  )
+  select (r->>'task_account_id')::uuid, (r->>'task_id')::uuid, (r->>'account_id')::uuid,
+         r->>'platform', r->>'status', r->>'stage',
+         (r->>'bytes_done')::bigint, (r->>'bytes_total')::bigint,
+         (r->>'rate_bps')::double precision, (r->>'avg_bps')::double precision,
+         (r->>'started_at')::timestamptz, (r->>'updated_at')::timestamptz
+  from jsonb_array_elements(rows) as r
+  join task_accounts ta on ta.id = (r->>'task_account_id')::uuid
+  on conflict (task_account_id) do update set
+    status = excluded.status,
+    stage = excluded.stage,
+    bytes_done = excluded.bytes_done,
+    bytes_total = excluded.bytes_total,
+    rate_bps = excluded.rate_bps,
+    avg_bps = excluded.avg_bps,
+    started_at = excluded.started_at,
+    updated_at = excluded.updated_at
+  where excluded.updated_at >= p.updated_at;
+$$;
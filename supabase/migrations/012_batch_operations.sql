@@ -0,0 +1,80 @@
+-- Migration: batch progress and bulk operations keyed on batch_id (see app/api/task_batches.py)
+
+-- 1. Find a batch's tasks without scanning the user's history
+create index if not exists idx_publish_tasks_batch_id
+  on publish_tasks (batch_id)
+  where batch_id is not null;
+
+-- 2. Progress of one batch in a single round trip: tasks and task accounts
+--    counted by status, the accounts still to publish (pending, in scheduled
+--    or publishing tasks), failed accounts that retry_failed_batch would
+--    requeue, the span of successful publishes (the API derives pace and ETA
+--    from it) and the first p_failure_limit failures.
+create or replace function batch_progress(p_batch_id uuid, p_user_id uuid, p_failure_limit integer)
+returns jsonb
+language sql
+stable
+as $$
+  with tasks as (
+    select id, status, scheduled_at
+    from publish_tasks
+    where batch_id = p_batch_id and user_id = p_user_id
+  ), accounts as (
+    select ta.task_id, ta.account_id, ta.status, ta.error_message, ta.published_at, ta.created_at,
+           t.status as task_status
+    from task_accounts ta
+    join tasks t on t.id = ta.task_id
+  )
+  select jsonb_build_object(
+    'tasks', coalesce((select jsonb_object_agg(status, n) from (
+      select status, count(*) as n from tasks group by status
+    ) as s), '{}'::jsonb),
+    'accounts', coalesce((select jsonb_object_agg(status, n) from (
+      select status, count(*) as n from accounts group by status
+    ) as s), '{}'::jsonb),
+    'remaining', (select count(*) from accounts
+                  where status = 'pending' and task_status in ('scheduled', 'publishing')),
+    'retryable', (select count(*) from accounts
+                  where status = 'failed' and task_status in ('completed', 'failed')),
+    'last_scheduled_at', (select max(scheduled_at) from tasks where status = 'scheduled'),
+    'first_published_at', (select min(published_at) from accounts where status = 'success'),
+    'last_published_at', (select max(published_at) from accounts where status = 'success'),
+    'failures', coalesce((select jsonb_agg(f) from (
+      select a.task_id, a.account_id, sa.username, a.error_message
+      from accounts a
+      left join social_accounts sa on sa.id = a.account_id
+      where a.status = 'failed'
+      order by a.created_at, a.task_id
+      limit p_failure_limit
+    ) as f), '[]'::jsonb)
+  );
+$$;
+
+-- 3. Requeue the failed accounts of a batch's finished tasks in one
+--    statement: those accounts go back to pending and their tasks to
+--    scheduled, due now, so the scheduler publishes them as one batch again
+--    (accounts that succeeded are not re-sent). Tasks still publishing,
+--    scheduled or cancelled are left alone. Returns the counts requeued.
+create or replace function retry_failed_batch(p_batch_id uuid, p_user_id uuid)
+returns jsonb
+language sql
+as $$
+  with finished as (
+    select id from publish_tasks
+    where batch_id = p_batch_id and user_id = p_user_id and status in ('completed', 'failed')
+    for update
+  ), accounts as (
+    update task_accounts ta set status = 'pending', error_message = null
+    from finished f
+    where ta.task_id = f.id and ta.status = 'failed'
+    returning ta.task_id
+  ), requeued as (
+    update publish_tasks pt set status = 'scheduled', scheduled_at = now(), updated_at = now()
+    where pt.id in (select task_id from accounts)
+    returning pt.id
+  )
+  select jsonb_build_object(
+    'tasks', (select count(*) from requeued),
+    'accounts', (select count(*) from accounts)
+  );
+$$;
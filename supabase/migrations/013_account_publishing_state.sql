@@ -0,0 +1,49 @@
+-- Migration: per-account publishing state (see app/core/scheduler.py)
+
+-- 1. The scheduler sets each task account it dispatches to publishing. A
+--    task deferred by an open circuit breaker while some of its accounts are
+--    still uploading then only re-sends the accounts that are really pending.
+alter table task_accounts drop constraint if exists task_accounts_status_check;
+alter table task_accounts
+  add constraint task_accounts_status_check check (status in ('pending', 'publishing', 'success', 'failed'));
+
+-- 2. batch_progress (012): accounts in flight are still remaining
+create or replace function batch_progress(p_batch_id uuid, p_user_id uuid, p_failure_limit integer)
+returns jsonb
+language sql
+stable
+as $$
+  with tasks as (
+    select id, status, scheduled_at
+    from publish_tasks
+    where batch_id = p_batch_id and user_id = p_user_id
+  ), accounts as (
+    select ta.task_id, ta.account_id, ta.status, ta.error_message, ta.published_at, ta.created_at,
+           t.status as task_status
+    from task_accounts ta
+    join tasks t on t.id = ta.task_id
+  )
+  select jsonb_build_object(
+    'tasks', coalesce((select jsonb_object_agg(status, n) from (
+      select status, count(*) as n from tasks group by status
+    ) as s), '{}'::jsonb),
+    'accounts', coalesce((select jsonb_object_agg(status, n) from (
+      select status, count(*) as n from accounts group by status
+    ) as s), '{}'::jsonb),
+    'remaining', (select count(*) from accounts
+                  where status in ('pending', 'publishing') and task_status in ('scheduled', 'publishing')),
+    'retryable', (select count(*) from accounts
+                  where status = 'failed' and task_status in ('completed', 'failed')),
+    'last_scheduled_at', (select max(scheduled_at) from tasks where status = 'scheduled'),
+    'first_published_at', (select min(published_at) from accounts where status = 'success'),
+    'last_published_at', (select max(published_at) from accounts where status = 'success'),
+    'failures', coalesce((select jsonb_agg(f) from (
+      select a.task_id, a.account_id, sa.username, a.error_message
+      from accounts a
+      left join social_accounts sa on sa.id = a.account_id
+      where a.status = 'failed'
+      order by a.created_at, a.task_id
+      limit p_failure_limit
+    ) as f), '[]'::jsonb)
+  );
+$$;
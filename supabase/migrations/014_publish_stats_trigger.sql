@@ -0,0 +1,99 @@
+-- Migration: keep publish_stats_daily current from task_accounts itself (see app/services/stats.py)
+
+-- 1. The calendar the counters are bucketed in. The API writes its
+--    STATS_TIMEZONE here at startup (set_publish_stats_timezone).
+create table if not exists publish_stats_settings (
+  id boolean primary key default true check (id),
+  timezone text not null
+);
+
+insert into publish_stats_settings (timezone) values ('Asia/Shanghai')
+on conflict (id) do nothing;
+
+-- 2. Count every task account that reaches success or failed, whichever
+--    path set it (publish, H5 share webhook, scheduler, bulk RPCs), in the
+--    transaction that changed the status. A failed account that is retried
+--    counts once per attempt. Only video tasks count: the scheduler marks
+--    other content types successful as a placeholder, without publishing.
+create or replace function task_accounts_bump_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.status in ('success', 'failed')
+     and (tg_op = 'INSERT' or old.status is distinct from new.status) then
+    insert into publish_stats_daily as s (user_id, platform, day, publishes, successes, failures)
+    select pt.user_id, sa.platform, (now() at time zone st.timezone)::date, 1,
+           (new.status = 'success')::int, (new.status = 'failed')::int
+    from publish_tasks pt, social_accounts sa, publish_stats_settings st
+    where pt.id = new.task_id and sa.id = new.account_id and pt.content_type = 'video'
+    on conflict (user_id, day, platform) do update set
+      publishes = s.publishes + 1,
+      successes = s.successes + excluded.successes,
+      failures = s.failures + excluded.failures;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_task_accounts_stats on task_accounts;
+create trigger trg_task_accounts_stats
+  after insert or update of status on task_accounts
+  for each row execute function task_accounts_bump_stats();
+
+-- 3. Recount the counters from history in the configured calendar: live
+--    and archived task accounts of video tasks, each finished one counted
+--    once, dated like the 008 backfill (failures by the task's last update).
+create or replace function rebuild_publish_stats()
+returns void
+language sql
+as $$
+  delete from publish_stats_daily where true;
+
+  insert into publish_stats_daily (user_id, platform, day, publishes, successes, failures)
+  select f.user_id,
+         sa.platform,
+         (f.finished_at at time zone (select timezone from publish_stats_settings))::date,
+         count(*),
+         count(*) filter (where f.status = 'success'),
+         count(*) filter (where f.status = 'failed')
+  from (
+    select pt.user_id, ta.account_id, ta.status,
+           coalesce(ta.published_at, pt.updated_at, ta.created_at) as finished_at
+    from task_accounts ta
+    join publish_tasks pt on pt.id = ta.task_id
+    where pt.content_type = 'video'
+    union all
+    select a.user_id, (e->>'account_id')::uuid, e->>'status',
+           coalesce((e->>'published_at')::timestamptz, a.finished_at, (e->>'created_at')::timestamptz)
+    from task_archive a, jsonb_array_elements(a.task_accounts) as e
+    where coalesce(a.summary->>'content_type', 'video') = 'video'
+  ) as f
+  join social_accounts sa on sa.id = f.account_id
+  where f.status in ('success', 'failed')
+  group by 1, 2, 3;
+$$;
+
+-- 4. Called by the API at startup with STATS_TIMEZONE; a changed calendar
+--    re-buckets the history. Returns whether it changed. Unknown zone names
+--    raise before anything is written.
+create or replace function set_publish_stats_timezone(p_timezone text)
+returns boolean
+language plpgsql
+as $$
+begin
+  perform now() at time zone p_timezone;
+  update publish_stats_settings set timezone = p_timezone where id and timezone <> p_timezone;
+  if not found then
+    return false;
+  end if;
+  perform rebuild_publish_stats();
+  return true;
+end;
+$$;
+
+-- 5. The buffered counters written by the API until now missed the H5 share
+--    and scheduler paths: recount once. Nothing calls the 008 upsert any more.
+select rebuild_publish_stats();
+
+drop function if exists bump_publish_stats(jsonb);